@@ -0,0 +1,10 @@
+from .fair_scheduler import FairScheduler, Ticket, INTERACTIVE, BATCH
+from .overload import OverloadController
+
+__all__ = [
+    'FairScheduler',
+    'Ticket',
+    'INTERACTIVE',
+    'BATCH',
+    'OverloadController'
+]
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# Tier -> (share weight, in-flight cap per user)
+DEFAULT_TIERS = {
+    "free": (1.0, 2),
+    "pro": (4.0, 8)
+}
+
+
+class Ticket:
+    """One request's place in the scheduler, from enqueue to release."""
+
+    def __init__(self, user_id: str, cost: float, priority: str, start_tag: float):
+        self.user_id = user_id
+        self.cost = cost
+        self.priority = priority
+        self.start_tag = start_tag
+        self.enqueued_at = time.monotonic()
+        self.queue_time = 0.0
+        self.ready = asyncio.get_running_loop().create_future()
+
+
+class FairScheduler:
+    """
+    Admission scheduler in front of the provider fan-out.
+
+    At most ``max_concurrent`` requests run at once, and each user at most
+    their tier's in-flight cap. Waiting requests are served by start-time
+    fair queueing: a request's tag is the later of the scheduler's virtual
+    time and the finish tag of the user's previous request, and it advances
+    the user's finish tag by ``cost / weight``. A heavy user therefore
+    queues behind their own backlog, not in front of everyone else's.
+    Interactive requests always go before batch ones.
+    """
+
+    def __init__(self, max_concurrent: int = 16, tiers: Optional[Mapping[str, Tuple[float, int]]] = None,
+                 user_tiers: Optional[Mapping[str, str]] = None, default_tier: str = "free",
+                 window: int = 1000):
+        self.max_concurrent = max_concurrent
+        self.tiers = dict(DEFAULT_TIERS, **(tiers or {}))
+        self.user_tiers = dict(user_tiers or {})
+        self.default_tier = default_tier
+        self.virtual_time = 0.0
+        self.in_flight = 0
+        self._user_in_flight: Dict[str, int] = defaultdict(int)
+        self._finish_tags: Dict[str, float] = {}
+        self._queues: Dict[str, Dict[str, Deque[Ticket]]] = {priority: {} for priority in PRIORITIES}
+        self._queue_times: Dict[str, Deque[float]] = {priority: deque(maxlen=window) for priority in PRIORITIES}
+        self.admitted = 0
+
+    def tier(self, user_id: str) -> str:
+        tier = self.user_tiers.get(user_id, self.default_tier)
+        return tier if tier in self.tiers else self.default_tier
+
+    def queued(self, user_id: Optional[str] = None) -> int:
+        return sum(len(queue) for queues in self._queues.values()
+                   for user, queue in queues.items() if user_id in (None, user))
+
+    def oldest_wait(self) -> float:
+        """Seconds the longest-waiting queued request has been waiting."""
+        now = time.monotonic()
+        return max((now - queue[0].enqueued_at for queues in self._queues.values() for queue in queues.values()),
+                   default=0.0)
+
+    def _enqueue(self, user_id: str, cost: float, priority: str) -> Ticket:
+        weight, _ = self.tiers[self.tier(user_id)]
+        start_tag = max(self.virtual_time, self._finish_tags.get(user_id, 0.0))
+        self._finish_tags[user_id] = start_tag + cost / weight
+        ticket = Ticket(user_id, cost, priority, start_tag)
+        self._queues[priority].setdefault(user_id, deque()).append(ticket)
+        return ticket
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_concurrent:
+            ticket = self._next()
+            if ticket is None:
+                return
+            queue = self._queues[ticket.priority][ticket.user_id]
+            queue.popleft()
+            if not queue:
+                del self._queues[ticket.priority][ticket.user_id]
+            if ticket.ready.done():
+                continue  # cancelled while waiting, before it was withdrawn
+            self.virtual_time = max(self.virtual_time, ticket.start_tag)
+            self.in_flight += 1
+            self._user_in_flight[ticket.user_id] += 1
+            ticket.queue_time = time.monotonic() - ticket.enqueued_at
+            self._queue_times[ticket.priority].append(ticket.queue_time)
+            self.admitted += 1
+            ticket.ready.set_result(None)
+
+    def _next(self) -> Optional[Ticket]:
+        for priority in PRIORITIES:
+            heads = [
+                queue[0] for user_id, queue in self._queues[priority].items()
+                if self._user_in_flight.get(user_id, 0) < self.tiers[self.tier(user_id)][1]
+            ]
+            if heads:
+                return min(heads, key=lambda ticket: (ticket.start_tag, ticket.enqueued_at))
+        return None
+
+    def _release(self, ticket: Ticket) -> None:
+        self.in_flight -= 1
+        self._user_in_flight[ticket.user_id] -= 1
+        if not self._user_in_flight[ticket.user_id]:
+            del self._user_in_flight[ticket.user_id]
+            if not any(ticket.user_id in queues for queues in self._queues.values()):
+                # An idle user does not bank credit for later
+                self._finish_tags.pop(ticket.user_id, None)
+        self._dispatch()
+
+    def _withdraw(self, ticket: Ticket) -> None:
+        queue = self._queues[ticket.priority].get(ticket.user_id)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.priority][ticket.user_id]
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, cost: float = 1.0, priority: str = INTERACTIVE) -> AsyncIterator[Ticket]:
+        """Wait for the user's turn, run the body, then free the slot."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        ticket = self._enqueue(user_id, max(cost, 0.0), priority)
+        self._dispatch()
+        try:
+            await ticket.ready
+        except asyncio.CancelledError:
+            if ticket.ready.done() and not ticket.ready.cancelled():
+                self._release(ticket)
+            else:
+                self._withdraw(ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        """In-flight and queued requests and recent queue-time percentiles per priority."""
+        queue_times = {}
+        for priority, samples in self._queue_times.items():
+            ordered = sorted(samples)
+            queue_times[priority] = {
+                "p50": round(ordered[len(ordered) // 2], 4) if ordered else None,
+                "p95": round(ordered[int(len(ordered) * 0.95)], 4) if ordered else None
+            }
+        return {
+            "inFlight": self.in_flight,
+            "queued": self.queued(),
+            "admitted": self.admitted,
+            "queueTime": queue_times
+        }
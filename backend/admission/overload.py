@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .fair_scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+NORMAL, REDUCED_FAN_OUT, LOCAL_ANALYSIS, SHEDDING = range(4)
+STAGE_NAMES = ("normal", "reduced_fan_out", "local_analysis", "shedding")
+
+# Signal -> thresholds entering stages 1, 2 and 3
+DEFAULT_THRESHOLDS = {
+    "loopLag": (0.05, 0.2, 0.5),             # seconds, smoothed
+    "utilization": (0.75, 0.9, math.inf),    # in-flight / max_concurrent
+    "queueWait": (1.0, 5.0, 15.0)            # seconds the oldest waiting request has queued
+}
+
+
+class OverloadController:
+    """
+    Staged degradation from event-loop lag, in-flight load and queue wait.
+
+    Every signal maps to a stage through its thresholds and the worst one
+    wins: 1 trims the fan-out to the ``reduced_fan_out`` best-scoring
+    providers, 2 also trims it to one provider and answers analysis
+    requests with the local ranker instead of LLM judges, 3 rejects new
+    work with 503 and ``Retry-After``. Stages rise immediately but fall one
+    step at a time, at most once per ``recovery`` seconds, so the
+    controller does not flap at a threshold.
+    """
+
+    def __init__(self, scheduler: FairScheduler, thresholds: Optional[Mapping[str, Tuple[float, ...]]] = None,
+                 interval: float = 0.25, smoothing: float = 0.3, recovery: float = 5.0,
+                 reduced_fan_out: int = 2):
+        self.scheduler = scheduler
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.interval = interval
+        self.smoothing = smoothing
+        self.recovery = recovery
+        self.reduced_fan_out = reduced_fan_out
+        self.loop_lag = 0.0
+        self.stage = NORMAL
+        self.changed_at = time.monotonic()
+        self.shed = 0
+        self.degraded = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record_lag(self, lag: float) -> None:
+        self.loop_lag += self.smoothing * (max(lag, 0.0) - self.loop_lag)
+
+    async def _monitor(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record_lag(time.monotonic() - start - self.interval)
+
+    def start(self) -> None:
+        """Start sampling event-loop lag (needs a running loop)."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def signals(self) -> Dict[str, float]:
+        return {
+            "loopLag": round(self.loop_lag, 4),
+            "utilization": round(self.scheduler.in_flight / self.scheduler.max_concurrent, 4),
+            "queueWait": round(self.scheduler.oldest_wait(), 4)
+        }
+
+    def _update(self) -> int:
+        signals = self.signals()
+        target = max(
+            sum(value >= threshold for threshold in self.thresholds[name])
+            for name, value in signals.items()
+        )
+        now = time.monotonic()
+        if target > self.stage:
+            logger.warning(f"Overload stage {STAGE_NAMES[target]}: {signals}")
+            self.stage, self.changed_at = target, now
+        elif target < self.stage and now - self.changed_at >= self.recovery:
+            self.stage, self.changed_at = self.stage - 1, now
+            logger.info(f"Overload easing to stage {STAGE_NAMES[self.stage]}")
+        return self.stage
+
+    def decide(self, admitted: bool = False) -> Dict[str, Any]:
+        """
+        The degradation to apply to a request.
+
+        Work that has already waited its turn in the scheduler (``admitted``)
+        is never shed; under shedding it runs at the local-analysis stage.
+        """
+        stage = self._update()
+        if admitted:
+            stage = min(stage, LOCAL_ANALYSIS)
+        decision = {
+            "stage": STAGE_NAMES[stage],
+            "maxProviders": None if stage == NORMAL else (self.reduced_fan_out if stage == REDUCED_FAN_OUT else 1),
+            "llmAnalysis": stage < LOCAL_ANALYSIS,
+            "shed": stage >= SHEDDING
+        }
+        if decision["shed"]:
+            self.shed += 1
+            # Roughly how long the current backlog needs to drain
+            decision["retryAfter"] = max(math.ceil(self.scheduler.oldest_wait()), math.ceil(self.recovery), 1)
+        elif stage != NORMAL:
+            self.degraded += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stage": STAGE_NAMES[self.stage],
+            "signals": self.signals(),
+            "degraded": self.degraded,
+            "shed": self.shed
+        }
@@ -0,0 +1,10 @@
+from .id_tokens import AuthError, Forbidden, bearer_token, verify_id_token, authorize, authorize_admin
+
+__all__ = [
+    'AuthError',
+    'Forbidden',
+    'bearer_token',
+    'verify_id_token',
+    'authorize',
+    'authorize_admin'
+]
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from firebase_admin import auth as firebase_auth
+
+logger = logging.getLogger(__name__)
+
+
+class AuthError(Exception):
+    """The caller's ID token is missing or does not verify."""
+
+
+class Forbidden(AuthError):
+    """The token verifies but does not grant access to what was asked for."""
+
+
+def bearer_token(header: Optional[str]) -> Optional[str]:
+    """The token of an ``Authorization: Bearer <token>`` header."""
+    scheme, _, token = (header or "").partition(" ")
+    return (token.strip() or None) if scheme.lower() == "bearer" else None
+
+
+async def verify_id_token(token: Optional[str]) -> Dict[str, Any]:
+    """Decoded claims of a Firebase ID token (``uid`` included)."""
+    if not token:
+        raise AuthError("Missing ID token")
+    try:
+        return await asyncio.to_thread(firebase_auth.verify_id_token, token)
+    except (ValueError, firebase_auth.InvalidIdTokenError) as e:
+        raise AuthError(f"Invalid ID token: {str(e)}")
+
+
+async def authorize(token: Optional[str], user_id: str) -> Dict[str, Any]:
+    """Verify a token and check that it was issued to ``user_id``."""
+    claims = await verify_id_token(token)
+    if claims.get("uid") != user_id:
+        logger.warning(f"Token for {claims.get('uid')} used for user {user_id}")
+        raise Forbidden("ID token does not belong to this user")
+    return claims
+
+
+async def authorize_admin(token: Optional[str]) -> Dict[str, Any]:
+    """Verify a token carrying the ``admin`` custom claim."""
+    claims = await verify_id_token(token)
+    if claims.get("admin") is not True:
+        logger.warning(f"Non-admin {claims.get('uid')} called an admin endpoint")
+        raise Forbidden("Admin access required")
+    return claims
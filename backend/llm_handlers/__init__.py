@@ -4,6 +4,20 @@ from .gemini_handler import GeminiHandler
 from .openai_handler import OpenAIChatHandler
 from .handler_factory import LLMHandlerFactory
 from .analysis_handler import AnalysisHandler
+from .consensus_detector import ConsensusDetector
+from .fast_analysis_handler import FastAnalysisHandler
+from .tournament_analysis_handler import TournamentAnalysisHandler
+from .judge_ensemble_handler import JudgeEnsembleHandler
+from .analysis_cache import AnalysisCache
+from .model_router import ModelRouter
+from .cascade_handler import CascadeHandler
+from .key_questions import KeyQuestionsPipeline
+from .prompt_templates import PromptTemplate, PromptRegistry, templates
+from .cost_estimator import CostEstimator
+from .latency_model import LatencyModel
+from .key_pool import KeyPool, KeyPoolManager
+from .rate_limiter import RateLimiter, RateLimitExceeded, LocalRateLimitBackend, FirebaseRateLimitBackend
+from .provider_guard import ProviderGuard
 
 __all__ = [
     'DeepseekHandler',
@@ -11,5 +25,25 @@ __all__ = [
     'GeminiHandler',
     'OpenAIChatHandler',
     'LLMHandlerFactory',
-    'AnalysisHandler'
+    'AnalysisHandler',
+    'ConsensusDetector',
+    'FastAnalysisHandler',
+    'TournamentAnalysisHandler',
+    'JudgeEnsembleHandler',
+    'AnalysisCache',
+    'ModelRouter',
+    'CascadeHandler',
+    'KeyQuestionsPipeline',
+    'PromptTemplate',
+    'PromptRegistry',
+    'templates',
+    'CostEstimator',
+    'LatencyModel',
+    'KeyPool',
+    'KeyPoolManager',
+    'RateLimiter',
+    'RateLimitExceeded',
+    'LocalRateLimitBackend',
+    'FirebaseRateLimitBackend',
+    'ProviderGuard'
 ] 
\ No newline at end of file
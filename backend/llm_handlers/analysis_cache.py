@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from .response_utils import answer_text
+
+logger = logging.getLogger(__name__)
+
+MessageKey = Tuple[str, str]
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache for analysis results with single-flight loading.
+
+    Entries are keyed by a hash of the analysis mode, the question and the
+    canonicalised response set, so identical re-analysis requests are served
+    from memory and concurrent requests for the same key share one upstream
+    call. Each message remembers the fingerprint of the content it was analysed
+    with; when a provider response for that message changes (or the message is
+    explicitly invalidated) its stale entries are dropped.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._message_keys: Dict[MessageKey, Tuple[str, Set[str]]] = {}
+        self._key_messages: Dict[str, Set[MessageKey]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(question: str, responses: Dict[str, Any]) -> str:
+        """Hash the question and canonicalised responses."""
+        canonical = json.dumps(
+            {
+                "question": (question or "").strip(),
+                "responses": {
+                    model.lower(): answer_text(value).strip()
+                    for model, value in (responses or {}).items()
+                }
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    @classmethod
+    def make_key(cls, question: str, responses: Dict[str, Any], mode: str = "llm") -> str:
+        """Cache key for one analysis mode over the given content."""
+        return f"{mode}:{cls.fingerprint(question, responses)}"
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self._forget(key)
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key: str, result: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._forget(evicted)
+
+    def _forget(self, key: str) -> None:
+        """Drop a key that left the cache from the messages tracking it."""
+        for message in self._key_messages.pop(key, ()):
+            current = self._message_keys.get(message)
+            if current is None:
+                continue
+            current[1].discard(key)
+            if not current[1]:
+                del self._message_keys[message]
+
+    def _track(self, message: Optional[MessageKey], fingerprint: str, key: str) -> None:
+        if message is None:
+            return
+        current = self._message_keys.get(message)
+        if current and current[0] != fingerprint:
+            # The message's responses changed since it was last analysed
+            self.invalidate(*message)
+            current = None
+        if current is None:
+            current = self._message_keys[message] = (fingerprint, set())
+        current[1].add(key)
+        self._key_messages.setdefault(key, set()).add(message)
+
+    def _is_current(self, message: Optional[MessageKey], fingerprint: str) -> bool:
+        if message is None:
+            return True
+        current = self._message_keys.get(message)
+        return current is not None and current[0] == fingerprint
+
+    def invalidate(self, user_id: str, message_id: str) -> None:
+        """Drop every cached analysis of a message whose responses were rewritten."""
+        message = (user_id, message_id)
+        current = self._message_keys.pop(message, None)
+        if current:
+            for key in current[1]:
+                self._entries.pop(key, None)
+                messages = self._key_messages.get(key)
+                if messages is not None:
+                    messages.discard(message)
+                    if not messages:
+                        del self._key_messages[key]
+
+    async def get_or_compute(self, question: str, responses: Dict[str, Any],
+                             compute: Callable[[], Awaitable[Dict[str, Any]]],
+                             mode: str = "llm",
+                             message: Optional[MessageKey] = None) -> Dict[str, Any]:
+        """
+        Return the cached analysis or run ``compute`` once for all concurrent callers.
+
+        Results carrying an ``error`` are returned but never cached.
+        """
+        fingerprint = self.fingerprint(question, responses)
+        key = f"{mode}:{fingerprint}"
+        self._track(message, fingerprint, key)
+
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+
+            def _finish(done: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if (done.cancelled() or done.exception() is not None
+                        or not self._is_current(message, fingerprint)  # invalidated or superseded meanwhile
+                        or "error" in done.result()):
+                    if key not in self._entries:
+                        self._forget(key)
+                    return
+                self._put(key, done.result())
+
+            task.add_done_callback(_finish)
+        else:
+            logger.info(f"Coalescing analysis request for {key}")
+
+        # Shield so a disconnecting caller does not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Current size and hit/miss counters."""
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -1,15 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Mapping, Optional
 import logging
 
 class BaseLLMHandler(ABC):
     def __init__(self, api_key: str):
         self.api_key = api_key
+        self.key_pool = None  # set by the factory when the key came from a KeyPool
         self.logger = logging.getLogger(self.__class__.__name__)
 
     @abstractmethod
     async def generate_response(self, prompt: str, **kwargs) -> str:
-        """Generate a response from the LLM."""
+        """
+        Generate a response from the LLM.
+
+        Handlers honour ``system`` (system prompt), ``max_tokens`` and ``temperature``.
+        """
         pass
 
     @abstractmethod
@@ -17,6 +22,25 @@ class BaseLLMHandler(ABC):
         """Validate the API key by making a test request."""
         pass
 
+    def _report_rate_limits(self, status: Optional[int] = None,
+                            headers: Optional[Mapping[str, Any]] = None) -> None:
+        """Feed a response's status and x-ratelimit-* headers back to the key pool."""
+        if self.key_pool is not None:
+            self.key_pool.observe(self.api_key, status, headers)
+            if status == 429:
+                # The key cools down; a retry goes out on the pool's next choice
+                self._use_key(self.key_pool.acquire())
+
+    def _use_key(self, api_key: str) -> None:
+        """Switch to another API key; handlers rebind their clients to it."""
+        self.api_key = api_key
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+        """Chat messages for a prompt, led by the system prompt when there is one."""
+        messages = [{"role": "system", "content": system}] if system else []
+        return messages + [{"role": "user", "content": prompt}]
+
     def _handle_error(self, error: Exception) -> str:
         """Handle errors in a consistent way across all handlers."""
         error_message = str(error)
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base_handler import BaseLLMHandler
+from .consensus_detector import ConsensusDetector
+from .response_utils import is_error, tokenize
+
+logger = logging.getLogger(__name__)
+
+_REFUSAL_RE = re.compile(
+    r"\b(?:i(?:'m| am) (?:sorry|unable|not able)|i can(?:'t|not) (?:help|assist|provide|answer)|"
+    r"as an ai(?: language model)?|i don't have (?:access|enough information))\b",
+    re.IGNORECASE
+)
+
+ResponseCall = Callable[..., Awaitable[str]]
+
+
+class CascadeHandler:
+    """
+    Cheap-first execution: ask one fast model, escalate only when unsure.
+
+    The fast model's first answer is the candidate. Errors and refusals
+    escalate straight away; otherwise ``samples - 1`` extra samples are drawn
+    and the confidence is their agreement with the first answer (mean TF-IDF
+    cosine similarity, divided by ``agreement`` and capped at 1), scaled
+    down for answers shorter than ``min_words``. Independent paraphrases of
+    the same answer score a cosine of roughly 0.25 to 0.3, and answers that
+    contradict each other score about 0.1, so ``agreement`` is the
+    similarity that counts as full agreement. When the confidence is below
+    ``threshold`` the remaining handlers are called exactly as a normal
+    fan-out would call them, and the combined responses go through the usual
+    analysis flow.
+    """
+
+    def __init__(self, fast_model: str = "gemini", threshold: float = 0.6, samples: int = 2,
+                 min_words: int = 40, agreement: float = 0.25,
+                 consensus_detector: Optional[ConsensusDetector] = None):
+        self.fast_model = fast_model.lower()
+        self.threshold = threshold
+        self.samples = max(samples, 1)
+        self.min_words = min_words
+        self.agreement = agreement
+        self.consensus_detector = consensus_detector or ConsensusDetector()
+
+    def score(self, samples: List[str]) -> Dict[str, Any]:
+        """Confidence in the first sample, with the signals it was derived from."""
+        answer = samples[0]
+        if is_error(answer):
+            return {"confidence": 0.0, "reason": "error"}
+        if _REFUSAL_RE.search(answer):
+            return {"confidence": 0.0, "reason": "refusal"}
+
+        signals = {"length": min(len(tokenize(answer)) / self.min_words, 1.0)}
+        confidence = signals["length"]
+        others = [sample for sample in samples[1:] if not is_error(sample)]
+        if others:
+            similarity = self.consensus_detector.similarity_matrix([answer] + others)
+            signals["consistency"] = round(float(np.mean(similarity[0, 1:])), 4)
+            confidence *= min(signals["consistency"] / self.agreement, 1.0)
+        return dict(signals, confidence=round(confidence, 4))
+
+    async def run(self, handlers: Dict[str, BaseLLMHandler],
+                  call: ResponseCall) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        Answer cheap-first.
+
+        ``call`` is the normal guarded per-handler call; extra
+        self-consistency samples go through it too, with ``sample=True`` so
+        they are not published as answers. They are skipped only when the
+        first answer is an error or a refusal. Returns the responses by model
+        and a description of the cascade decision.
+        """
+        start = time.perf_counter()
+        fast = self.fast_model if self.fast_model in handlers else next(iter(handlers))
+        first = await call(fast, handlers[fast])
+        extra = []
+        if self.samples > 1 and "reason" not in self.score([first]):
+            extra = await asyncio.gather(*[
+                call(fast, handlers[fast], sample=True) for _ in range(self.samples - 1)
+            ])
+        scored = self.score([first] + list(extra))
+        responses = {fast: first}
+
+        rest = {model: handler for model, handler in handlers.items() if model != fast}
+        escalated = scored["confidence"] < self.threshold and bool(rest)
+        if escalated:
+            logger.info(f"Cascade escalating past {fast} (confidence {scored['confidence']})")
+            answers = await asyncio.gather(*[call(model, handler) for model, handler in rest.items()])
+            responses.update(zip(rest, answers))
+
+        return responses, {
+            "fastModel": fast,
+            "escalated": escalated,
+            "score": scored,
+            "samples": 1 + len(extra),
+            "latencyMs": round((time.perf_counter() - start) * 1000, 2)
+        }
@@ -0,0 +1,112 @@
+import logging
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .response_utils import split_sentences, tokenize, valid_answers
+
+logger = logging.getLogger(__name__)
+
+
+class ConsensusDetector:
+    """
+    CPU-only pre-analysis stage that detects when provider answers agree.
+
+    Answers are embedded as hashed unigram/bigram TF-IDF vectors, compared with
+    a pairwise cosine similarity matrix, and when the mean agreement clears the
+    threshold the summary and best model are derived locally instead of paying
+    for an upstream analysis call.
+    """
+
+    def __init__(self, threshold: float = 0.85, n_features: int = 1 << 14,
+                 min_answers: int = 2, summary_sentences: int = 5):
+        self.threshold = threshold
+        self.n_features = n_features
+        self.min_answers = min_answers
+        self.summary_sentences = summary_sentences
+
+    def _hash_tokens(self, text: str) -> np.ndarray:
+        tokens = tokenize(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams),
+            dtype=np.int64,
+            count=len(grams)
+        )
+
+    def _term_counts(self, texts: List[str]) -> np.ndarray:
+        counts = np.zeros((len(texts), self.n_features), dtype=np.float64)
+        for row, text in enumerate(texts):
+            indices = self._hash_tokens(text)
+            if indices.size:
+                counts[row] = np.bincount(indices, minlength=self.n_features)
+        return counts
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def vectorize(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return L2-normalised TF-IDF vectors (one row per text) and the IDF weights."""
+        counts = self._term_counts(texts)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0
+        tf = np.log1p(counts)
+        return self._normalize(tf * idf), idf
+
+    def similarity_matrix(self, texts: List[str]) -> np.ndarray:
+        """Pairwise cosine similarity between the given texts."""
+        vectors, _ = self.vectorize(texts)
+        return vectors @ vectors.T
+
+    def _summarize(self, text: str, centroid: np.ndarray, idf: np.ndarray) -> str:
+        sentences = split_sentences(text)
+        if len(sentences) <= self.summary_sentences:
+            return text.strip()
+        sentence_vectors = self._normalize(np.log1p(self._term_counts(sentences)) * idf)
+        scores = sentence_vectors @ centroid
+        keep = np.sort(np.argsort(-scores, kind="stable")[:self.summary_sentences])
+        return " ".join(sentences[i] for i in keep)
+
+    def detect(self, responses: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Return a locally derived analysis when the answers agree, else None.
+        """
+        answers = valid_answers(responses)
+        if len(answers) < self.min_answers:
+            return None
+
+        models = list(answers.keys())
+        texts = [answers[model] for model in models]
+        vectors, idf = self.vectorize(texts)
+        similarity = vectors @ vectors.T
+
+        n = len(models)
+        off_diagonal = ~np.eye(n, dtype=bool)
+        agreement = similarity[off_diagonal].reshape(n, n - 1).mean(axis=1)
+        consensus = float(agreement.mean())
+        logger.info(f"Consensus score {consensus:.3f} across {n} responses")
+
+        if consensus < self.threshold:
+            return None
+
+        best_index = int(np.argmax(agreement))
+        best_model = models[best_index]
+        centroid = self._normalize(vectors.mean(axis=0, keepdims=True))[0]
+
+        return {
+            "summary": self._summarize(texts[best_index], centroid, idf),
+            "bestModel": best_model,
+            "explanation": (
+                f"All {n} models gave near-identical answers (mean similarity "
+                f"{consensus:.2f}); {best_model}'s answer is the most representative."
+            ),
+            "source": "local",
+            "consensus": round(consensus, 4),
+            "agreement": {
+                model: round(float(score), 4) for model, score in zip(models, agreement)
+            }
+        }
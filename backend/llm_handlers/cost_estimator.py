@@ -0,0 +1,178 @@
+import logging
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from .prompt_templates import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # optional: the calibrated heuristic is used instead
+    tiktoken = None
+
+ENCODINGS = {
+    'openai': 'cl100k_base',
+    'grok': 'cl100k_base',
+    'deepseek': 'cl100k_base'
+}
+
+# Heuristic estimate -> provider tokens, measured against each provider's tokenizer on English prose
+CALIBRATION = {
+    'openai': 0.95,
+    'gemini': 0.9,
+    'grok': 0.95,
+    'deepseek': 1.0
+}
+
+# USD per million (prompt, completion) tokens
+PRICES = {
+    'openai': (10.0, 30.0),
+    'gemini': (1.25, 5.0),
+    'grok': (2.0, 10.0),
+    'deepseek': (0.27, 1.1)
+}
+
+# Effective output tokens per second (request overhead included) before any call was observed
+DEFAULT_TOKENS_PER_SECOND = {
+    'openai': 35.0,
+    'gemini': 60.0,
+    'grok': 45.0,
+    'deepseek': 25.0
+}
+FALLBACK_TOKENS_PER_SECOND = 30.0
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    return tiktoken.get_encoding(name)
+
+
+class CostEstimator:
+    """
+    Predicts prompt/completion tokens, latency and cost per provider before a fan-out.
+
+    Prompt tokens come from the provider's BPE encoding when ``tiktoken`` is
+    installed, otherwise from the local heuristic scaled by a per-provider
+    calibration factor; counts are cached per (model, text). Completion
+    length and effective throughput (completion tokens per second of wall
+    time) are learned per provider as moving averages of observed calls.
+    Providers are called concurrently, so a fan-out takes as long as its
+    slowest provider and costs the sum.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Sequence[float]]] = None,
+                 tokens_per_second: Optional[Dict[str, float]] = None,
+                 smoothing: float = 0.1, max_cached: int = 4096):
+        self.prices = dict(PRICES, **(prices or {}))
+        self.tokens_per_second = dict(DEFAULT_TOKENS_PER_SECOND, **(tokens_per_second or {}))
+        self.smoothing = smoothing
+        self.max_cached = max_cached
+        self.completion_tokens: Dict[str, float] = {}
+        self.observed: Dict[str, int] = {}
+        self._counts: "OrderedDict[tuple, int]" = OrderedDict()
+
+    def count_tokens(self, model: str, text: str) -> int:
+        """Token count of ``text`` for a provider's model."""
+        model = (model or "").lower()
+        key = (model, text)
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            return count
+        encoding = ENCODINGS.get(model)
+        if tiktoken is not None and encoding:
+            count = len(_encoding(encoding).encode(text, disallowed_special=()))
+        else:
+            count = math.ceil(estimate_tokens(text) * CALIBRATION.get(model, 1.0))
+        self._counts[key] = count
+        while len(self._counts) > self.max_cached:
+            self._counts.popitem(last=False)
+        return count
+
+    def record(self, model: str, response: str, latency: float) -> None:
+        """Fold one successful call into the provider's completion length and throughput."""
+        model = (model or "").lower()
+        tokens = self.count_tokens(model, response)
+        if not tokens or latency <= 0:
+            return
+        throughput = tokens / latency
+        if model in self.completion_tokens:
+            self.completion_tokens[model] += self.smoothing * (tokens - self.completion_tokens[model])
+            current = self.tokens_per_second[model]
+            self.tokens_per_second[model] = current + self.smoothing * (throughput - current)
+        else:
+            self.completion_tokens[model] = float(tokens)
+            self.tokens_per_second[model] = throughput
+        self.observed[model] = self.observed.get(model, 0) + 1
+
+    def estimate(self, model: str, prompt: str, max_tokens: int = 1000,
+                 system: Optional[str] = None) -> Dict[str, Any]:
+        """Predicted tokens, latency (seconds) and cost (USD) of one call."""
+        model = (model or "").lower()
+        prompt_tokens = self.count_tokens(model, prompt) + (self.count_tokens(model, system) if system else 0)
+        completion_tokens = min(round(self.completion_tokens.get(model, max_tokens)), max_tokens)
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        throughput = self.tokens_per_second.get(model, FALLBACK_TOKENS_PER_SECOND)
+        return {
+            "promptTokens": prompt_tokens,
+            "completionTokens": completion_tokens,
+            "latency": round(completion_tokens / throughput, 2),
+            "cost": round((prompt_tokens * input_price + completion_tokens * output_price) / 1e6, 6)
+        }
+
+    def estimate_fan_out(self, models: Sequence[str], prompt: str, max_tokens: int = 1000,
+                         systems: Optional[Dict[str, Optional[str]]] = None,
+                         prompts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Per-provider estimates plus the fan-out's ``estimatedTime`` and total cost.
+
+        ``systems`` and ``prompts`` give a provider its own system prompt and
+        rendered prompt; others are estimated from ``prompt`` alone.
+        """
+        systems, prompts = systems or {}, prompts or {}
+        per_model = {
+            model: self.estimate(model, prompts.get(model, prompt), max_tokens, systems.get(model))
+            for model in models
+        }
+        return {
+            "models": per_model,
+            "estimatedTime": max((entry["latency"] for entry in per_model.values()), default=0.0),
+            "cost": round(sum(entry["cost"] for entry in per_model.values()), 6)
+        }
+
+    @staticmethod
+    def admit(estimate: Dict[str, Any], max_cost: Optional[float] = None,
+              max_time: Optional[float] = None) -> List[str]:
+        """
+        The providers a fan-out may call within a cost and latency budget.
+
+        Providers predicted to exceed ``max_time`` are dropped, then the most
+        expensive ones until the total fits ``max_cost``. The fastest (and then
+        cheapest) provider is always kept so a request is never left empty.
+        """
+        per_model = estimate["models"]
+        if not per_model:
+            return []
+        fallback = min(per_model, key=lambda model: (per_model[model]["latency"], per_model[model]["cost"]))
+        admitted = [model for model in per_model
+                    if max_time is None or per_model[model]["latency"] <= max_time]
+        if max_cost is not None:
+            for model in sorted(admitted, key=lambda model: per_model[model]["cost"], reverse=True):
+                if sum(per_model[name]["cost"] for name in admitted) <= max_cost:
+                    break
+                admitted.remove(model)
+        return admitted or [fallback]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Learned completion length and throughput per provider."""
+        return {
+            model: {
+                "observed": self.observed.get(model, 0),
+                "completionTokens": round(self.completion_tokens[model], 1) if model in self.completion_tokens else None,
+                "tokensPerSecond": round(self.tokens_per_second[model], 2)
+            }
+            for model in self.tokens_per_second
+        }
@@ -1,6 +1,7 @@
 import aiohttp
 from typing import Dict, Any
 from .base_handler import BaseLLMHandler
+from .prompt_templates import templates
 import logging
 import httpx
 import json
@@ -19,18 +20,24 @@ class DeepseekHandler(BaseLLMHandler):
         }
         self.client = httpx.AsyncClient(headers=self.headers)
 
+    def _use_key(self, api_key: str) -> None:
+        super()._use_key(api_key)
+        self.headers["Authorization"] = f"Bearer {api_key}"
+        self.client.headers["Authorization"] = f"Bearer {api_key}"
+
     async def generate_response(self, prompt: str, **kwargs) -> str:
         try:
             logger.info("Starting Deepseek response generation")
             async with aiohttp.ClientSession() as session:
                 payload = {
                     "model": "deepseek-chat",
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": self._messages(prompt, kwargs.get("system")),
                     "temperature": kwargs.get("temperature", 0.7),
                     "max_tokens": kwargs.get("max_tokens", 1000)
                 }
                 
                 async with session.post(self.base_url, headers=self.headers, json=payload) as response:
+                    self._report_rate_limits(response.status, response.headers)
                     if response.status != 200:
                         error_text = await response.text()
                         raise Exception(f"API request failed with status {response.status}: {error_text}")
@@ -70,25 +77,17 @@ class DeepseekHandler(BaseLLMHandler):
     async def get_response(self, user_input: str) -> str:
         """Get response from Deepseek API"""
         try:
-            prompt = f"""Before answering this question: "{user_input}", think about the three most important questions that you need to understand to understand the deepness of the initial question.
-
-Then, provide a 300-word answer in the most concise way.
-
-Your response should be structured as follows:
-1. First, list the three key questions you identified
-2. Then, provide your concise 300-word answer
-
-Remember to be precise and focused in your response."""
+            rendered = templates.render("answer", model="deepseek", user_input=user_input)
 
             async with aiohttp.ClientSession() as session:
                 payload = {
                     "model": self.model_name,
                     "messages": [
-                        {"role": "system", "content": "You are a helpful AI assistant that provides thoughtful, concise responses."},
-                        {"role": "user", "content": prompt}
+                        {"role": "system", "content": rendered.system},
+                        {"role": "user", "content": rendered.prompt}
                     ],
                     "temperature": 0.7,
-                    "max_tokens": 1000
+                    "max_tokens": rendered.max_tokens
                 }
                 
                 async with session.post(
@@ -0,0 +1,145 @@
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .consensus_detector import ConsensusDetector
+from .response_utils import split_sentences, tokenize, valid_answers
+
+logger = logging.getLogger(__name__)
+
+# Numbered or bulleted lines ending in a question mark, i.e. the "three key
+# questions" the get_response prompt asks every model to list first.
+_KEY_QUESTION_RE = re.compile(r"^[ \t]*(?:\d+[.)]|[-*•])?[ \t]*\S.*\?[ \t*]*$", re.MULTILINE)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+FEATURES = ("relevance", "structure", "length", "redundancy")
+
+
+class FastAnalysisHandler:
+    """
+    No-LLM analysis tier that ranks provider answers in milliseconds.
+
+    Each answer gets a feature vector (BM25 relevance to the question, coverage
+    of the three-key-questions structure, closeness to the 300-word target and
+    redundancy against the other answers); the weighted sum ranks the answers.
+    Returns the same summary/bestModel schema as AnalysisHandler.
+    """
+
+    default_weights = {
+        "relevance": 0.4,
+        "structure": 0.25,
+        "length": 0.2,
+        "redundancy": -0.15
+    }
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, target_words: int = 300,
+                 key_questions: int = 3, summary_sentences: int = 5,
+                 k1: float = 1.5, b: float = 0.75):
+        self.weights = np.array([(weights or self.default_weights)[name] for name in FEATURES])
+        self.target_words = target_words
+        self.key_questions = key_questions
+        self.summary_sentences = summary_sentences
+        self.k1 = k1
+        self.b = b
+        self.consensus_detector = ConsensusDetector()
+
+    def _bm25(self, question: str, documents: List[List[str]]) -> np.ndarray:
+        terms = sorted({t for t in tokenize(question) if t not in _STOPWORDS})
+        if not terms:
+            return np.zeros(len(documents))
+        term_counts = [Counter(doc) for doc in documents]
+        counts = np.array(
+            [[tc[term] for term in terms] for tc in term_counts],
+            dtype=np.float64
+        )
+        doc_len = np.array([len(doc) for doc in documents], dtype=np.float64)
+        avg_len = doc_len.mean() or 1.0
+        n = len(documents)
+        df = np.count_nonzero(counts, axis=0)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avg_len)
+        tf = counts * (self.k1 + 1.0) / (counts + norm[:, None])
+        scores = tf @ idf
+        top = scores.max()
+        return scores / top if top > 0 else scores
+
+    def _structure(self, texts: List[str]) -> np.ndarray:
+        found = np.array([len(_KEY_QUESTION_RE.findall(text)) for text in texts], dtype=np.float64)
+        return np.minimum(found, self.key_questions) / self.key_questions
+
+    def _length(self, documents: List[List[str]]) -> np.ndarray:
+        words = np.array([len(doc) for doc in documents], dtype=np.float64)
+        return np.clip(1.0 - np.abs(words - self.target_words) / self.target_words, 0.0, 1.0)
+
+    def _redundancy(self, texts: List[str]) -> np.ndarray:
+        n = len(texts)
+        if n < 2:
+            return np.zeros(n)
+        similarity = self.consensus_detector.similarity_matrix(texts)
+        return (similarity.sum(axis=1) - similarity.diagonal()) / (n - 1)
+
+    def feature_matrix(self, question: str, texts: List[str]) -> np.ndarray:
+        """Return the (answers x features) matrix in FEATURES order."""
+        documents = [tokenize(text) for text in texts]
+        return np.column_stack([
+            self._bm25(question, documents),
+            self._structure(texts),
+            self._length(documents),
+            self._redundancy(texts)
+        ])
+
+    def summarize(self, text: str) -> str:
+        """Extractive summary of an answer without its key-questions preamble."""
+        sentences = split_sentences(_KEY_QUESTION_RE.sub("", text))
+        return " ".join(sentences[:self.summary_sentences]) or text.strip()
+
+    async def analyze_responses(self, question: str, responses: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rank the responses locally and pick the best one.
+        """
+        started = time.perf_counter()
+        answers = valid_answers(responses)
+        if not answers:
+            return {
+                "error": "No valid responses to analyze",
+                "summary": "Analysis failed",
+                "bestModel": "unknown"
+            }
+
+        models = list(answers.keys())
+        texts = [answers[model] for model in models]
+        features = self.feature_matrix(question or "", texts)
+        scores = features @ self.weights
+        order = np.argsort(-scores, kind="stable")
+        best_model = models[order[0]]
+        best = dict(zip(FEATURES, features[order[0]].round(3).tolist()))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Fast analysis ranked {len(models)} responses in {elapsed_ms:.1f}ms")
+
+        return {
+            "summary": self.summarize(answers[best_model]),
+            "bestModel": best_model,
+            "explanation": (
+                f"{best_model} ranked highest on local features: relevance {best['relevance']}, "
+                f"structure {best['structure']}, length {best['length']}, "
+                f"redundancy {best['redundancy']}."
+            ),
+            "source": "fast",
+            "ranking": [
+                {
+                    "model": models[i],
+                    "score": round(float(scores[i]), 4),
+                    "features": dict(zip(FEATURES, features[i].round(4).tolist()))
+                }
+                for i in order
+            ],
+            "elapsedMs": round(elapsed_ms, 2)
+        }
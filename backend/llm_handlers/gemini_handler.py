@@ -1,6 +1,8 @@
 import google.generativeai as genai
-from typing import Dict, Any
+from google.ai import generativelanguage as glm
+from typing import Dict, Any, Optional
 from .base_handler import BaseLLMHandler
+from .prompt_templates import templates
 import logging
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -11,11 +13,23 @@ logger = logging.getLogger(__name__)
 class GeminiHandler(BaseLLMHandler):
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        genai.configure(api_key=self.api_key)
         self.model_name = 'gemini-1.5-pro'
-        self.model = genai.GenerativeModel(self.model_name)
+        self.client = None  # built on first use, inside the event loop
         self.logger = logging.getLogger(__name__)
 
+    def _use_key(self, api_key: str) -> None:
+        super()._use_key(api_key)
+        self.client = None
+
+    def _model(self, system: Optional[str] = None) -> genai.GenerativeModel:
+        """A model bound to this handler's own key."""
+        if self.client is None:
+            self.client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self.api_key})
+        model = genai.GenerativeModel(self.model_name, system_instruction=system)
+        # genai.configure() is process-wide, so concurrent handlers would share the last key set
+        model._async_client = self.client
+        return model
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -23,7 +37,7 @@ class GeminiHandler(BaseLLMHandler):
     )
     async def _make_request(self, prompt: str, **kwargs) -> str:
         try:
-            response = await self.model.generate_content_async(
+            response = await self._model(kwargs.get("system")).generate_content_async(
                 prompt,
                 generation_config={
                     "temperature": kwargs.get("temperature", 0.7),
@@ -41,6 +55,9 @@ class GeminiHandler(BaseLLMHandler):
                 
             return response.candidates[0].content.parts[0].text
         except Exception as e:
+            # The SDK hides response headers; a quota error still cools the key down
+            if getattr(e, "code", None) == 429:
+                self._report_rate_limits(429)
             self.logger.error(f"Gemini API request error: {str(e)}")
             raise
 
@@ -65,7 +82,6 @@ class GeminiHandler(BaseLLMHandler):
     async def validate_api_key(self) -> bool:
         try:
             self.logger.info("Validating Gemini API key")
-            genai.configure(api_key=self.api_key)
             
             try:
                 await self._make_request("Test")
@@ -82,17 +98,12 @@ class GeminiHandler(BaseLLMHandler):
     async def get_response(self, user_input: str) -> str:
         """Get response from Gemini API"""
         try:
-            prompt = f"""Before answering this question: "{user_input}", think about the three most important questions that you need to understand to understand the deepness of the initial question.
-
-Then, provide a 300-word answer in the most concise way.
+            rendered = templates.render("answer", model="gemini", user_input=user_input)
 
-Your response should be structured as follows:
-1. First, list the three key questions you identified
-2. Then, provide your concise 300-word answer
-
-Remember to be precise and focused in your response."""
-
-            response = await self.model.generate_content_async(prompt)
+            response = await self._model(rendered.system).generate_content_async(
+                rendered.prompt,
+                generation_config={"max_output_tokens": rendered.max_tokens}
+            )
             return response.text
         except Exception as e:
             logger.error(f"Error in GeminiHandler: {str(e)}")
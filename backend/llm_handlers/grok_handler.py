@@ -1,6 +1,7 @@
 import aiohttp
 from typing import Dict, Any
 from .base_handler import BaseLLMHandler
+from .prompt_templates import templates
 import logging
 import ssl
 import httpx
@@ -9,6 +10,8 @@ import json
 # Configure logger
 logger = logging.getLogger(__name__)
 
+GROK_PERSONA = "You are Grok, a chatbot inspired by the Hitchhikers Guide to the Galaxy."
+
 class GrokHandler(BaseLLMHandler):
     def __init__(self, api_key: str):
         super().__init__(api_key)
@@ -24,28 +27,25 @@ class GrokHandler(BaseLLMHandler):
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
 
+    def _use_key(self, api_key: str) -> None:
+        super()._use_key(api_key)
+        self.headers["Authorization"] = f"Bearer {api_key}"
+        self.client.headers["Authorization"] = f"Bearer {api_key}"
+
     async def generate_response(self, prompt: str, **kwargs) -> str:
         try:
             connector = aiohttp.TCPConnector(ssl=self.ssl_context)
             async with aiohttp.ClientSession(connector=connector) as session:
                 payload = {
                     "model": "grok-2-latest",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are Grok, a chatbot inspired by the Hitchhikers Guide to the Galaxy."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
+                    "messages": self._messages(prompt, kwargs.get("system") or GROK_PERSONA),
                     "temperature": kwargs.get("temperature", 0.7),
                     "max_tokens": kwargs.get("max_tokens", 1000),
                     "stream": False
                 }
                 
                 async with session.post(self.base_url, headers=self.headers, json=payload) as response:
+                    self._report_rate_limits(response.status, response.headers)
                     if response.status != 200:
                         error_text = await response.text()
                         raise Exception(f"API request failed with status {response.status}: {error_text}")
@@ -65,7 +65,7 @@ class GrokHandler(BaseLLMHandler):
                     "messages": [
                         {
                             "role": "system",
-                            "content": "You are Grok, a chatbot inspired by the Hitchhikers Guide to the Galaxy."
+                            "content": GROK_PERSONA
                         },
                         {
                             "role": "user",
@@ -89,26 +89,18 @@ class GrokHandler(BaseLLMHandler):
     async def get_response(self, user_input: str) -> str:
         """Get response from Grok API"""
         try:
-            prompt = f"""Before answering this question: "{user_input}", think about the three most important questions that you need to understand to understand the deepness of the initial question.
-
-Then, provide a 300-word answer in the most concise way.
-
-Your response should be structured as follows:
-1. First, list the three key questions you identified
-2. Then, provide your concise 300-word answer
-
-Remember to be precise and focused in your response."""
+            rendered = templates.render("answer", model="grok", user_input=user_input)
 
             connector = aiohttp.TCPConnector(ssl=self.ssl_context)
             async with aiohttp.ClientSession(connector=connector) as session:
                 payload = {
                     "model": self.model_name,
                     "messages": [
-                        {"role": "system", "content": "You are a helpful AI assistant that provides thoughtful, concise responses."},
-                        {"role": "user", "content": prompt}
+                        {"role": "system", "content": rendered.system},
+                        {"role": "user", "content": rendered.prompt}
                     ],
                     "temperature": 0.7,
-                    "max_tokens": 1000,
+                    "max_tokens": rendered.max_tokens,
                     "stream": False
                 }
                 
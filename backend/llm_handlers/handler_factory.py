@@ -1,9 +1,11 @@
-from typing import Dict, Type
+import os
+from typing import Dict, Optional, Type
 from .base_handler import BaseLLMHandler
 from .deepseek_handler import DeepseekHandler
 from .grok_handler import GrokHandler
 from .gemini_handler import GeminiHandler
 from .openai_handler import OpenAIChatHandler
+from .key_pool import KeyPoolManager
 
 class LLMHandlerFactory:
     _handlers: Dict[str, Type[BaseLLMHandler]] = {
@@ -13,13 +15,26 @@ class LLMHandlerFactory:
         "openai": OpenAIChatHandler
     }
 
+    # Keys are drawn from here when get_handler is called without one
+    key_pools: Optional[KeyPoolManager] = None
+
     @classmethod
-    def get_handler(cls, model_name: str, api_key: str) -> BaseLLMHandler:
-        """Get the appropriate handler for the specified model."""
+    def get_handler(cls, model_name: str, api_key: Optional[str] = None) -> BaseLLMHandler:
+        """
+        Get the appropriate handler for the specified model.
+
+        Without an explicit key the least-loaded key of the model's pool is
+        used, falling back to the <MODEL>_API_KEY environment variable.
+        """
         handler_class = cls._handlers.get(model_name.lower())
         if not handler_class:
             raise ValueError(f"No handler found for model: {model_name}")
-        return handler_class(api_key)
+        pool = cls.key_pools.get(model_name) if cls.key_pools is not None and api_key is None else None
+        if pool is not None:
+            handler = handler_class(pool.acquire())
+            handler.key_pool = pool
+            return handler
+        return handler_class(api_key or os.getenv(f"{model_name.upper()}_API_KEY"))
 
     @classmethod
     def get_available_models(cls) -> list:
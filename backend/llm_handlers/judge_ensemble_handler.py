@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .analysis_handler import AnalysisHandler, ANALYSIS_SYSTEM_PROMPT, VALID_MODELS
+from .base_handler import BaseLLMHandler
+from .consensus_detector import ConsensusDetector
+from .handler_factory import LLMHandlerFactory
+from .prompt_templates import RenderedPrompt, templates
+from .provider_guard import ProviderGuard
+from .response_utils import is_error
+
+logger = logging.getLogger(__name__)
+
+
+class JudgeEnsembleHandler(AnalysisHandler):
+    """
+    Analysis by an ensemble of LLM judges voting on the best model.
+
+    Every judge gets the same analysis prompt concurrently. As soon as one model
+    holds a strict majority of the ensemble's votes the remaining judges are
+    cancelled; otherwise the plurality wins once all judges have answered.
+    Votes, the winning margin and per-judge latency are returned with the result.
+    Judge calls go through ``guard``, so they share the answers' rate limits
+    and adaptive timeouts.
+    """
+
+    def __init__(self, judges: Optional[Dict[str, BaseLLMHandler]] = None,
+                 consensus_detector: Optional[ConsensusDetector] = None,
+                 guard: Optional[ProviderGuard] = None):
+        super().__init__(consensus_detector, guard)
+        self.judges = judges if judges is not None else self._default_judges(
+            LLMHandlerFactory.get_available_models()
+        )
+        if not self.judges:
+            raise ValueError("At least one judge is required")
+
+    @staticmethod
+    def _default_judges(names: List[str]) -> Dict[str, BaseLLMHandler]:
+        return {
+            name.lower(): LLMHandlerFactory.get_handler(name)
+            for name in names
+        }
+
+    @classmethod
+    def from_names(cls, names: List[str], guard: Optional[ProviderGuard] = None) -> "JudgeEnsembleHandler":
+        """Build an ensemble from a subset of the factory's handler names."""
+        return cls(judges=cls._default_judges(names), guard=guard)
+
+    async def _judge(self, name: str, handler: BaseLLMHandler, prompt: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        fitted = templates.fit(name, prompt, 1000, ANALYSIS_SYSTEM_PROMPT)
+        content = await self.guard.call(
+            name,
+            handler,
+            RenderedPrompt(ANALYSIS_SYSTEM_PROMPT, fitted, 1000),
+            routed=False,
+            temperature=0.3
+        )
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        if is_error(content):
+            return {"judge": name, "status": "failed", "error": content, "latencyMs": latency_ms}
+        try:
+            summary, best_model, explanation = self._parse_sections(content, VALID_MODELS)
+        except ValueError as e:
+            return {"judge": name, "status": "failed", "error": str(e), "latencyMs": latency_ms}
+        return {
+            "judge": name,
+            "status": "voted",
+            "vote": best_model,
+            "summary": summary,
+            "explanation": explanation,
+            "latencyMs": latency_ms
+        }
+
+    async def analyze_responses(self, question: str, responses: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Let the judges vote on the best response, stopping early on a majority.
+        """
+        try:
+            local_analysis = self.consensus_detector.detect(responses)
+            if local_analysis:
+                return local_analysis
+
+            prompt = self._build_prompt(question, responses)
+            majority = len(self.judges) // 2 + 1
+            started = time.perf_counter()
+            tasks = [
+                asyncio.create_task(self._judge(name, handler, prompt))
+                for name, handler in self.judges.items()
+            ]
+
+            votes = Counter()
+            verdicts = {}
+            judge_stats = {}
+            early_stop = False
+            try:
+                for next_verdict in asyncio.as_completed(tasks):
+                    try:
+                        verdict = await next_verdict
+                    except Exception as e:
+                        logger.error(f"Judge failed: {str(e)}")
+                        continue
+                    judge_stats[verdict["judge"]] = {
+                        key: verdict[key] for key in ("status", "vote", "error", "latencyMs") if key in verdict
+                    }
+                    if verdict["status"] != "voted":
+                        continue
+                    votes[verdict["vote"]] += 1
+                    verdicts.setdefault(verdict["vote"], verdict)
+                    if votes[verdict["vote"]] >= majority:
+                        early_stop = len(judge_stats) < len(tasks)
+                        break
+            finally:
+                pending = [task for task in tasks if not task.done()]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+            for name in self.judges:
+                judge_stats.setdefault(name, {"status": "cancelled", "latencyMs": elapsed_ms})
+
+            if not votes:
+                return {
+                    "error": "No judge returned a valid verdict",
+                    "summary": "Analysis failed",
+                    "bestModel": "unknown",
+                    "judges": judge_stats
+                }
+
+            # Counter.most_common keeps first-seen order on ties, so the earliest vote wins
+            ranked = votes.most_common()
+            best_model, best_votes = ranked[0]
+            runner_up_votes = ranked[1][1] if len(ranked) > 1 else 0
+            winner = verdicts[best_model]
+
+            return {
+                "summary": winner["summary"],
+                "bestModel": best_model,
+                "explanation": winner["explanation"],
+                "source": "ensemble",
+                "votes": dict(votes),
+                "voteMargin": best_votes - runner_up_votes,
+                "earlyStop": early_stop,
+                "judges": judge_stats,
+                "latencyMs": elapsed_ms
+            }
+
+        except Exception as e:
+            logger.error(f"Error in ensemble analysis: {str(e)}")
+            return {
+                "error": str(e),
+                "summary": "Analysis failed",
+                "bestModel": "unknown"
+            }
@@ -0,0 +1,189 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset value such as ``"20ms"``, ``"6m0s"`` or ``"1.5"``."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class KeyState:
+    """Rate-limit state of one API key, as last reported by the provider."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.limit_requests: Optional[int] = None
+        self.remaining_requests: Optional[int] = None
+        self.limit_tokens: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.since_report = 0
+        self.uses: deque = deque()
+        self.requests = 0
+        self.throttled = 0
+
+    def utilization(self, now: float, window: float, assumed_rpm: int) -> float:
+        """Fraction of the key's current rate-limit window already used."""
+        while self.uses and now - self.uses[0] > window:
+            self.uses.popleft()
+        if (self.limit_requests is None and self.limit_tokens is None) or now >= self.reset_at:
+            # No (or expired) provider report: judge by our own recent use
+            return len(self.uses) / assumed_rpm
+        used = []
+        if self.limit_requests:
+            used.append((self.limit_requests - self.remaining_requests + self.since_report) / self.limit_requests)
+        if self.limit_tokens:
+            used.append((self.limit_tokens - self.remaining_tokens) / self.limit_tokens)
+        return max(used, default=0.0)
+
+
+class KeyPool:
+    """
+    Several API keys for one provider, each with its own rate-limit state.
+
+    ``acquire()`` hands out the least-utilised key that is not cooling down.
+    Utilisation comes from the provider's ``x-ratelimit-*`` headers plus the
+    requests sent since they were reported, or from the key's requests in
+    the last ``window`` seconds when no report is current. A 429 (or a
+    report of zero remaining requests) puts the key on cooldown for the
+    provider's ``retry-after``/reset time, else ``cooldown`` seconds. When
+    every key is cooling the one that recovers first is used.
+    """
+
+    def __init__(self, provider: str, keys: Iterable[str], cooldown: float = 60.0,
+                 window: float = 60.0, assumed_rpm: int = 60):
+        self.provider = provider
+        self.cooldown = cooldown
+        self.window = window
+        self.assumed_rpm = assumed_rpm
+        self._keys: Dict[str, KeyState] = {key: KeyState(key) for key in dict.fromkeys(keys) if key}
+        if not self._keys:
+            raise ValueError(f"No API keys configured for {provider}")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def acquire(self) -> str:
+        """The key to use for the next request."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [state for state in self._keys.values() if state.cooldown_until <= now]
+            if ready:
+                state = min(ready, key=lambda state: (state.utilization(now, self.window, self.assumed_rpm),
+                                                      len(state.uses)))
+            else:
+                state = min(self._keys.values(), key=lambda state: state.cooldown_until)
+                logger.warning(f"All {self.provider} keys are cooling down")
+            state.uses.append(now)
+            state.since_report += 1
+            state.requests += 1
+            return state.key
+
+    def observe(self, key: str, status: Optional[int] = None,
+                headers: Optional[Mapping[str, Any]] = None) -> None:
+        """Update a key from a response's status code and rate-limit headers."""
+        now = time.monotonic()
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return
+            limit_requests = _int_header(headers, "x-ratelimit-limit-requests")
+            remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+            if limit_requests is not None and remaining_requests is not None:
+                state.limit_requests, state.remaining_requests = limit_requests, remaining_requests
+                state.since_report = 0
+            limit_tokens = _int_header(headers, "x-ratelimit-limit-tokens")
+            remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+            if limit_tokens is not None and remaining_tokens is not None:
+                state.limit_tokens, state.remaining_tokens = limit_tokens, remaining_tokens
+            resets = [parse_duration(headers.get(name))
+                      for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+            resets = [reset for reset in resets if reset is not None]
+            if resets:
+                state.reset_at = now + max(resets)
+            elif limit_requests is not None or limit_tokens is not None:
+                state.reset_at = now + self.window
+
+            exhausted = state.remaining_requests == 0 and now < state.reset_at
+            if status == 429 or exhausted:
+                wait = parse_duration(headers.get("retry-after"))
+                if wait is None:
+                    wait = max(resets) if resets else self.cooldown
+                state.cooldown_until = max(state.cooldown_until, now + wait)
+                if status == 429:
+                    state.throttled += 1
+                    logger.warning(f"{self.provider} key ...{key[-4:]} rate limited for {wait:.1f}s")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Utilisation, remaining quota and cooldown per key (keys shown by suffix only)."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": f"...{state.key[-4:]}",
+                    "utilization": round(state.utilization(now, self.window, self.assumed_rpm), 3),
+                    "remainingRequests": state.remaining_requests,
+                    "remainingTokens": state.remaining_tokens,
+                    "coolingDown": round(max(state.cooldown_until - now, 0.0), 1),
+                    "requests": state.requests,
+                    "throttled": state.throttled
+                }
+                for state in self._keys.values()
+            ]
+
+
+class KeyPoolManager:
+    """The key pools of every provider that has keys configured."""
+
+    def __init__(self, keys: Mapping[str, Iterable[str]], **pool_options):
+        keys = {provider.lower(): [key for key in provider_keys if key] for provider, provider_keys in keys.items()}
+        self._pools = {
+            provider: KeyPool(provider, provider_keys, **pool_options)
+            for provider, provider_keys in keys.items()
+            if provider_keys
+        }
+
+    @classmethod
+    def from_env(cls, providers: Iterable[str], **pool_options) -> "KeyPoolManager":
+        """Keys from ``<PROVIDER>_API_KEYS`` (comma separated), else ``<PROVIDER>_API_KEY``."""
+        keys = {}
+        for provider in providers:
+            value = os.getenv(f"{provider.upper()}_API_KEYS") or os.getenv(f"{provider.upper()}_API_KEY") or ""
+            keys[provider] = [key.strip() for key in value.split(",") if key.strip()]
+        return cls(keys, **pool_options)
+
+    def get(self, provider: str) -> Optional[KeyPool]:
+        return self._pools.get(provider.lower())
+
+    def stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {provider: pool.stats() for provider, pool in self._pools.items()}
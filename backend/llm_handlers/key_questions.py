@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .base_handler import BaseLLMHandler
+from .prompt_templates import CONTEXT_WINDOWS, templates
+from .provider_guard import ProviderGuard
+from .response_utils import is_error
+
+logger = logging.getLogger(__name__)
+
+# Models tried for stage one when no latency has been observed yet, fastest first
+DEFAULT_SPEED_ORDER = ['gemini', 'openai', 'grok', 'deepseek']
+
+_QUESTION_LINE_RE = re.compile(r"^[ \t]*(?:\d+[.)]|[-*•])?[ \t]*(\S.*\?)[ \t*]*$", re.MULTILINE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Cache key form of a prompt: case-folded, whitespace collapsed, end punctuation dropped."""
+    return _WHITESPACE_RE.sub(" ", prompt).strip().casefold().rstrip("?!. ")
+
+
+def parse_key_questions(text: str, count: int = 3) -> List[str]:
+    """Pull the first ``count`` question lines out of a stage-one reply."""
+    return [match.strip("* ") for match in _QUESTION_LINE_RE.findall(text)][:count]
+
+
+class KeyQuestionsPipeline:
+    """
+    Two-stage prompting that generates the "three key questions" once.
+
+    Stage one asks the fastest available handler for the key questions only
+    (the ``key_questions`` template); the result is cached per normalised
+    prompt with single-flight loading. Stage two sends every provider the
+    question plus those key questions (``key_questions_answer``) with the
+    smaller budget of a bare 300-word answer, so no model spends output
+    tokens on the shared preamble. Either budget can be overridden. When
+    stage one fails the plain prompt is used and nothing is cached. The
+    stage-one call goes through ``guard`` like the fan-out's calls.
+    """
+
+    def __init__(self, stage_one_max_tokens: Optional[int] = None,
+                 stage_two_max_tokens: Optional[int] = None,
+                 max_entries: int = 2048, ttl: float = 86400.0,
+                 guard: Optional[ProviderGuard] = None):
+        self.guard = guard or ProviderGuard()
+        self.stage_one_max_tokens = stage_one_max_tokens
+        self.stage_two_max_tokens = stage_two_max_tokens
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fastest(handlers: Mapping[str, BaseLLMHandler],
+                latency: Optional[Mapping[str, Optional[float]]] = None) -> str:
+        """The handler with the lowest observed latency, else the first in DEFAULT_SPEED_ORDER."""
+        observed = {model: (latency or {}).get(model) for model in handlers}
+        known = {model: value for model, value in observed.items() if value is not None}
+        if known:
+            return min(known, key=known.get)
+        ranked = sorted(handlers, key=lambda model: DEFAULT_SPEED_ORDER.index(model)
+                        if model in DEFAULT_SPEED_ORDER else len(DEFAULT_SPEED_ORDER))
+        return ranked[0]
+
+    def _get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: str, questions: List[str]) -> None:
+        self._entries[key] = (time.monotonic(), questions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _generate(self, model: str, handler: BaseLLMHandler, question: str) -> List[str]:
+        rendered = templates.render("key_questions", model=model, max_tokens=self.stage_one_max_tokens,
+                                    question=question)
+        reply = await self.guard.call(model, handler, rendered, routed=False)
+        if is_error(reply):
+            raise RuntimeError(reply)
+        questions = parse_key_questions(reply)
+        if not questions:
+            raise ValueError("No key questions in stage-one reply")
+        return questions
+
+    async def key_questions(self, question: str, handlers: Mapping[str, BaseLLMHandler],
+                            latency: Optional[Mapping[str, Optional[float]]] = None) -> List[str]:
+        """Stage one: the key questions for a prompt, cached and single-flight."""
+        key = normalize_prompt(question)
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            model = self.fastest(handlers, latency)
+            logger.info(f"Generating key questions with {model}")
+            task = asyncio.ensure_future(self._generate(model, handlers[model], question))
+            self._inflight[key] = task
+
+            def _finish(done: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self._put(key, done.result())
+
+            task.add_done_callback(_finish)
+        return await asyncio.shield(task)
+
+    async def prepare(self, question: str, handlers: Mapping[str, BaseLLMHandler],
+                      latency: Optional[Mapping[str, Optional[float]]] = None
+                      ) -> Tuple[str, Dict[str, Any], List[str]]:
+        """
+        Build the stage-two prompt and generation options for the fan-out.
+
+        Returns ``(prompt, generate_kwargs, key_questions)``; on a stage-one
+        failure the original question, no options and no key questions.
+        """
+        try:
+            questions = await self.key_questions(question, handlers, latency)
+        except Exception as e:
+            logger.error(f"Key questions stage failed, using the plain prompt: {str(e)}")
+            return question, {}, []
+        listed = "\n".join(f"{index}. {text}" for index, text in enumerate(questions, 1))
+        # One prompt for every provider, so it has to fit the smallest window
+        smallest = min(handlers, key=lambda model: CONTEXT_WINDOWS.get(model, 0))
+        rendered = templates.render("key_questions_answer", model=smallest,
+                                    max_tokens=self.stage_two_max_tokens,
+                                    question=question, key_questions=listed)
+        return rendered.prompt, {"max_tokens": rendered.max_tokens}, questions
+
+    def stats(self) -> Dict[str, int]:
+        """Stage-one cache size and hit/miss counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
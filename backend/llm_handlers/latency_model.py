@@ -0,0 +1,149 @@
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced buckets: bucket i covers [MIN_LATENCY * GROWTH**i, MIN_LATENCY * GROWTH**(i + 1)) seconds
+MIN_LATENCY = 0.05
+MAX_LATENCY = 600.0
+GROWTH = 1.1
+NUM_BUCKETS = math.ceil(math.log(MAX_LATENCY / MIN_LATENCY, GROWTH))
+
+# Requested max_tokens bands, so long answers are not judged by short-answer latencies
+MAX_TOKENS_BANDS = (256, 512, 1024, 2048, 4096)
+ALL_BANDS = "*"
+
+
+def _bucket(latency: float) -> int:
+    if latency <= MIN_LATENCY:
+        return 0
+    return min(int(math.log(latency / MIN_LATENCY, GROWTH)), NUM_BUCKETS - 1)
+
+
+def _band(max_tokens: int) -> str:
+    for band in MAX_TOKENS_BANDS:
+        if max_tokens <= band:
+            return str(band)
+    return f">{MAX_TOKENS_BANDS[-1]}"
+
+
+class LatencyModel:
+    """
+    Streaming per-provider latency quantiles for adaptive timeouts.
+
+    Every call lands in two log-bucket histograms (about 10% relative
+    error): one for the provider and the requested ``max_tokens`` band, one
+    for the provider overall. Once a histogram holds ``decay_at`` samples
+    its counts are halved, so the quantiles follow drift. A provider's
+    timeout is its p99 times ``factor``, taken from the band histogram when
+    it has ``min_samples`` samples, else from the overall one, else
+    ``default_timeout``, and always clamped to ``[floor, ceiling]``.
+
+    ``save()`` writes the histograms to ``path`` atomically and they are
+    loaded back on start, so timeouts are warm after a restart.
+    """
+
+    def __init__(self, path: Optional[str] = None, factor: float = 1.5, quantile: float = 0.99,
+                 floor: float = 5.0, ceiling: float = 90.0, default_timeout: float = 30.0,
+                 min_samples: int = 20, decay_at: int = 2000):
+        self.path = path
+        self.factor = factor
+        self.quantile = quantile
+        self.floor = floor
+        self.ceiling = ceiling
+        self.default_timeout = default_timeout
+        self.min_samples = min_samples
+        self.decay_at = decay_at
+        self.dirty = 0
+        self._histograms: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as model_file:
+                data = json.load(model_file)
+            self._histograms = {
+                key: np.array(counts, dtype=float)
+                for key, counts in data["histograms"].items()
+                if len(counts) == NUM_BUCKETS
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Ignoring unreadable latency model {self.path}: {str(e)}")
+
+    def save(self) -> None:
+        """Persist the histograms atomically."""
+        if not self.path:
+            return
+        with self._lock:
+            data = {key: counts.tolist() for key, counts in self._histograms.items()}
+            self.dirty = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", "w") as model_file:
+            json.dump({"histograms": data}, model_file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def record(self, model: str, latency: float, max_tokens: int = 1000) -> None:
+        """Add one call's wall time; a timed-out call is recorded at its timeout."""
+        model = (model or "").lower()
+        bucket = _bucket(latency)
+        with self._lock:
+            for key in (f"{model}:{_band(max_tokens)}", f"{model}:{ALL_BANDS}"):
+                counts = self._histograms.get(key)
+                if counts is None:
+                    counts = self._histograms[key] = np.zeros(NUM_BUCKETS)
+                counts[bucket] += 1
+                if counts.sum() >= self.decay_at:
+                    counts *= 0.5
+            self.dirty += 1
+
+    def _quantile(self, key: str, q: float) -> Optional[float]:
+        counts = self._histograms.get(key)
+        if counts is None or counts.sum() < self.min_samples:
+            return None
+        bucket = int(np.searchsorted(np.cumsum(counts), q * counts.sum()))
+        # Upper edge of the bucket, so the estimate never undershoots
+        return MIN_LATENCY * GROWTH ** (min(bucket, NUM_BUCKETS - 1) + 1)
+
+    def percentile(self, model: str, q: float, max_tokens: Optional[int] = None) -> Optional[float]:
+        """Latency quantile ``q`` for a provider (and max_tokens band), None while cold."""
+        model = (model or "").lower()
+        with self._lock:
+            if max_tokens is not None:
+                value = self._quantile(f"{model}:{_band(max_tokens)}", q)
+                if value is not None:
+                    return value
+            return self._quantile(f"{model}:{ALL_BANDS}", q)
+
+    def timeout(self, model: str, max_tokens: int = 1000) -> float:
+        """Seconds to wait for a provider before giving up on a call."""
+        p99 = self.percentile(model, self.quantile, max_tokens)
+        if p99 is None:
+            return self.default_timeout
+        return round(min(max(p99 * self.factor, self.floor), self.ceiling), 2)
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Samples, p50/p99 and the default-size timeout per provider."""
+        with self._lock:
+            models = sorted({key.rsplit(":", 1)[0] for key in self._histograms})
+            samples = {model: float(self._histograms[f"{model}:{ALL_BANDS}"].sum()) for model in models}
+        return {
+            model: {
+                "samples": round(samples[model], 1),
+                "p50": self.percentile(model, 0.5),
+                "p99": self.percentile(model, 0.99),
+                "timeout": self.timeout(model)
+            }
+            for model in models
+        }
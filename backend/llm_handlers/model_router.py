@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .handler_factory import LLMHandlerFactory
+from .response_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+MessageKey = Tuple[str, str]
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+class ModelRouter:
+    """
+    Contextual bandit that picks which providers to call for ``llm_types: ["auto"]``.
+
+    Answer quality is learned per model with disjoint LinUCB over prompt
+    features (bias, log prompt length and a hashed bag of topic words),
+    rewarded 1 for the model the analysis picked as best and 0 for the other
+    participants. Latency and error rate are tracked per model as moving
+    averages; the expected win is discounted by the error rate and both are
+    subtracted as penalties. Only fan-outs with at least two answers teach
+    the quality model, since a lone answer always "wins".
+
+    Routing calls the best-scoring model plus the runner-up by upper
+    confidence bound, and drops the runner-up only when the leader clearly
+    dominates it; even then it is kept with probability ``explore_rate``.
+    At most ``max_models`` providers are ever called.
+    """
+
+    def __init__(self, models: Optional[Sequence[str]] = None, topic_buckets: int = 16,
+                 alpha: float = 0.5, max_models: int = 2, explore_rate: float = 0.1,
+                 latency_weight: float = 0.2, latency_scale: float = 10.0, error_weight: float = 0.5,
+                 smoothing: float = 0.1, max_pending: int = 10000, seed: Optional[int] = None):
+        self.models = [model.lower() for model in (models or LLMHandlerFactory.get_available_models())]
+        self.topic_buckets = topic_buckets
+        self.dim = 2 + topic_buckets
+        self.alpha = alpha
+        self.max_models = max_models
+        self.explore_rate = min(max(explore_rate, 0.0), 1.0)
+        self.latency_weight = latency_weight
+        self.latency_scale = latency_scale
+        self.error_weight = error_weight
+        self.smoothing = smoothing
+        self.max_pending = max_pending
+        self._A = {model: np.eye(self.dim) for model in self.models}
+        self._b = {model: np.zeros(self.dim) for model in self.models}
+        self.latency: Dict[str, Optional[float]] = {model: None for model in self.models}
+        self.error_rate: Dict[str, float] = {model: 0.0 for model in self.models}
+        self.wins: Dict[str, int] = {model: 0 for model in self.models}
+        self._pending: "OrderedDict[MessageKey, Tuple[np.ndarray, List[str]]]" = OrderedDict()
+        self._rng = np.random.default_rng(seed)
+
+    def features(self, prompt: str) -> np.ndarray:
+        """Bias, normalised log length and a unit-norm hashed bag of topic words."""
+        tokens = tokenize(prompt)
+        x = np.zeros(self.dim)
+        x[0] = 1.0
+        x[1] = min(math.log1p(len(tokens)) / math.log1p(1000), 1.0)
+        for token in tokens:
+            if token not in _STOPWORDS:
+                bucket = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "big")
+                x[2 + bucket % self.topic_buckets] += 1.0
+        topic = x[2:]
+        norm = np.linalg.norm(topic)
+        if norm:
+            x[2:] = topic / norm
+        return x
+
+    def _estimate(self, model: str, x: np.ndarray) -> Tuple[float, float]:
+        A_inv = np.linalg.inv(self._A[model])
+        return float(A_inv @ self._b[model] @ x), float(np.sqrt(x @ A_inv @ x))
+
+    def _penalty(self, model: str) -> float:
+        latency = self.latency[model] or 0.0
+        return (self.latency_weight * min(latency / self.latency_scale, 1.0)
+                + self.error_weight * self.error_rate[model])
+
+    def scores(self, prompt: str, available: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Expected quality, confidence width and penalised score for each model."""
+        x = self.features(prompt)
+        scores = {}
+        for model in available or self.models:
+            if model not in self._A:
+                continue
+            mean, width = self._estimate(model, x)
+            # A win only counts if the call succeeds
+            success = 1.0 - self.error_rate[model]
+            penalty = self._penalty(model)
+            scores[model] = {
+                "mean": mean,
+                "width": width,
+                "score": mean * success - penalty,
+                "ucb": (mean + self.alpha * width) * success - penalty
+            }
+        return scores
+
+    def choose(self, prompt: str, available: Optional[Sequence[str]] = None) -> List[str]:
+        """Pick the providers to call for a prompt."""
+        scores = self.scores(prompt, available)
+        if not scores:
+            raise ValueError("No routable models available")
+        ranked = sorted(scores, key=lambda model: scores[model]["score"], reverse=True)
+        chosen = ranked[:1]
+        rest = sorted(ranked[1:], key=lambda model: scores[model]["ucb"], reverse=True)
+        leader = scores[chosen[0]]
+        for model in rest[:self.max_models - 1]:
+            dominated = leader["score"] - self.alpha * leader["width"] > scores[model]["ucb"]
+            if not dominated or self._rng.random() < self.explore_rate:
+                chosen.append(model)
+        logger.info(f"Routed prompt to {chosen}")
+        return chosen
+
+    def observe(self, user_id: str, message_id: str, prompt: str, models: Sequence[str]) -> None:
+        """Remember which models answered a message until its analysis arrives."""
+        models = [model for model in models if model in self._A]
+        if len(models) < 2:
+            return
+        self._pending[(user_id, message_id)] = (self.features(prompt), models)
+        self._pending.move_to_end((user_id, message_id))
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+
+    def record_response(self, model: str, latency: float, error: bool) -> None:
+        """Fold one provider call into the model's latency and error averages."""
+        if model not in self._A:
+            return
+        previous = self.latency[model]
+        self.latency[model] = latency if previous is None else (
+            (1 - self.smoothing) * previous + self.smoothing * latency)
+        self.error_rate[model] = (1 - self.smoothing) * self.error_rate[model] + self.smoothing * float(error)
+
+    def record_win(self, user_id: str, message_id: str, best_model: str) -> bool:
+        """Reward the analysis winner of an observed message; returns whether it was used."""
+        decision = self._pending.pop((user_id, message_id), None)
+        best_model = (best_model or "").lower()
+        if decision is None or best_model not in decision[1]:
+            return False
+        x, models = decision
+        for model in models:
+            reward = 1.0 if model == best_model else 0.0
+            self._A[model] += np.outer(x, x)
+            self._b[model] += reward * x
+        self.wins[best_model] += 1
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Wins, latency and error rate per model."""
+        return {
+            model: {
+                "wins": self.wins[model],
+                "latency": round(self.latency[model], 3) if self.latency[model] is not None else None,
+                "errorRate": round(self.error_rate[model], 3)
+            }
+            for model in self.models
+        }
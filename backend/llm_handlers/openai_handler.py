@@ -1,6 +1,7 @@
 from openai import AsyncOpenAI
 from typing import Dict, Any
 from .base_handler import BaseLLMHandler
+from .prompt_templates import templates
 import logging
 import httpx
 import asyncio
@@ -23,26 +24,35 @@ class OpenAIChatHandler(BaseLLMHandler):
         )
         self.model = "gpt-4-turbo-preview"
         self.logger = logging.getLogger(__name__)
-        openai.api_key = self.api_key
+
+    def _use_key(self, api_key: str) -> None:
+        super()._use_key(api_key)
+        # Same connection pool, new key
+        self.client = self.client.with_options(api_key=api_key)
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
         reraise=True
     )
-    async def _make_request(self, messages: list, max_tokens: int = 1000) -> str:
+    async def _make_request(self, messages: list, max_tokens: int = 1000, temperature: float = 0.7) -> str:
         try:
-            response = await self.client.chat.completions.create(
+            raw = await self.client.chat.completions.with_raw_response.create(
                 model=self.model,
                 messages=messages,
-                temperature=0.7,
+                temperature=temperature,
                 max_tokens=max_tokens,
                 timeout=30.0
             )
-            return response.choices[0].message.content
+            self._report_rate_limits(raw.status_code, raw.headers)
+            return raw.parse().choices[0].message.content
         except httpx.TimeoutException as e:
             self.logger.error(f"OpenAI API timeout: {str(e)}")
             raise
+        except openai.APIStatusError as e:
+            self._report_rate_limits(e.status_code, e.response.headers)
+            self.logger.error(f"OpenAI API error: {str(e)}")
+            raise
         except Exception as e:
             self.logger.error(f"OpenAI API error: {str(e)}")
             raise
@@ -50,10 +60,11 @@ class OpenAIChatHandler(BaseLLMHandler):
     async def generate_response(self, prompt: str, **kwargs) -> str:
         try:
             self.logger.info(f"Starting OpenAI response generation with model {self.model}")
-            messages = [{"role": "user", "content": prompt}]
+            messages = self._messages(prompt, kwargs.get("system"))
             
             try:
-                response = await self._make_request(messages, kwargs.get("max_tokens", 1000))
+                response = await self._make_request(messages, kwargs.get("max_tokens", 1000),
+                                                    kwargs.get("temperature", 0.7))
                 self.logger.info("Successfully received response from OpenAI")
                 return response
             except Exception as e:
@@ -88,24 +99,16 @@ class OpenAIChatHandler(BaseLLMHandler):
     async def get_response(self, user_input: str) -> str:
         """Get response from OpenAI API"""
         try:
-            prompt = f"""Before answering this question: "{user_input}", think about the three most important questions that you need to understand to understand the deepness of the initial question.
-
-Then, provide a 300-word answer in the most concise way.
-
-Your response should be structured as follows:
-1. First, list the three key questions you identified
-2. Then, provide your concise 300-word answer
-
-Remember to be precise and focused in your response."""
+            rendered = templates.render("answer", model="openai", user_input=user_input)
 
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant that provides thoughtful, concise responses."},
-                    {"role": "user", "content": prompt}
+                    {"role": "system", "content": rendered.system},
+                    {"role": "user", "content": rendered.prompt}
                 ],
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=rendered.max_tokens
             )
             return response.choices[0].message.content
         except Exception as e:
@@ -0,0 +1,218 @@
+import math
+import string
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Rough tokens per English word for the BPE tokenizers the providers use
+TOKENS_PER_WORD = 4 / 3
+
+# Context windows (tokens) of the models each handler calls
+CONTEXT_WINDOWS = {
+    'openai': 128000,   # gpt-4-turbo-preview
+    'gemini': 1000000,  # gemini-1.5-pro
+    'grok': 131072,     # grok-2-latest
+    'deepseek': 65536   # deepseek-chat
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant that provides thoughtful, concise responses."
+
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate: the larger of the character- and word-based guesses."""
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * TOKENS_PER_WORD))
+
+
+def max_tokens_for_words(words: int, headroom: float = 1.25) -> int:
+    """Output budget for a target length in words, with headroom so answers are not cut off."""
+    return math.ceil(words * TOKENS_PER_WORD * headroom)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Deterministically shorten text to about ``max_tokens`` estimated tokens.
+
+    Keeps the first two thirds and the last third of the allowed length,
+    since both the framing and the final ask of a long input matter.
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # Scale by the text's own characters per token, so short-word text is cut as hard as prose
+    max_chars = max(len(text) * max_tokens // tokens - len(TRUNCATION_MARKER), 0)
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
+
+
+class RenderedPrompt(NamedTuple):
+    system: Optional[str]
+    prompt: str
+    max_tokens: int
+
+
+class PromptTemplate:
+    """
+    A prompt parsed once into literal and field segments.
+
+    ``truncatable`` names the fields (user input, provider answers) that may
+    be shortened to fit a model's context window; ``target_words`` sets the
+    output budget, otherwise ``max_tokens`` is used as is.
+    """
+
+    def __init__(self, name: str, text: str, system: Optional[str] = None,
+                 target_words: Optional[int] = None, max_tokens: int = 1000,
+                 truncatable: Sequence[str] = ()):
+        self.name = name
+        self.system = system
+        self.max_tokens = max_tokens_for_words(target_words) if target_words else max_tokens
+        self.truncatable = tuple(truncatable)
+        self._segments: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(text)
+        ]
+        self.fields = {field for _, field in self._segments if field}
+
+    def render(self, **fields: str) -> str:
+        return "".join(literal + (str(fields[field]) if field else "") for literal, field in self._segments)
+
+
+class PromptRegistry:
+    """
+    Central registry of prompt templates with per-provider token budgeting.
+
+    ``render`` fills a template for a given provider: it picks the
+    provider's system prompt, derives ``max_tokens`` and, when the input
+    would not fit the provider's context window next to that output budget,
+    truncates the template's truncatable fields in proportion to their size.
+    """
+
+    def __init__(self, system_prompts: Optional[Dict[str, str]] = None,
+                 context_windows: Optional[Dict[str, int]] = None, safety_margin: int = 256):
+        self.system_prompts = system_prompts or {}
+        self.context_windows = dict(CONTEXT_WINDOWS, **(context_windows or {}))
+        self.safety_margin = safety_margin
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"No prompt template named {name}")
+
+    def input_budget(self, model: Optional[str], max_tokens: int, system: Optional[str] = None) -> int:
+        """Tokens left for the user prompt once output and system prompt are reserved."""
+        window = self.context_windows.get((model or "").lower(), DEFAULT_CONTEXT_WINDOW)
+        return max(window - max_tokens - estimate_tokens(system or "") - self.safety_margin, 0)
+
+    def system_prompt(self, model: Optional[str]) -> Optional[str]:
+        """The provider's default system prompt, if it has one."""
+        return self.system_prompts.get((model or "").lower())
+
+    def fit(self, model: Optional[str], prompt: str, max_tokens: int = 1000,
+            system: Optional[str] = None) -> str:
+        """Truncate a free-form prompt to the model's input budget."""
+        return truncate_to_tokens(prompt, self.input_budget(model, max_tokens, system))
+
+    def render(self, name: str, model: Optional[str] = None, max_tokens: Optional[int] = None,
+               **fields: str) -> RenderedPrompt:
+        template = self.get(name)
+        model = (model or "").lower()
+        system = template.system if template.system is not None else self.system_prompt(model)
+        output_tokens = max_tokens or template.max_tokens
+        budget = self.input_budget(model, output_tokens, system)
+
+        fields = {field: str(value) for field, value in fields.items()}
+        if estimate_tokens(template.render(**fields)) > budget:
+            shrinkable = [field for field in template.truncatable if field in fields]
+            fixed = estimate_tokens(template.render(**dict(fields, **{field: "" for field in shrinkable})))
+            sizes = {field: estimate_tokens(fields[field]) for field in shrinkable}
+            available = max(budget - fixed, 0)
+            total = sum(sizes.values()) or 1
+            for field in shrinkable:
+                fields[field] = truncate_to_tokens(fields[field], available * sizes[field] // total)
+
+        return RenderedPrompt(system, template.render(**fields), output_tokens)
+
+
+templates = PromptRegistry(system_prompts={
+    'openai': DEFAULT_SYSTEM_PROMPT,
+    'grok': DEFAULT_SYSTEM_PROMPT,
+    'deepseek': DEFAULT_SYSTEM_PROMPT
+})
+
+templates.register(PromptTemplate(
+    "answer",
+    """Before answering this question: "{user_input}", think about the three most important questions that you need to understand to understand the deepness of the initial question.
+
+Then, provide a 300-word answer in the most concise way.
+
+Your response should be structured as follows:
+1. First, list the three key questions you identified
+2. Then, provide your concise 300-word answer
+
+Remember to be precise and focused in your response.""",
+    # The answer plus the three key questions
+    target_words=360,
+    truncatable=("user_input",)
+))
+
+templates.register(PromptTemplate(
+    "analysis",
+    """You are an expert at analyzing LLM responses. Please analyze these responses to the question: "{question}"
+
+Responses from different models:
+
+1. OpenAI:
+{openai}
+
+2. Gemini:
+{gemini}
+
+3. Grok:
+{grok}
+
+4. Deepseek:
+{deepseek}
+
+Please analyze these responses and provide:
+1. A comprehensive summary that combines the best aspects of all responses
+2. Identify which model provided the most accurate and helpful response (must be one of: {valid_models})
+3. Explain why that model's response was the best
+
+Format your response exactly like this:
+SUMMARY: [your comprehensive summary here]
+BEST_MODEL: [model name]
+EXPLANATION: [your explanation here]""",
+    system="You are an expert at analyzing LLM responses. Always format your response with SUMMARY:, BEST_MODEL:, and EXPLANATION: sections.",
+    truncatable=("question", "openai", "gemini", "grok", "deepseek")
+))
+
+templates.register(PromptTemplate(
+    "key_questions",
+    """List the three most important questions someone must understand to grasp the depth of this question: "{question}"
+
+Reply with exactly three numbered questions and nothing else.""",
+    max_tokens=150,
+    truncatable=("question",)
+))
+
+templates.register(PromptTemplate(
+    "key_questions_answer",
+    """Answer this question: "{question}"
+
+These are the three key questions behind it:
+{key_questions}
+
+Using them as a guide, provide a 300-word answer in the most concise way. Do not restate the key questions.
+
+Remember to be precise and focused in your response.""",
+    target_words=300,
+    truncatable=("question",)
+))
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from .base_handler import BaseLLMHandler
+from .cost_estimator import CostEstimator
+from .latency_model import LatencyModel
+from .prompt_templates import RenderedPrompt
+from .rate_limiter import RateLimiter
+from .response_utils import is_error
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderGuard:
+    """
+    Outbound limits shared by every provider call.
+
+    ``call()`` charges the rate limiter (waiting for quota, but not past the
+    call's deadline) and bounds the call by the latency model's adaptive
+    timeout. Afterwards it settles the token charge and records the call in
+    the latency model, the cost estimator and, for answer calls, the router.
+    Failures come back as ``"Error: ..."`` strings, like a handler's own.
+    Without arguments nothing is throttled and calls time out at the
+    latency model's default.
+    """
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, latency_model: Optional[LatencyModel] = None,
+                 estimator: Optional[CostEstimator] = None, router=None, save_every: int = 100):
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.latency_model = latency_model or LatencyModel()
+        self.estimator = estimator or CostEstimator()
+        self.router = router
+        self.save_every = save_every
+
+    async def call(self, model: str, handler: BaseLLMHandler, rendered: RenderedPrompt,
+                   routed: bool = True, **kwargs: Any) -> str:
+        """
+        Send a rendered prompt to one provider within its quota and timeout.
+
+        Judge and helper calls pass ``routed=False`` so their latencies stay
+        out of the router's answer statistics.
+        """
+        timed_out = charged = False
+        max_tokens = rendered.max_tokens
+        timeout = self.latency_model.timeout(model, max_tokens)
+        prompt_tokens = self.estimator.count_tokens(model, (rendered.system or "") + rendered.prompt)
+        start = time.perf_counter()
+        try:
+            # Queue for the provider's quota rather than sending the call into a 429
+            await self.rate_limiter.acquire(model, prompt_tokens + max_tokens, deadline=time.monotonic() + timeout)
+            charged = True
+            start = time.perf_counter()
+            response = await asyncio.wait_for(handler.generate_response(
+                rendered.prompt, **dict(kwargs, system=rendered.system, max_tokens=max_tokens)), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{handler.__class__.__name__} timed out after {timeout}s")
+            response = f"Error: timed out after {timeout}s"
+            timed_out = True
+        except Exception as e:
+            logger.error(f"Error getting response from {handler.__class__.__name__}: {str(e)}")
+            response = f"Error: {str(e)}"
+        latency = time.perf_counter() - start
+        failed = is_error(response)
+        if routed and self.router is not None:
+            self.router.record_response(model, latency, failed)
+        if not failed:
+            self.estimator.record(model, response, latency)
+        if charged and not timed_out:
+            used = prompt_tokens + (0 if failed else self.estimator.count_tokens(model, response))
+            await self.rate_limiter.reconcile(model, prompt_tokens + max_tokens, used)
+        if timed_out or not failed:
+            # Fast failures say nothing about how long an answer takes
+            self.latency_model.record(model, latency, max_tokens)
+            if self.latency_model.dirty >= self.save_every:
+                await asyncio.to_thread(self.latency_model.save)
+        return response
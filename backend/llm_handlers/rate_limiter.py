@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from firebase_admin import db
+
+logger = logging.getLogger(__name__)
+
+# Bucket state: {"requests": float, "tokens": float, "updated": epoch seconds}
+BucketState = Dict[str, float]
+
+
+class RateLimitExceeded(Exception):
+    """The call could not be admitted before its deadline."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} rate limit: next slot in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def take(state: Optional[BucketState], now: float, tokens: float,
+         rpm: Optional[float], tpm: Optional[float]) -> Tuple[BucketState, float]:
+    """
+    Refill a provider's RPM and TPM buckets and try to take one request and ``tokens``.
+
+    Returns the new state and 0.0 on success; otherwise nothing is taken
+    from either bucket and the seconds until both could cover the call.
+    A call larger than the whole TPM bucket only waits for a full bucket.
+    A missing limit leaves that bucket out.
+    """
+    state = dict(state or {"requests": rpm or 0, "tokens": tpm or 0, "updated": now})
+    elapsed = max(now - state["updated"], 0.0)
+    requests, available, wait = state["requests"], state["tokens"], 0.0
+    if rpm:
+        requests = min(requests + elapsed * rpm / 60, rpm)
+        wait = max(wait, (1 - requests) * 60 / rpm)
+    if tpm:
+        available = min(available + elapsed * tpm / 60, tpm)
+        wait = max(wait, (min(tokens, tpm) - available) * 60 / tpm)
+    if wait == 0.0:
+        requests -= 1 if rpm else 0
+        available -= tokens if tpm else 0
+    return {"requests": requests, "tokens": available, "updated": now}, wait
+
+
+def refund(state: Optional[BucketState], tokens: float, tpm: float) -> Optional[BucketState]:
+    """Return over-charged tokens (or charge under-estimated ones, when negative)."""
+    if state is None:
+        return None
+    return dict(state, tokens=min(state["tokens"] + tokens, tpm))
+
+
+class LocalRateLimitBackend:
+    """Buckets in this process's memory; enough for a single worker."""
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, provider: str, tokens: float, rpm: Optional[float], tpm: Optional[float]) -> float:
+        with self._lock:
+            self._buckets[provider], wait = take(self._buckets.get(provider), time.time(), tokens, rpm, tpm)
+        return wait
+
+    async def refund(self, provider: str, tokens: float, tpm: float) -> None:
+        with self._lock:
+            state = refund(self._buckets.get(provider), tokens, tpm)
+            if state is not None:
+                self._buckets[provider] = state
+
+
+class FirebaseRateLimitBackend:
+    """
+    Buckets in the Realtime Database, updated with transactions, so every
+    worker sharing the database draws from one quota.
+    """
+
+    def __init__(self, root: str = "rate_limits"):
+        self.root = root
+
+    def _take(self, provider: str, tokens: float, rpm: Optional[float], tpm: Optional[float]) -> float:
+        outcome = {}
+
+        def attempt(current):
+            state, outcome["wait"] = take(current, time.time(), tokens, rpm, tpm)
+            return state
+
+        db.reference(f"{self.root}/{provider}").transaction(attempt)
+        return outcome["wait"]
+
+    async def take(self, provider: str, tokens: float, rpm: Optional[float], tpm: Optional[float]) -> float:
+        return await asyncio.to_thread(self._take, provider, tokens, rpm, tpm)
+
+    async def refund(self, provider: str, tokens: float, tpm: float) -> None:
+        await asyncio.to_thread(
+            db.reference(f"{self.root}/{provider}").transaction,
+            lambda current: refund(current, tokens, tpm)
+        )
+
+
+class RateLimiter:
+    """
+    Outbound RPM/TPM token buckets per provider.
+
+    ``acquire()`` charges one request and the estimated tokens (prompt plus
+    ``max_tokens``) before a call. When a bucket is short, the call waits
+    for the refill instead of going out and getting a 429. If the refill
+    would come after the call's deadline, ``RateLimitExceeded`` is raised
+    straight away. ``reconcile()`` settles the estimate against the actual
+    usage afterwards. Providers without limits are never throttled.
+    Buckets live in a pluggable backend: in process, or in the Realtime
+    Database for a quota shared between workers.
+    """
+
+    def __init__(self, limits: Optional[Mapping[str, Tuple[Optional[float], Optional[float]]]] = None,
+                 backend=None):
+        self.limits = {provider.lower(): limit for provider, limit in (limits or {}).items() if any(limit)}
+        self.backend = backend or LocalRateLimitBackend()
+        self.waited: Dict[str, float] = {}
+        self.rejected: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, providers, key_counts: Optional[Mapping[str, int]] = None,
+                 backend=None) -> "RateLimiter":
+        """
+        Limits from ``<PROVIDER>_RPM`` / ``<PROVIDER>_TPM``, which are per API
+        key and so are multiplied by the provider's number of keys.
+        """
+        limits = {}
+        for provider in providers:
+            keys = (key_counts or {}).get(provider.lower(), 1)
+            rpm, tpm = (os.getenv(f"{provider.upper()}_{name}") for name in ("RPM", "TPM"))
+            limits[provider] = (float(rpm) * keys if rpm else None, float(tpm) * keys if tpm else None)
+        return cls(limits, backend)
+
+    async def acquire(self, provider: str, tokens: int, deadline: Optional[float] = None) -> float:
+        """Wait for room for a call; returns the seconds waited."""
+        provider = provider.lower()
+        if provider not in self.limits:
+            return 0.0
+        rpm, tpm = self.limits[provider]
+        start = time.monotonic()
+        while True:
+            wait = await self.backend.take(provider, tokens, rpm, tpm)
+            if wait == 0.0:
+                waited = time.monotonic() - start
+                self.waited[provider] = self.waited.get(provider, 0.0) + waited
+                return waited
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self.rejected[provider] = self.rejected.get(provider, 0) + 1
+                raise RateLimitExceeded(provider, wait)
+            await asyncio.sleep(wait)
+
+    async def reconcile(self, provider: str, estimated: int, actual: int) -> None:
+        """Settle a call's up-front token charge against what it really used."""
+        provider = provider.lower()
+        if provider in self.limits and self.limits[provider][1] and estimated != actual:
+            await self.backend.refund(provider, estimated - actual, self.limits[provider][1])
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Configured limits, total queueing time and deadline rejections per provider."""
+        return {
+            provider: {
+                "rpm": rpm,
+                "tpm": tpm,
+                "waited": round(self.waited.get(provider, 0.0), 2),
+                "rejected": self.rejected.get(provider, 0)
+            }
+            for provider, (rpm, tpm) in self.limits.items()
+        }
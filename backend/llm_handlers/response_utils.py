@@ -0,0 +1,45 @@
+import re
+from typing import Any, Dict, List
+
+ERROR_PREFIX = "Error:"
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def answer_text(value: Any) -> str:
+    """Extract the answer text from a stored provider response.
+
+    Responses are stored either as the raw answer string or as a dict with an
+    ``answer`` key (the shape the frontend reads).
+    """
+    if isinstance(value, dict):
+        value = value.get("answer") or ""
+    if not isinstance(value, str):
+        return ""
+    return value
+
+
+def is_error(text: str) -> bool:
+    """Check whether a handler returned an error string instead of an answer."""
+    return not text.strip() or text.startswith(ERROR_PREFIX)
+
+
+def valid_answers(responses: Dict[str, Any]) -> Dict[str, str]:
+    """Return the non-error answers keyed by model name."""
+    answers = {}
+    for model, value in (responses or {}).items():
+        text = answer_text(value)
+        if not is_error(text):
+            answers[model.lower()] = text
+    return answers
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used by the local analysis stages."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split an answer into sentences (and lines), dropping empty pieces."""
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
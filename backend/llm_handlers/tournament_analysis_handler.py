@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .analysis_handler import AnalysisHandler
+from .consensus_detector import ConsensusDetector
+from .fast_analysis_handler import FastAnalysisHandler
+from .provider_guard import ProviderGuard
+from .response_utils import valid_answers
+
+logger = logging.getLogger(__name__)
+
+COMPARISON_SYSTEM_PROMPT = "You are an expert at comparing LLM responses. Always format your response with WINNER: and NOTES: sections."
+
+REDUCE_SYSTEM_PROMPT = "You are an expert at analyzing LLM responses. Always format your response with SUMMARY: and EXPLANATION: sections."
+
+
+class TournamentAnalysisHandler(AnalysisHandler):
+    """
+    Map-reduce analysis that scales to any number of model answers.
+
+    The map step runs a single-elimination tournament of small-group
+    comparisons (at most ``max_concurrency`` in flight) so every prompt stays
+    bounded regardless of how many models answered. The reduce step writes the
+    final summary from the champion's answer and the notes collected along the
+    way. Groups whose comparison fails are decided by the local fast ranker.
+    """
+
+    def __init__(self, group_size: int = 2, max_concurrency: int = 4,
+                 max_answer_chars: int = 4000, consensus_detector: Optional[ConsensusDetector] = None,
+                 guard: Optional[ProviderGuard] = None):
+        super().__init__(consensus_detector, guard)
+        if group_size < 2:
+            raise ValueError("group_size must be at least 2")
+        self.group_size = group_size
+        self.max_concurrency = max_concurrency
+        self.max_answer_chars = max_answer_chars
+        self.fast_ranker = FastAnalysisHandler()
+
+    def _local_winner(self, question: str, group: List[str], answers: Dict[str, str]) -> str:
+        features = self.fast_ranker.feature_matrix(question, [answers[m] for m in group])
+        return group[int(np.argmax(features @ self.fast_ranker.weights))]
+
+    async def _compare(self, question: str, group: List[str], answers: Dict[str, str],
+                       round_number: int, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        candidates = "\n\n".join(
+            f"[{model}]\n{answers[model][:self.max_answer_chars]}" for model in group
+        )
+        prompt = f"""Compare these answers to the question: "{question}"
+
+{candidates}
+
+Pick the most accurate and helpful answer (must be one of: {", ".join(group)}).
+
+Format your response exactly like this:
+WINNER: [model name]
+NOTES: [the strongest points across these answers, at most three sentences]"""
+
+        async with semaphore:
+            started = time.perf_counter()
+            winner, notes, fallback = None, "", False
+            try:
+                content = await self._complete(COMPARISON_SYSTEM_PROMPT, prompt, max_tokens=300)
+                winner_match = re.search(r'WINNER:\s*\[?([\w.-]+)', content)
+                notes_match = re.search(r'NOTES:\s*(.*?)$', content, re.DOTALL)
+                if winner_match and winner_match.group(1).lower() in group:
+                    winner = winner_match.group(1).lower()
+                    notes = notes_match.group(1).strip() if notes_match else ""
+            except Exception as e:
+                logger.error(f"Comparison of {group} failed: {str(e)}")
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        if winner is None:
+            winner, fallback = self._local_winner(question, group, answers), True
+
+        return {
+            "round": round_number,
+            "models": group,
+            "winner": winner,
+            "notes": notes,
+            "latencyMs": round(latency_ms, 2),
+            "fallback": fallback
+        }
+
+    async def _reduce(self, question: str, champion: str, answers: Dict[str, str],
+                      comparisons: List[Dict[str, Any]]) -> Dict[str, str]:
+        notes = "\n".join(f"- {c['notes']}" for c in comparisons if c["notes"])
+        prompt = f"""The best answer to the question "{question}" came from {champion}:
+
+{answers[champion][:self.max_answer_chars]}
+
+Notes gathered while comparing all {len(answers)} answers:
+{notes or "- none"}
+
+Write a comprehensive summary that combines the best aspects of the answers, and explain why {champion}'s answer was the best.
+
+Format your response exactly like this:
+SUMMARY: [your comprehensive summary here]
+EXPLANATION: [your explanation here]"""
+
+        try:
+            content = await self._complete(REDUCE_SYSTEM_PROMPT, prompt)
+            summary_match = re.search(r'SUMMARY:\s*(.*?)(?=EXPLANATION:|$)', content, re.DOTALL)
+            explanation_match = re.search(r'EXPLANATION:\s*(.*?)$', content, re.DOTALL)
+            if summary_match and explanation_match:
+                return {
+                    "summary": summary_match.group(1).strip(),
+                    "explanation": explanation_match.group(1).strip()
+                }
+            logger.error(f"Failed to parse reduce response: {content}")
+        except Exception as e:
+            logger.error(f"Reduce step failed: {str(e)}")
+
+        return {
+            "summary": self.fast_ranker.summarize(answers[champion]),
+            "explanation": f"{champion} won the tournament of {len(answers)} answers."
+        }
+
+    async def analyze_responses(self, question: str, responses: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rank any number of responses with a comparison tournament.
+        """
+        try:
+            local_analysis = self.consensus_detector.detect(responses)
+            if local_analysis:
+                return local_analysis
+
+            answers = valid_answers(responses)
+            if not answers:
+                return {
+                    "error": "No valid responses to analyze",
+                    "summary": "Analysis failed",
+                    "bestModel": "unknown"
+                }
+
+            started = time.perf_counter()
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            rounds_won = {model: 0 for model in answers}
+            comparisons = []
+            contenders = list(answers.keys())
+            round_number = 1
+
+            while len(contenders) > 1:
+                groups = [contenders[i:i + self.group_size]
+                          for i in range(0, len(contenders), self.group_size)]
+                # A lone leftover contender gets a bye into the next round
+                byes = [group[0] for group in groups if len(group) == 1]
+                results = await asyncio.gather(*[
+                    self._compare(question, group, answers, round_number, semaphore)
+                    for group in groups if len(group) > 1
+                ])
+                comparisons.extend(results)
+                contenders = [result["winner"] for result in results] + byes
+                for model in contenders:
+                    rounds_won[model] += 1
+                round_number += 1
+
+            champion = contenders[0]
+            reduced = await self._reduce(question, champion, answers, comparisons)
+            ranking = sorted(answers, key=lambda model: -rounds_won[model])
+
+            return {
+                "summary": reduced["summary"],
+                "bestModel": champion,
+                "explanation": reduced["explanation"],
+                "source": "tournament",
+                "ranking": [
+                    {"model": model, "roundsWon": rounds_won[model]} for model in ranking
+                ],
+                "comparisons": comparisons,
+                "latencyMs": round((time.perf_counter() - started) * 1000, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Error in tournament analysis: {str(e)}")
+            return {
+                "error": str(e),
+                "summary": "Analysis failed",
+                "bestModel": "unknown"
+            }
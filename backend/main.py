@@ -1,19 +1,43 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import asyncio
 from llm_handlers import (
     LLMHandlerFactory,
-    AnalysisHandler
+    AnalysisHandler,
+    FastAnalysisHandler,
+    TournamentAnalysisHandler,
+    JudgeEnsembleHandler,
+    AnalysisCache,
+    ModelRouter,
+    CascadeHandler,
+    KeyQuestionsPipeline,
+    CostEstimator,
+    LatencyModel,
+    KeyPoolManager,
+    RateLimiter,
+    FirebaseRateLimitBackend,
+    ProviderGuard
 )
+from llm_handlers.prompt_templates import RenderedPrompt, templates
+from llm_handlers.response_utils import valid_answers
+from auth import AuthError, Forbidden, authorize, authorize_admin, bearer_token
+from admission import FairScheduler, OverloadController, INTERACTIVE, BATCH
+from realtime import PubSubHub
+from search import SearchIndex
+from storage import (MessageStore, IdempotencyRegistry, ClaimInProgress, ColdArchive, BlobStore, new_message_id,
+                     is_message_id, message_id_timestamp)
 import firebase_admin
-from firebase_admin import credentials, db
+from firebase_admin import credentials
 import os
 from dotenv import load_dotenv
 import logging
+import math
 import time
 import json
+import zlib
 
 # Load environment variables
 load_dotenv()
@@ -30,6 +54,81 @@ firebase_admin.initialize_app(cred, {
 
 app = FastAPI()
 
+# Analysis results keyed by question + response content, shared across requests
+analysis_cache = AnalysisCache()
+
+# Handlers draw the least-loaded of each provider's keys (<PROVIDER>_API_KEYS,
+# comma separated); rate-limited keys cool down until their quota resets
+key_pools = KeyPoolManager.from_env(LLMHandlerFactory.get_available_models())
+LLMHandlerFactory.key_pools = key_pools
+
+# Outbound RPM/TPM buckets from <PROVIDER>_RPM / <PROVIDER>_TPM (per key); with
+# RATE_LIMIT_BACKEND=firebase all workers draw from one shared quota
+rate_limiter = RateLimiter.from_env(
+    LLMHandlerFactory.get_available_models(),
+    key_counts={model: len(key_pools.get(model)) for model in LLMHandlerFactory.get_available_models()
+                if key_pools.get(model)},
+    backend=FirebaseRateLimitBackend() if os.getenv("RATE_LIMIT_BACKEND") == "firebase" else None
+)
+
+# Picks providers for llm_types ["auto"], learning from analysis wins and latency
+router = ModelRouter()
+
+# cascade=true asks the fast model first and fans out only on low confidence
+cascade = CascadeHandler(fast_model=os.getenv("CASCADE_FAST_MODEL", "gemini"))
+
+# Predicts tokens, latency and cost per provider before a fan-out; providers
+# that would break the optional per-request budgets are not called
+estimator = CostEstimator()
+MAX_REQUEST_COST = float(os.getenv("MAX_REQUEST_COST", "inf"))  # USD
+MAX_REQUEST_SECONDS = float(os.getenv("MAX_REQUEST_SECONDS", "inf"))
+
+# Per-provider latency histograms; each call times out at about p99 x 1.5 for
+# its max_tokens band, and the histograms survive restarts
+latency_model = LatencyModel(os.getenv("LATENCY_MODEL_PATH", "latency_model.json"))
+
+# Every provider call (answers, judges, key questions) goes through the same
+# rate limiter and adaptive timeout
+guard = ProviderGuard(rate_limiter, latency_model, estimator, router)
+
+# key_questions=true generates the shared key questions once, then fans out
+key_questions = KeyQuestionsPipeline(guard=guard)
+
+# Pushes response/analysis/status deltas to connected clients
+hub = PubSubHub()
+
+# Old conversations are compacted into compressed segments on local disk and
+# large response bodies are stored once by content hash
+store = MessageStore(
+    archive=ColdArchive(os.getenv("ARCHIVE_DIR", "archive")),
+    blobs=BlobStore()
+)
+
+# With WRITE_BEHIND=true, deferred writes (write_behind=true on a request) are
+# batched into multi-path updates; otherwise every write is synchronous
+write_behind = store.enable_write_behind() if os.getenv("WRITE_BEHIND", "false").lower() == "true" else None
+
+# Per-user full-text index over questions, answers and analyses
+search_index = SearchIndex(os.getenv("SEARCH_INDEX_DIR", "search_index"))
+
+# Admission in front of the fan-out: weighted fair queueing across users, with
+# per-tier weights and in-flight caps (USER_TIERS maps user_id -> tier)
+scheduler = FairScheduler(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_REQUESTS", "16")),
+    user_tiers=json.loads(os.getenv("USER_TIERS", "{}"))
+)
+
+# LLM-judged analysis (mode=llm, tournament, ensemble) is a paid feature; users
+# of other tiers get the instant local ranker (mode=fast)
+LLM_ANALYSIS_TIERS = set(os.getenv("LLM_ANALYSIS_TIERS", "pro").split(","))
+
+# Watches loop lag, in-flight load and queue wait; under overload it trims the
+# fan-out, then falls back to local analysis, then sheds with 503
+overload = OverloadController(scheduler)
+
+# Retried submissions with the same message_id reuse the first run's outcome
+idempotency = IdempotencyRegistry(store)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -37,99 +136,622 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Queue-Time", "Server-Timing", "X-Degradation"],
 )
 
+# Client-minted message IDs may run at most this far ahead of the server clock
+MAX_MESSAGE_ID_SKEW = 300  # seconds
+
 class Message(BaseModel):
     user_id: str
-    message_id: str
+    message_id: Optional[str] = None  # a ULID; minted server-side when omitted
     content: str
-    llm_types: List[str]
+    llm_types: List[str]  # ["auto"] lets the router pick the providers
+    cascade: bool = False  # escalate past the fast model only when unsure
+    key_questions: bool = False  # two-stage prompting with shared key questions
+    write_behind: bool = False  # acknowledge before the writes are durable
+    priority: str = INTERACTIVE  # "batch" requests wait for interactive ones
 
 class AnalysisRequest(BaseModel):
     user_id: str
     message_id: str
     responses: Dict[str, str]
+    judges: Optional[List[str]] = None
+    write_behind: bool = False
+
+@app.on_event("startup")
+async def start_write_behind():
+    if write_behind is not None:
+        write_behind.start()
+
+@app.on_event("startup")
+async def start_overload_monitor():
+    overload.start()
+
+@app.on_event("shutdown")
+async def stop_overload_monitor():
+    await overload.stop()
+
+@app.on_event("shutdown")
+async def drain_write_behind():
+    if write_behind is not None:
+        await write_behind.stop()
+
+@app.on_event("shutdown")
+async def flush_search_index():
+    await asyncio.to_thread(search_index.flush)
+
+@app.on_event("shutdown")
+async def save_latency_model():
+    await asyncio.to_thread(latency_model.save)
+
+async def process_message(message: Message, degradation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Store a message, fan it out to the requested LLM handlers and store the answers.
+
+    ``degradation`` is the overload controller's decision for this request.
+    """
+    # Store message in Firebase
+    await store.save_message(message.user_id, message.message_id, message.content,
+                             defer=message.write_behind)
+    await asyncio.to_thread(search_index.index, message.user_id, message.message_id,
+                            "question", message.content)
+
+    hub.publish(message.user_id, {
+        "type": "status",
+        "messageId": message.message_id,
+        "status": "processing"
+    })
+
+    # Initialize LLM handlers
+    llm_types = message.llm_types
+    routed = [llm_type.lower() for llm_type in llm_types] == ["auto"]
+    if routed:
+        llm_types = router.choose(message.content)
+
+    trimmed = []
+    max_providers = (degradation or {}).get("maxProviders")
+    if max_providers and len(llm_types) > max_providers:
+        # Overloaded: only the best-scoring providers are called
+        scores = router.scores(message.content, [llm_type.lower() for llm_type in llm_types])
+        ranked = sorted(llm_types, reverse=True,
+                        key=lambda llm_type: scores.get(llm_type.lower(), {}).get("score", float("-inf")))
+        llm_types, trimmed = ranked[:max_providers], ranked[max_providers:]
+        logger.info(f"Overload: dropping {trimmed} for message {message.message_id}")
+
+    factory = LLMHandlerFactory()
+    handlers = {}
+    for llm_type in llm_types:
+        try:
+            handler = factory.get_handler(llm_type)
+            handlers[llm_type.lower()] = handler
+        except ValueError as e:
+            logger.error(f"Error creating handler for {llm_type}: {str(e)}")
+
+    prompt, generate_kwargs, shared_questions = message.content, {}, []
+    if message.key_questions and handlers:
+        prompt, generate_kwargs, shared_questions = await key_questions.prepare(
+            message.content, handlers, router.latency)
+        if shared_questions:
+            hub.publish(message.user_id, {
+                "type": "key_questions",
+                "messageId": message.message_id,
+                "keyQuestions": shared_questions
+            })
+
+    # Without key questions every provider gets the "answer" template and its output budget
+    max_tokens = generate_kwargs.get("max_tokens", templates.get("answer").max_tokens)
+
+    def render_for(llm_type):
+        # Oversized input is cut locally instead of failing slowly upstream
+        if shared_questions:
+            # The stage-two prompt is already rendered; only the provider's system prompt is added
+            system = templates.system_prompt(llm_type)
+            return RenderedPrompt(system, templates.fit(llm_type, prompt, max_tokens, system), max_tokens)
+        return templates.render("answer", llm_type, max_tokens, user_input=prompt)
+
+    # Budgets are checked against what each provider will really be sent
+    rendered_prompts = {llm_type: render_for(llm_type) for llm_type in handlers}
+
+    def estimate_calls():
+        return estimator.estimate_fan_out(
+            list(handlers), prompt, max_tokens,
+            systems={llm_type: rendered_prompts[llm_type].system for llm_type in handlers},
+            prompts={llm_type: rendered_prompts[llm_type].prompt for llm_type in handlers})
+
+    estimate = estimate_calls()
+    admitted = estimator.admit(estimate, MAX_REQUEST_COST, MAX_REQUEST_SECONDS)
+    skipped = [llm_type for llm_type in handlers if llm_type not in admitted]
+    if skipped:
+        logger.info(f"Skipping {skipped} for message {message.message_id}: over the request budget")
+        handlers = {llm_type: handlers[llm_type] for llm_type in admitted}
+        estimate = estimate_calls()
+    hub.publish(message.user_id, {
+        "type": "estimate",
+        "messageId": message.message_id,
+        "estimatedTime": estimate["estimatedTime"],
+        "cost": estimate["cost"]
+    })
+
+    # Get responses from all handlers concurrently, pushing each as it lands
+    async def get_response(llm_type, handler, sample=False):
+        response = await guard.call(llm_type, handler, rendered_prompts[llm_type], **generate_kwargs)
+        if not sample:
+            # Cascade self-consistency samples are scored, never shown
+            hub.publish(message.user_id, {
+                "type": "response",
+                "messageId": message.message_id,
+                "model": llm_type,
+                "answer": response
+            })
+        return response
+
+    cascade_info = None
+    if message.cascade and handlers:
+        response_data, cascade_info = await cascade.run(handlers, get_response)
+    else:
+        responses = await asyncio.gather(*[
+            get_response(llm_type, handler) for llm_type, handler in handlers.items()
+        ])
+        response_data = dict(zip(handlers.keys(), responses))
+
+    # Store responses in Firebase
+
+    await store.save_responses(message.user_id, message.message_id, response_data,
+                               defer=message.write_behind)
+    analysis_cache.invalidate(message.user_id, message.message_id)
+    router.observe(message.user_id, message.message_id, message.content, list(valid_answers(response_data)))
+    await asyncio.to_thread(search_index.index, message.user_id, message.message_id,
+                            "answers", "\n".join(valid_answers(response_data).values()))
+    hub.publish(message.user_id, {
+        "type": "status",
+        "messageId": message.message_id,
+        "status": "complete"
+    })
+
+    result = {
+        "message": "Message sent successfully",
+        "message_id": message.message_id,
+        "estimatedTime": estimate["estimatedTime"],
+        "estimate": estimate
+    }
+    if skipped:
+        result["skipped"] = skipped
+    if degradation and degradation["stage"] != "normal":
+        result["degradation"] = dict(degradation, trimmed=trimmed)
+    if routed:
+        result["llm_types"] = list(handlers)
+    if cascade_info is not None:
+        result["cascade"] = cascade_info
+    if shared_questions:
+        result["keyQuestions"] = shared_questions
+    return result
 
 @app.post("/api/send_message")
-async def send_message(message: Message):
+async def send_message(message: Message, response: Response):
     """
     Send a message to be processed by multiple LLM handlers.
+
+    Submissions are idempotent per (user_id, message_id): a retry while the
+    first request is running waits for it, and a retry after it finished
+    returns the stored outcome without calling the providers again.
+    New work waits for the user's turn in the fair scheduler; the time spent
+    queueing is returned in the X-Queue-Time header (milliseconds).
     """
-    try:
-        # Store message in Firebase
-        ref = db.reference(f'messages/{message.user_id}/{message.message_id}')
-        await ref.set({
-            'content': message.content,
-            'timestamp': {'serverValue': 'timestamp'}
-        })
+    if message.priority not in (INTERACTIVE, BATCH):
+        raise HTTPException(status_code=400, detail=f"Unknown priority: {message.priority}")
+    if message.message_id:
+        # History pages are key ranges, so keys have to be time-ordered
+        if not is_message_id(message.message_id):
+            raise HTTPException(status_code=400, detail="message_id must be a ULID")
+        if message_id_timestamp(message.message_id) > (time.time() + MAX_MESSAGE_ID_SKEW) * 1000:
+            raise HTTPException(status_code=400, detail="message_id is dated in the future")
+        # A retry of a message that already ran is answered before admission, so it is never shed
+        try:
+            replayed = await idempotency.outcome(message.user_id, message.message_id)
+        except Exception as e:
+            logger.error(f"Error in send_message: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        if replayed is not None:
+            logger.info(f"Returning stored outcome for duplicate message {message.message_id}")
+            return replayed
+    degradation = overload.decide()
+    response.headers["X-Degradation"] = degradation["stage"]
+    if degradation["shed"]:
+        raise HTTPException(status_code=503, detail="Server overloaded, retry later",
+                            headers={"Retry-After": str(degradation["retryAfter"]), "X-Degradation": "shedding"})
+    if not message.message_id:
+        message.message_id = new_message_id()
 
-        # Initialize LLM handlers
-        factory = LLMHandlerFactory()
-        handlers = []
-        for llm_type in message.llm_types:
-            try:
-                handler = factory.get_handler(llm_type, "test_api_key")  # Replace with actual API key
-                handlers.append(handler)
-            except ValueError as e:
-                logger.error(f"Error creating handler for {llm_type}: {str(e)}")
-
-        # Get responses from all handlers concurrently
-        async def get_response(handler):
-            try:
-                return await handler.generate_response(message.content)
-            except Exception as e:
-                logger.error(f"Error getting response from {handler.__class__.__name__}: {str(e)}")
-                return f"Error: {str(e)}"
-
-        responses = await asyncio.gather(*[get_response(handler) for handler in handlers])
-
-        # Store responses in Firebase
-        response_data = {}
-        for handler, response in zip(handlers, responses):
-            response_data[handler.__class__.__name__.lower().replace('handler', '')] = response
-
-        await ref.child('responses').set(response_data)
+    queue_time = 0.0
 
-        return {
-            "message": "Message sent successfully",
-            "message_id": message.message_id
-        }
+    async def scheduled():
+        nonlocal queue_time, degradation
+        routed = [llm_type.lower() for llm_type in message.llm_types] == ["auto"]
+        providers = router.max_models if routed else len(message.llm_types)
+        # Charge the fan-out the current load would actually allow
+        cost = min(providers, degradation["maxProviders"] or providers)
+        async with scheduler.slot(message.user_id, cost, message.priority) as ticket:
+            queue_time = ticket.queue_time
+            # Load may have changed while queued, so the fan-out follows the load at admission
+            degradation = overload.decide(admitted=True)
+            return await process_message(message, degradation)
 
+    try:
+        result = await idempotency.run(
+            message.user_id,
+            message.message_id,
+            scheduled
+        )
+        response.headers["X-Degradation"] = degradation["stage"]
+        response.headers["X-Queue-Time"] = f"{queue_time * 1000:.1f}"
+        response.headers["Server-Timing"] = f"queue;dur={queue_time * 1000:.1f}"
+        return result
+
+    except ClaimInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error in send_message: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def estimate_analysis_time(mode: str, analyzer: AnalysisHandler, question: str,
+                           responses: Dict[str, Any]) -> float:
+    """Predicted seconds an analysis takes, shown to the client while it waits."""
+    if mode == "fast":
+        return 0.0
+    prompt = AnalysisHandler._build_prompt(question, responses)
+    if mode == "ensemble":
+        return estimator.estimate_fan_out(list(analyzer.judges), prompt)["estimatedTime"]
+    if mode == "tournament":
+        # One short comparison per bracket round
+        rounds = math.ceil(math.log(max(len(responses), 2), analyzer.group_size))
+        return round(estimator.estimate("deepseek", prompt, 300)["latency"] * rounds, 2)
+    return estimator.estimate("deepseek", prompt)["latency"]
+
+ANALYSIS_MODES = {
+    "llm": lambda: AnalysisHandler(guard=guard),
+    "fast": FastAnalysisHandler,
+    "tournament": lambda: TournamentAnalysisHandler(guard=guard),
+    "ensemble": lambda: JudgeEnsembleHandler(guard=guard)
+}
+
 @app.post("/api/analyze_responses")
-async def analyze_responses(request: AnalysisRequest):
+async def analyze_responses(request: AnalysisRequest, response: Response, mode: str = "llm"):
     """
     Analyze responses from multiple LLM handlers.
+
+    mode=llm uses the LLM judge, mode=fast ranks the responses locally and
+    mode=tournament runs pairwise comparisons that scale to any number of models
+    and mode=ensemble lets several handlers vote (optionally the given judges).
+    The LLM-judged modes are reserved for LLM_ANALYSIS_TIERS; other users,
+    and everyone under overload, get mode=fast.
     """
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis mode: {mode}")
+    if mode == "ensemble" and request.judges:
+        available = LLMHandlerFactory.get_available_models()
+        unknown = [name for name in request.judges if name.lower() not in available]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown judges: {', '.join(unknown)}")
+    degradation = overload.decide()
+    response.headers["X-Degradation"] = degradation["stage"]
+    if degradation["shed"]:
+        raise HTTPException(status_code=503, detail="Server overloaded, retry later",
+                            headers={"Retry-After": str(degradation["retryAfter"]), "X-Degradation": "shedding"})
+    requested_mode = mode
+    tier = scheduler.tier(request.user_id)
+    tier_limited = mode != "fast" and tier not in LLM_ANALYSIS_TIERS
+    if tier_limited or (not degradation["llmAnalysis"] and mode != "fast"):
+        mode = "fast"
+
     try:
         # Get responses from Firebase
-        ref = db.reference(f'messages/{request.user_id}/{request.message_id}/responses')
-        responses = await ref.get()
+        responses = await store.get_responses(request.user_id, request.message_id)
 
         if not responses:
             raise HTTPException(status_code=404, detail="No responses found")
 
-        # Analyze responses
-        analyzer = AnalysisHandler()
-        analysis = await analyzer.analyze_responses(responses)
+        question = await store.get_question(request.user_id, request.message_id)
+
+        # Analyze responses (answers that agree are summarized locally)
+        cache_mode = mode
+        if mode == "ensemble" and request.judges:
+            analyzer = JudgeEnsembleHandler.from_names(request.judges, guard=guard)
+            cache_mode = f"ensemble:{','.join(sorted(request.judges))}"
+        else:
+            analyzer = ANALYSIS_MODES[mode]()
+        estimated_time = estimate_analysis_time(mode, analyzer, question, responses)
+        hub.publish(request.user_id, {
+            "type": "status",
+            "messageId": request.message_id,
+            "status": "analyzing",
+            "estimatedTime": estimated_time
+        })
+        analysis = await analysis_cache.get_or_compute(
+            question,
+            responses,
+            lambda: analyzer.analyze_responses(question, responses),
+            mode=cache_mode,
+            message=(request.user_id, request.message_id)
+        )
 
         # Store analysis in Firebase
-        await ref.parent.child('analysis').set({
-            'content': analysis,
-            'timestamp': {'serverValue': 'timestamp'}
+        await store.save_analysis(request.user_id, request.message_id, analysis,
+                                  defer=request.write_behind)
+        if "error" not in analysis:
+            router.record_win(request.user_id, request.message_id, analysis.get("bestModel"))
+            await asyncio.to_thread(search_index.index, request.user_id, request.message_id, "analysis",
+                                    "\n".join(filter(None, [analysis.get("summary"), analysis.get("explanation")])))
+
+        hub.publish(request.user_id, {
+            "type": "analysis",
+            "messageId": request.message_id,
+            "analysis": dict(analysis, estimatedTime=estimated_time)
         })
 
-        return {
-            "analysis": analysis
+        result = {
+            "analysis": analysis,
+            "estimatedTime": estimated_time
         }
+        if tier_limited:
+            result["tierLimited"] = {"tier": tier, "requestedMode": requested_mode, "mode": mode}
+        elif mode != requested_mode:
+            result["degradation"] = {"stage": degradation["stage"], "requestedMode": requested_mode, "mode": mode}
+        return result
 
     except Exception as e:
         logger.error(f"Error in analyze_responses: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def authenticated_user(user_id: str, authorization: Optional[str] = Header(None)) -> str:
+    """
+    The user_id a request reads, once its bearer ID token is shown to belong to it.
+
+    These reads use admin credentials, so the database rules no longer stand
+    between a caller and another user's history.
+    """
+    try:
+        await authorize(bearer_token(authorization), user_id)
+    except Forbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+async def admin_user(authorization: Optional[str] = Header(None)) -> str:
+    """The uid of an ID token with the admin custom claim, for maintenance endpoints."""
+    try:
+        claims = await authorize_admin(bearer_token(authorization))
+    except Forbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return claims["uid"]
+
+@app.get("/api/messages")
+async def list_messages(user_id: str = Depends(authenticated_user), cursor: Optional[str] = None, limit: int = 20):
+    """
+    Page through a user's message history, newest first.
+
+    Pass the returned next_cursor back as cursor to fetch the following page;
+    it is null on the last page. The first page also carries seq, read before
+    the page, for the client to pass to /api/sync from then on.
+    """
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+    try:
+        seq = None if cursor else await store.current_seq(user_id)
+        messages, next_cursor = await store.list_messages(user_id, cursor, limit)
+        result = {
+            "messages": messages,
+            "next_cursor": next_cursor
+        }
+        if seq is not None:
+            result["seq"] = seq
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in list_messages: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/sync")
+async def sync_changes(user_id: str = Depends(authenticated_user), since: int = 0, limit: int = 500):
+    """
+    Return only the records changed after the client's last seen sequence.
+
+    Reconnecting clients pass the previous response's seq as since; when
+    has_more is true they call again immediately to fetch the rest.
+    """
+    if since < 0 or not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="since must be >= 0 and limit between 1 and 1000")
+
+    try:
+        return await store.changes_since(user_id, since, limit)
+
+    except Exception as e:
+        logger.error(f"Error in sync_changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/export")
+async def export_history(user_id: str = Depends(authenticated_user), cursor: Optional[str] = None,
+                         compress: bool = False):
+    """
+    Stream a user's full message history as NDJSON, oldest first.
+
+    Storage is paged with the ordered-key cursor, so memory stays flat however
+    long the history is. Every line carries the message id; to resume an
+    interrupted export pass the id of the last complete line as cursor.
+    Headers are sent before the first page is read, so a failure mid-stream
+    ends the body with an {"error", "resumeAfter"} line instead.
+    With compress=true the stream is gzip-compressed on the fly.
+    """
+    async def gzipped():
+        compressor = zlib.compressobj(wbits=31)
+        async for line in store.export_lines(user_id, after=cursor):
+            chunk = compressor.compress(line)
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    filename = f"export-{user_id}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        gzipped() if compress else store.export_lines(user_id, after=cursor),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/search")
+async def search_messages(q: str, user_id: str = Depends(authenticated_user), limit: int = 10):
+    """
+    Full-text search over a user's questions, answers and analyses.
+
+    Results are BM25-ranked messages, best first, with the fields that matched.
+    """
+    if not q.strip() or not 1 <= limit <= 50:
+        raise HTTPException(status_code=400, detail="q must not be empty and limit must be between 1 and 50")
+
+    try:
+        start = time.perf_counter()
+        hits = await asyncio.to_thread(search_index.search, user_id, q, limit)
+        took_ms = round((time.perf_counter() - start) * 1000, 2)
+        records = await asyncio.gather(*[store.get_message(user_id, hit["id"]) for hit in hits])
+        return {
+            "results": [dict(hit, message=record) for hit, record in zip(hits, records)],
+            "took_ms": took_ms
+        }
+
+    except Exception as e:
+        logger.error(f"Error in search_messages: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/archive/compact")
+async def compact_archive(older_than_days: float = 30, user_id: Optional[str] = None,
+                          admin: str = Depends(admin_user)):
+    """
+    Move conversations older than older_than_days into the cold archive.
+
+    Compacts one user when user_id is given, otherwise every user. Archived
+    messages stay available through /api/messages and /api/sync.
+    """
+    if older_than_days < 0:
+        raise HTTPException(status_code=400, detail="older_than_days must be >= 0")
+
+    try:
+        if user_id:
+            archived = {user_id: await store.compact(user_id, older_than_days)}
+        else:
+            archived = await store.compact_all(older_than_days)
+        return {"archived": archived}
+
+    except Exception as e:
+        logger.error(f"Error in compact_archive: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/blobs/collect")
+async def collect_blobs(grace_seconds: float = 3600, admin: str = Depends(admin_user)):
+    """Delete stored response bodies that no message references any more."""
+    if grace_seconds < 0:
+        raise HTTPException(status_code=400, detail="grace_seconds must be >= 0")
+
+    try:
+        return {"deleted": await store.collect_garbage(grace_seconds)}
+
+    except Exception as e:
+        logger.error(f"Error in collect_blobs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/claims/purge")
+async def purge_claims(older_than_seconds: float = 86400, admin: str = Depends(admin_user)):
+    """Delete idempotency claims older than older_than_seconds; retries after that run again."""
+    if older_than_seconds < 0:
+        raise HTTPException(status_code=400, detail="older_than_seconds must be >= 0")
+
+    try:
+        return {"purged": await store.purge_claims(older_than_seconds)}
+
+    except Exception as e:
+        logger.error(f"Error in purge_claims: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/metrics")
+async def metrics():
+    """Queue depths and counters for the in-process caches, queues and hubs."""
+    return {
+        "write_behind": write_behind.stats() if write_behind is not None else None,
+        "recent_writes": store.recent_writes.stats(),
+        "archive": store.archive.stats(),
+        "blobs": store.blobs.stats(),
+        "search": search_index.stats(),
+        "router": router.stats(),
+        "estimator": estimator.stats(),
+        "latency": latency_model.stats(),
+        "keys": key_pools.stats(),
+        "rateLimits": rate_limiter.stats(),
+        "key_questions": key_questions.stats(),
+        "hub": hub.stats(),
+        "scheduler": scheduler.stats(),
+        "overload": overload.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "idempotency": idempotency.stats()
+    }
+
+# Seconds a new socket has to send its auth frame
+WS_AUTH_TIMEOUT = 10.0
+
+@app.websocket("/ws/{user_id}")
+async def message_updates(websocket: WebSocket, user_id: str):
+    """
+    Push response, analysis and status deltas for a user's messages.
+
+    One socket per session replaces the per-message, per-model database
+    listeners. Clients that fall too far behind are disconnected with 1013
+    and are expected to reconnect.
+
+    Browsers cannot set headers on a WebSocket, so the first frame must be
+    ``{"type": "auth", "token": <Firebase ID token>}`` for ``user_id``;
+    nothing is pushed before it verifies, and a bad or late token closes
+    the socket with 1008.
+    """
+    await websocket.accept()
+    try:
+        frame = await asyncio.wait_for(websocket.receive_json(), WS_AUTH_TIMEOUT)
+        await authorize(frame.get("token") if isinstance(frame, dict) else None, user_id)
+    except WebSocketDisconnect:
+        return
+    except (AuthError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning(f"Rejected WebSocket for user {user_id}: {str(e) or 'no auth frame'}")
+        await websocket.close(code=1008)
+        return
+    subscription = hub.subscribe(user_id)
+
+    async def forward_events():
+        while True:
+            event = await subscription.get()
+            if event is None:
+                await websocket.close(code=1013)
+                return
+            await websocket.send_json(event)
+
+    async def wait_for_disconnect():
+        while True:
+            await websocket.receive_text()
+
+    tasks = [
+        asyncio.create_task(forward_events()),
+        asyncio.create_task(wait_for_disconnect())
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                logger.error(f"WebSocket error for user {user_id}: {str(task.exception())}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unsubscribe(subscription)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
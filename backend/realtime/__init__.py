@@ -0,0 +1,6 @@
+from .pubsub_hub import PubSubHub, Subscription
+
+__all__ = [
+    'PubSubHub',
+    'Subscription'
+]
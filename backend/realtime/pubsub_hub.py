@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single connection's bounded queue of events for one user."""
+
+    def __init__(self, user_id: str, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+        self.created_at = time.time()
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Enqueue without blocking; returns False when the queue is full."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self) -> None:
+        """Discard pending events and wake the consumer with the end marker."""
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Next event, or None once the subscription has been dropped."""
+        return await self.queue.get()
+
+
+class PubSubHub:
+    """
+    In-process pub/sub hub fanning message deltas out to each user's sockets.
+
+    Publishing never blocks the request path: every connection has a bounded
+    queue, and a consumer that falls ``max_queue`` events behind is dropped
+    so it can reconnect and resync instead of holding memory indefinitely.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.max_queue)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: str, event: Dict[str, Any]) -> int:
+        """Deliver an event to every connection of a user; returns the delivery count."""
+        self.published += 1
+        delivered = 0
+        for subscription in list(self._subscriptions.get(user_id, ())):
+            if subscription.offer(event):
+                delivered += 1
+                continue
+            logger.warning(f"Dropping slow subscriber for user {user_id}")
+            self.unsubscribe(subscription)
+            subscription.drop()
+            self.dropped += 1
+        return delivered
+
+    def stats(self) -> Dict[str, int]:
+        """Connection and delivery counters."""
+        return {
+            "users": len(self._subscriptions),
+            "connections": sum(len(subs) for subs in self._subscriptions.values()),
+            "published": self.published,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,9 @@
+from .search_index import SearchIndex, UserIndex
+from .postings import encode_postings, decode_postings
+
+__all__ = [
+    'SearchIndex',
+    'UserIndex',
+    'encode_postings',
+    'decode_postings'
+]
@@ -0,0 +1,47 @@
+from typing import Iterable, List, Tuple
+
+Posting = Tuple[int, int]
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(postings: Iterable[Posting]) -> bytes:
+    """
+    Compress ``(doc, term_frequency)`` pairs sorted by doc number.
+
+    Doc numbers are delta-encoded and every integer is written as a LEB128
+    varint, so dense posting lists take one or two bytes per entry.
+    """
+    out = bytearray()
+    last = 0
+    for doc, frequency in postings:
+        _put_varint(out, doc - last)
+        _put_varint(out, frequency)
+        last = doc
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> List[Posting]:
+    """Inverse of ``encode_postings``."""
+    postings = []
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = 0
+        shift = 0
+    doc = 0
+    for index in range(0, len(values), 2):
+        doc += values[index]
+        postings.append((doc, values[index + 1]))
+    return postings
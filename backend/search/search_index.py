@@ -0,0 +1,284 @@
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from llm_handlers.response_utils import tokenize
+
+from .postings import Posting, decode_postings, encode_postings
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FILE = "lexicon.json"
+
+
+class UserIndex:
+    """
+    One user's inverted index: an immutable on-disk base plus an in-memory delta.
+
+    Every indexed field of a message (question, answers, analysis) is its own
+    document. Re-indexing a field tombstones the previous document and adds a
+    new one to the delta, so updates never touch the base. ``persist()``
+    merges base and delta into a new generation of compressed postings,
+    renumbering documents to drop tombstones; the lexicon is replaced last
+    and is the commit point. The postings file is memory-mapped, and a query
+    decodes only the posting lists of its own terms.
+    """
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.pins = 0  # callers currently using this index; guarded by SearchIndex._lock
+        self.docs: List[Optional[List[Any]]] = []  # [message_id, field, length]
+        self.live: Dict[Tuple[str, str], int] = {}
+        self.lexicon: Dict[str, List[int]] = {}  # term -> [offset, length]
+        self.delta: Dict[str, List[Posting]] = defaultdict(list)
+        self.field_stats: Dict[str, List[int]] = defaultdict(lambda: [0, 0])  # total length, docs
+        self.dirty = 0
+        self.generation = 0
+        self._file = None
+        self._mapped: Optional[mmap.mmap] = None
+        self._load()
+
+    def _postings_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"postings-{generation}.bin")
+
+    def _load(self) -> None:
+        lexicon_path = os.path.join(self.directory, LEXICON_FILE)
+        if not os.path.exists(lexicon_path):
+            return
+        with open(lexicon_path) as lexicon_file:
+            data = json.load(lexicon_file)
+        self.generation = data["generation"]
+        self.docs = data["docs"]
+        self.lexicon = data["terms"]
+        for doc, (message_id, field, length) in enumerate(self.docs):
+            self.live[(message_id, field)] = doc
+            self.field_stats[field][0] += length
+            self.field_stats[field][1] += 1
+        self._map()
+
+    def _map(self) -> None:
+        self.close()
+        path = self._postings_path(self.generation)
+        if os.path.getsize(path):
+            self._file = open(path, "rb")
+            self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _drop(self, message_id: str, field: str) -> None:
+        doc = self.live.pop((message_id, field), None)
+        if doc is None:
+            return
+        length = self.docs[doc][2]
+        self.docs[doc] = None
+        self.field_stats[field][0] -= length
+        self.field_stats[field][1] -= 1
+        self.dirty += 1
+
+    def add(self, message_id: str, field: str, text: str) -> None:
+        """Index (or re-index) one field of a message."""
+        self._drop(message_id, field)
+        tokens = tokenize(text or "")
+        if not tokens:
+            return
+        doc = len(self.docs)
+        self.docs.append([message_id, field, len(tokens)])
+        self.live[(message_id, field)] = doc
+        self.field_stats[field][0] += len(tokens)
+        self.field_stats[field][1] += 1
+        for term, frequency in Counter(tokens).items():
+            self.delta[term].append((doc, frequency))
+        self.dirty += 1
+
+    def remove(self, message_id: str) -> None:
+        for field in list(self.field_stats):
+            self._drop(message_id, field)
+
+    def _postings(self, term: str) -> List[Posting]:
+        postings = []
+        location = self.lexicon.get(term)
+        if location is not None and self._mapped is not None:
+            offset, length = location
+            postings = decode_postings(self._mapped[offset:offset + length])
+        return postings + self.delta.get(term, [])
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """BM25-rank messages for a query; a message scores the sum of its fields."""
+        total_docs = len(self.live)
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, set] = defaultdict(set)
+        for term in set(tokenize(query or "")):
+            postings = [(doc, frequency) for doc, frequency in self._postings(term)
+                        if self.docs[doc] is not None]
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, frequency in postings:
+                message_id, field, length = self.docs[doc]
+                total_length, count = self.field_stats[field]
+                norm = 1 - self.b + self.b * length / (total_length / count)
+                scores[message_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                matched[message_id].add(field)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [
+            {"id": message_id, "score": round(score, 4), "fields": sorted(matched[message_id])}
+            for message_id, score in top
+        ]
+
+    def persist(self) -> None:
+        """Merge the delta into a new on-disk generation, dropping tombstones."""
+        renumber = {}
+        docs = []
+        for doc, entry in enumerate(self.docs):
+            if entry is not None:
+                renumber[doc] = len(docs)
+                docs.append(entry)
+
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self.generation + 1
+        lexicon = {}
+        offset = 0
+        with open(self._postings_path(generation), "wb") as postings_file:
+            for term in sorted(set(self.lexicon) | set(self.delta)):
+                postings = [(renumber[doc], frequency) for doc, frequency in self._postings(term)
+                            if doc in renumber]
+                if not postings:
+                    continue
+                data = encode_postings(postings)
+                postings_file.write(data)
+                lexicon[term] = [offset, len(data)]
+                offset += len(data)
+            postings_file.flush()
+            os.fsync(postings_file.fileno())
+
+        lexicon_path = os.path.join(self.directory, LEXICON_FILE)
+        with open(lexicon_path + ".tmp", "w") as lexicon_file:
+            json.dump({"generation": generation, "docs": docs, "terms": lexicon}, lexicon_file)
+        os.replace(lexicon_path + ".tmp", lexicon_path)
+
+        previous = self._postings_path(self.generation)
+        self.generation = generation
+        self.docs = docs
+        self.live = {(message_id, field): doc for doc, (message_id, field, _) in enumerate(docs)}
+        self.lexicon = lexicon
+        self.delta = defaultdict(list)
+        self.dirty = 0
+        self._map()
+        if os.path.exists(previous):
+            os.remove(previous)
+
+
+class SearchIndex:
+    """
+    Per-user full-text search over questions, answers and analyses.
+
+    User indexes are loaded on demand (at most ``max_loaded_users`` idle
+    ones at a time, least recently used evicted after persisting) and persisted once
+    ``flush_threshold`` updates have accumulated in memory, on eviction and
+    on ``flush()``. All methods are blocking and thread-safe.
+    """
+
+    def __init__(self, directory: str = "search_index", max_loaded_users: int = 256,
+                 flush_threshold: int = 500):
+        self.directory = directory
+        self.max_loaded_users = max_loaded_users
+        self.flush_threshold = flush_threshold
+        self._users: "OrderedDict[str, UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.updates = 0
+
+    @contextmanager
+    def _checkout(self, user_id: str) -> Iterator[UserIndex]:
+        """
+        The user's loaded index, locked and pinned for the duration of the block.
+
+        Lookup, loading and eviction all happen under the registry lock, so
+        a directory is never loaded twice. Pinned indexes are never evicted,
+        and an evicted index is persisted before the lock is released, so no
+        write can land in an index that has already left the registry.
+        """
+        if not user_id or os.path.basename(user_id) != user_id or user_id in (".", ".."):
+            raise ValueError(f"Invalid user id for index path: {user_id!r}")
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                index = self._users[user_id] = UserIndex(os.path.join(self.directory, user_id))
+            self._users.move_to_end(user_id)
+            index.pins += 1
+            self._evict_idle()
+        try:
+            with index.lock:
+                yield index
+        finally:
+            with self._lock:
+                index.pins -= 1
+                self._evict_idle()
+
+    def _evict_idle(self) -> None:
+        """Persist and unload least recently used unpinned indexes over the limit (registry lock held)."""
+        idle = [user_id for user_id, index in self._users.items() if not index.pins]
+        for user_id in idle[:max(len(self._users) - self.max_loaded_users, 0)]:
+            old = self._users.pop(user_id)
+            with old.lock:
+                if old.dirty:
+                    old.persist()
+                old.close()
+
+    def _maybe_persist(self, index: UserIndex) -> None:
+        if index.dirty >= self.flush_threshold:
+            index.persist()
+
+    def index(self, user_id: str, message_id: str, field: str, text: str) -> None:
+        """Index one field of a message, replacing what was indexed for it before."""
+        with self._checkout(user_id) as index:
+            index.add(message_id, field, text)
+            self.updates += 1
+            self._maybe_persist(index)
+
+    def remove(self, user_id: str, message_id: str) -> None:
+        with self._checkout(user_id) as index:
+            index.remove(message_id)
+            self._maybe_persist(index)
+
+    def search(self, user_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._checkout(user_id) as index:
+            self.queries += 1
+            return index.search(query, limit)
+
+    def flush(self) -> None:
+        """Persist every loaded index with unsaved updates."""
+        with self._lock:
+            indexes = list(self._users.values())
+        for index in indexes:
+            with index.lock:
+                if index.dirty:
+                    index.persist()
+
+    def stats(self) -> Dict[str, int]:
+        """Loaded indexes, unsaved updates and query counters."""
+        with self._lock:
+            indexes = list(self._users.values())
+        return {
+            "loadedUsers": len(indexes),
+            "unsavedUpdates": sum(index.dirty for index in indexes),
+            "updates": self.updates,
+            "queries": self.queries
+        }
@@ -0,0 +1,22 @@
+from .ids import new_message_id, is_message_id, message_id_timestamp, message_id_floor
+from .message_store import MessageStore, seq_key
+from .idempotency import IdempotencyRegistry, ClaimInProgress
+from .write_behind import WriteBehindQueue
+from .recent_writes import RecentWritesCache
+from .cold_archive import ColdArchive
+from .blob_store import BlobStore
+
+__all__ = [
+    'new_message_id',
+    'is_message_id',
+    'message_id_timestamp',
+    'message_id_floor',
+    'MessageStore',
+    'seq_key',
+    'IdempotencyRegistry',
+    'ClaimInProgress',
+    'WriteBehindQueue',
+    'RecentWritesCache',
+    'ColdArchive',
+    'BlobStore'
+]
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from firebase_admin import db
+
+logger = logging.getLogger(__name__)
+
+# Resolved to the write time by the Realtime Database server
+SERVER_TIMESTAMP = {".sv": "timestamp"}
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and set(value) == {'blob'}
+
+
+class BlobStore:
+    """
+    Content-addressed storage for response bodies.
+
+    Bodies of at least ``min_size`` characters are stored once under
+    ``{root}/{blake2b}`` and responses reference them as ``{"blob": hash}``;
+    shorter bodies (and error strings) stay inline. Every write that
+    references a blob also rewrites its body and bumps
+    ``{meta_root}/{hash}/touched`` in the same multi-path update, which is
+    what lets the mark-and-sweep collector skip blobs referenced after it
+    started. Blobs are immutable, so resolved bodies are cached in an LRU and
+    misses are fetched concurrently.
+    """
+
+    def __init__(self, root: str = "blobs", meta_root: str = "blob_meta", min_size: int = 256,
+                 max_cached: int = 2048, max_workers: int = 8):
+        self.root = root
+        self.meta_root = meta_root
+        self.min_size = min_size
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blob-resolve")
+        self.hits = 0
+        self.fetches = 0
+
+    @staticmethod
+    def digest(body: str) -> str:
+        return hashlib.blake2b(body.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _remember(self, digest: str, body: str) -> None:
+        with self._lock:
+            self._cache[digest] = body
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def encode(self, responses: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Replace large bodies with blob references.
+
+        Returns the responses to store and the blob writes to include in the
+        same multi-path update.
+        """
+        stored = {}
+        updates = {}
+        for model, body in responses.items():
+            if not isinstance(body, str) or len(body) < self.min_size:
+                stored[model] = body
+                continue
+            digest = self.digest(body)
+            stored[model] = {'blob': digest}
+            updates[f"{self.root}/{digest}"] = body
+            updates[f"{self.meta_root}/{digest}"] = {'size': len(body), 'touched': SERVER_TIMESTAMP}
+            self._remember(digest, body)
+        return stored, updates
+
+    def resolve_many(self, digests: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Fetch bodies for a set of hashes in one concurrent batch."""
+        bodies = {}
+        missing = []
+        with self._lock:
+            for digest in set(digests):
+                if digest in self._cache:
+                    self._cache.move_to_end(digest)
+                    bodies[digest] = self._cache[digest]
+                    self.hits += 1
+                else:
+                    missing.append(digest)
+        if missing:
+            self.fetches += len(missing)
+            fetched = self._pool.map(lambda digest: db.reference(f"{self.root}/{digest}").get(), missing)
+            for digest, body in zip(missing, fetched):
+                if body is None:
+                    logger.error(f"Response blob {digest} is missing")
+                else:
+                    self._remember(digest, body)
+                bodies[digest] = body
+        return bodies
+
+    def resolve_records(self, records: List[Optional[Dict[str, Any]]]) -> None:
+        """Resolve blob references in the ``responses`` of several records in place."""
+        responses = [record['responses'] for record in records
+                     if record and isinstance(record.get('responses'), dict)]
+        self.resolve_responses(responses)
+
+    def resolve_responses(self, responses_list: List[Dict[str, Any]]) -> None:
+        """Resolve blob references in several response maps in place."""
+        digests = [value['blob'] for responses in responses_list
+                   for value in responses.values() if is_ref(value)]
+        if not digests:
+            return
+        bodies = self.resolve_many(digests)
+        for responses in responses_list:
+            for model, value in responses.items():
+                if is_ref(value):
+                    responses[model] = bodies.get(value['blob'])
+
+    def stats(self) -> Dict[str, int]:
+        """Body cache size and hit/fetch counters."""
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "fetches": self.fetches
+        }
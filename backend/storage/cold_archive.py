@@ -0,0 +1,139 @@
+import bisect
+import gzip
+import json
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".ndjson.gz"
+INDEX_SUFFIX = ".idx.json"
+
+
+class ColdArchive:
+    """
+    Compressed on-disk segments holding conversations moved out of the database.
+
+    A segment is a run of independently gzip-compressed blocks of
+    ``block_records`` NDJSON records (one message per line, ordered by ID),
+    so the file as a whole is still a valid multi-member gzip stream. The
+    sidecar index is sparse: one ``[first_id, last_id, offset, length]``
+    entry per block. A lookup bisects the index, slices the single block out
+    of the memory-mapped segment and decompresses only that block; recently
+    decompressed blocks are kept in a small LRU because history pages read
+    neighbouring messages.
+
+    Segments are immutable once written. The directory must be shared by all
+    workers that serve history.
+    """
+
+    def __init__(self, directory: str = "archive", block_records: int = 64,
+                 max_cached_blocks: int = 32):
+        self.directory = directory
+        self.block_records = block_records
+        self.max_cached_blocks = max_cached_blocks
+        self._indexes: Dict[Tuple[str, str], List[List[Any]]] = {}
+        self._blocks: "OrderedDict[Tuple[str, str, int], Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.block_reads = 0
+        self.segments_written = 0
+
+    def _path(self, user_id: str, name: str) -> str:
+        if not user_id or os.path.basename(user_id) != user_id or user_id in (".", ".."):
+            raise ValueError(f"Invalid user id for archive path: {user_id!r}")
+        return os.path.join(self.directory, user_id, name)
+
+    def write_segment(self, user_id: str, records: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """Write ``(message_id, record)`` pairs as a new segment; returns its name."""
+        records = sorted(records, key=lambda item: item[0])
+        if not records:
+            raise ValueError("Cannot write an empty segment")
+        name = f"{records[0][0]}-{records[-1][0]}"
+        segment_path = self._path(user_id, name + SEGMENT_SUFFIX)
+        os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+
+        index = []
+        offset = 0
+        tmp_path = segment_path + ".tmp"
+        with open(tmp_path, "wb") as segment:
+            for start in range(0, len(records), self.block_records):
+                block = records[start:start + self.block_records]
+                lines = "".join(
+                    json.dumps(dict(record, id=message_id), separators=(",", ":")) + "\n"
+                    for message_id, record in block
+                )
+                data = gzip.compress(lines.encode("utf-8"), mtime=0)
+                segment.write(data)
+                index.append([block[0][0], block[-1][0], offset, len(data)])
+                offset += len(data)
+            segment.flush()
+            os.fsync(segment.fileno())
+
+        index_path = self._path(user_id, name + INDEX_SUFFIX)
+        with open(index_path + ".tmp", "w") as index_file:
+            json.dump({"blocks": index, "records": len(records)}, index_file)
+        # The index is published last, so a segment is only visible once complete
+        os.replace(tmp_path, segment_path)
+        os.replace(index_path + ".tmp", index_path)
+
+        with self._lock:
+            self._indexes[(user_id, name)] = index
+        self.segments_written += 1
+        logger.info(f"Archived {len(records)} messages for user {user_id} into segment {name}")
+        return name
+
+    def _index(self, user_id: str, name: str) -> List[List[Any]]:
+        with self._lock:
+            index = self._indexes.get((user_id, name))
+        if index is None:
+            with open(self._path(user_id, name + INDEX_SUFFIX)) as index_file:
+                index = json.load(index_file)["blocks"]
+            with self._lock:
+                self._indexes[(user_id, name)] = index
+        return index
+
+    def _read_block(self, user_id: str, name: str, offset: int, length: int) -> Dict[str, Dict[str, Any]]:
+        key = (user_id, name, offset)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                return block
+
+        with open(self._path(user_id, name + SEGMENT_SUFFIX), "rb") as segment:
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = gzip.decompress(mapped[offset:offset + length])
+        block = {}
+        for line in data.decode("utf-8").splitlines():
+            record = json.loads(line)
+            block[record.pop("id")] = record
+
+        with self._lock:
+            self.block_reads += 1
+            self._blocks[key] = block
+            while len(self._blocks) > self.max_cached_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def read(self, user_id: str, name: str, message_id: str) -> Optional[Dict[str, Any]]:
+        """The archived record for a message, or None if the segment does not hold it."""
+        index = self._index(user_id, name)
+        position = bisect.bisect_right([entry[0] for entry in index], message_id) - 1
+        if position < 0 or message_id > index[position][1]:
+            return None
+        _, _, offset, length = index[position]
+        return self._read_block(user_id, name, offset, length).get(message_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Segment, index and block cache counters."""
+        return {
+            "segmentsWritten": self.segments_written,
+            "indexesLoaded": len(self._indexes),
+            "cachedBlocks": len(self._blocks),
+            "blockReads": self.block_reads
+        }
+
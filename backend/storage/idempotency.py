@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .message_store import MessageStore
+
+logger = logging.getLogger(__name__)
+
+ClaimKey = Tuple[str, str]
+
+
+class ClaimInProgress(Exception):
+    """Raised when another worker holds a live claim on the same message ID."""
+
+
+class IdempotencyRegistry:
+    """
+    Exactly-once processing per ``(user_id, message_id)``.
+
+    The first request claims the ID, in memory and through the storage layer.
+    Duplicates arriving while it runs await the same task, and duplicates
+    arriving after it finished get the stored outcome back without redoing
+    the fan-out. Completed outcomes are kept in a bounded LRU; the durable
+    claim record covers evicted entries and other worker processes for
+    ``ttl`` seconds. A failed run releases its claim so the client can retry.
+    """
+
+    def __init__(self, store: MessageStore, max_entries: int = 10000, lease: float = 300.0,
+                 ttl: float = 86400.0):
+        self.store = store
+        self.max_entries = max_entries
+        self.lease = lease
+        self.ttl = ttl
+        self._running: Dict[ClaimKey, asyncio.Task] = {}
+        self._done: "OrderedDict[ClaimKey, Dict[str, Any]]" = OrderedDict()
+
+    def _remember(self, key: ClaimKey, result: Dict[str, Any]) -> None:
+        self._done[key] = result
+        self._done.move_to_end(key)
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    async def _claim_and_execute(self, key: ClaimKey,
+                                 work: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        existing = await self.store.claim(*key, self.lease, self.ttl)
+        if existing is not None:
+            if existing.get('status') == 'done':
+                result = existing.get('result') or {}
+                self._remember(key, result)
+                return result
+            raise ClaimInProgress(f"Message {key[1]} is already being processed")
+
+        try:
+            result = await work()
+        except Exception:
+            await self.store.release_claim(*key)
+            raise
+        await self.store.complete_claim(*key, result)
+        self._remember(key, result)
+        return result
+
+    async def outcome(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The outcome of a message ID that already ran (or is running here), else None.
+
+        Never starts work, so it can be asked before admission control: a
+        retry of a finished message is answered even when new work is shed.
+        """
+        key = (user_id, message_id)
+        if key in self._done:
+            self._done.move_to_end(key)
+            return self._done[key]
+        task = self._running.get(key)
+        if task is not None:
+            return await asyncio.shield(task)
+        record = await self.store.get_claim(user_id, message_id)
+        if record and record.get('status') == 'done' and time.time() - record.get('claimed_at', 0) < self.ttl:
+            result = record.get('result') or {}
+            self._remember(key, result)
+            return result
+        return None
+
+    async def run(self, user_id: str, message_id: str,
+                  work: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run ``work`` once for this message ID and share its outcome with duplicates."""
+        key = (user_id, message_id)
+
+        if key in self._done:
+            self._done.move_to_end(key)
+            logger.info(f"Returning stored outcome for duplicate message {message_id}")
+            return self._done[key]
+
+        task = self._running.get(key)
+        if task is None:
+            # Registered before the first await so in-process duplicates always attach
+            task = asyncio.ensure_future(self._claim_and_execute(key, work))
+            self._running[key] = task
+            task.add_done_callback(lambda _: self._running.pop(key, None))
+        else:
+            logger.info(f"Attaching duplicate message {message_id} to in-flight request")
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of in-flight and remembered claims."""
+        return {
+            "running": len(self._running),
+            "completed": len(self._done)
+        }
@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from typing import Optional
+
+# Crockford's base32, whose ASCII order matches numeric order
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_lock = threading.Lock()
+_last_timestamp = -1
+_last_randomness = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return "".join(reversed(chars))
+
+
+def new_message_id(timestamp_ms: Optional[int] = None) -> str:
+    """
+    Mint a ULID: 48-bit millisecond timestamp followed by 80 random bits.
+
+    IDs sort lexicographically by creation time, and IDs minted within the
+    same millisecond increment the random part so they stay strictly ordered.
+    """
+    global _last_timestamp, _last_randomness
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    with _lock:
+        if timestamp_ms <= _last_timestamp:
+            timestamp_ms = _last_timestamp
+            randomness = _last_randomness + 1
+            if randomness >> 80:
+                timestamp_ms += 1
+                randomness = int.from_bytes(os.urandom(10), "big")
+        else:
+            randomness = int.from_bytes(os.urandom(10), "big")
+        _last_timestamp, _last_randomness = timestamp_ms, randomness
+    return _encode(timestamp_ms, 10) + _encode(randomness, 16)
+
+
+def is_message_id(value: str) -> bool:
+    """Whether a key is a ULID minted by ``new_message_id``, rather than a legacy ID."""
+    return len(value) == 26 and all(char in ENCODING for char in value)
+
+
+def message_id_timestamp(message_id: str) -> int:
+    """Millisecond timestamp encoded in a ULID."""
+    value = 0
+    for char in message_id[:10].upper():
+        value = value * 32 + ENCODING.index(char)
+    return value
+
+
+def message_id_floor(timestamp_ms: int) -> str:
+    """Smallest ULID for a millisecond, for key range queries by time."""
+    return _encode(timestamp_ms, 10) + ENCODING[0] * 16
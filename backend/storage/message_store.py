@@ -0,0 +1,595 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from firebase_admin import db
+
+from .blob_store import SERVER_TIMESTAMP, BlobStore, is_ref
+from .cold_archive import ColdArchive
+from .ids import is_message_id, message_id_timestamp
+from .recent_writes import RecentWritesCache
+from .write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+# Which record fields each change-log kind touches
+CHANGE_FIELDS = {
+    'message': ('content', 'timestamp'),
+    'responses': ('responses',),
+    'analysis': ('analysis',)
+}
+
+
+def seq_key(seq: int) -> str:
+    """Zero-padded change-log key so that key order is sequence order."""
+    return f"{seq:012d}"
+
+
+class MessageStore:
+    """
+    Async storage layer for messages, provider responses and analyses.
+
+    Records live under ``{root}/{user_id}/{message_id}``. The Admin SDK is
+    blocking, so every call runs in a worker thread instead of stalling the
+    event loop. Message IDs are ULIDs, which makes key order time order and
+    lets history pages be served by ordered-key range queries. Every write
+    reserves a per-user change sequence and appends to ``{changes_root}/{user_id}/log``
+    so reconnecting clients can sync only what changed. Values written by
+    this process are kept in a small recent-writes cache so the reads that
+    follow them (responses and question for an analysis) skip the round trip.
+
+    With a ``ColdArchive`` attached, old records can be compacted into
+    compressed segments; the database keeps a stub pointing at the segment
+    and reads rehydrate it transparently. With a ``BlobStore`` attached,
+    large response bodies are stored once by content hash and resolved in
+    batches on read.
+    """
+
+    def __init__(self, root: str = "messages", changes_root: str = "changes",
+                 claims_root: str = "claims", recent_writes: Optional[RecentWritesCache] = None,
+                 archive: Optional[ColdArchive] = None, blobs: Optional[BlobStore] = None,
+                 reservation_timeout: float = 60.0):
+        self.root = root
+        self.changes_root = changes_root
+        self.claims_root = claims_root
+        self.recent_writes = recent_writes or RecentWritesCache()
+        self.archive = archive
+        self.blobs = blobs
+        self.reservation_timeout = reservation_timeout
+        self.write_behind: Optional[WriteBehindQueue] = None
+
+    def _ref(self, user_id: str, *path: str) -> db.Reference:
+        return db.reference("/".join((self.root, user_id) + path))
+
+    def _changes_ref(self, user_id: str, *path: str) -> db.Reference:
+        return db.reference("/".join((self.changes_root, user_id) + path))
+
+    def _claim_ref(self, user_id: str, message_id: str) -> db.Reference:
+        return db.reference(f"{self.claims_root}/{user_id}/{message_id}")
+
+    def _reserve_seqs(self, user_id: str, count: int) -> int:
+        """
+        Atomically advance the user's change sequence; returns the first reserved value.
+
+        The reservation stays listed under ``head/pending`` until its log
+        entries land, so readers know not to move past it. Reservations older
+        than ``reservation_timeout`` belong to writers that died and are dropped.
+        """
+        now = time.time()
+
+        def reserve(current):
+            current = current or {}
+            pending = {key: at for key, at in (current.get('pending') or {}).items()
+                       if now - at < self.reservation_timeout}
+            first = current.get('seq', 0) + 1
+            pending[seq_key(first)] = now
+            return {'seq': first + count - 1, 'pending': pending}
+
+        head = self._changes_ref(user_id, 'head').transaction(reserve)
+        return head['seq'] - count + 1
+
+    def _build_updates(self, user_id: str, writes: List[Tuple[str, str, Any]],
+                       first_seq: int) -> Dict[str, Any]:
+        """
+        Turn ordered ``(message_id, kind, value)`` writes into one multi-path update.
+
+        Every write sets only its own fields (a ``message`` write its content
+        and timestamp), so a write never clobbers fields written by another
+        writer or another batch.
+        """
+        updates = {}
+        for offset, (message_id, kind, value) in enumerate(writes):
+            seq = first_seq + offset
+            if kind == 'responses' and self.blobs is not None:
+                value, blob_updates = self.blobs.encode(value)
+                updates.update(blob_updates)
+            record_path = f"{self.root}/{user_id}/{message_id}"
+            fields = value if kind == 'message' else {kind: value}
+            for field, field_value in fields.items():
+                updates[f"{record_path}/{field}"] = field_value
+            updates[f"{record_path}/version"] = seq
+            updates[f"{self.changes_root}/{user_id}/log/{seq_key(seq)}"] = {
+                'messageId': message_id,
+                'kind': kind
+            }
+        # The log entries and the end of the reservation commit together
+        updates[f"{self.changes_root}/{user_id}/head/pending/{seq_key(first_seq)}"] = None
+        return updates
+
+    def _write(self, user_id: str, message_id: str, kind: str, value: Dict[str, Any]) -> int:
+        """
+        Write one part of a message and record it in the user's change log.
+
+        The per-user sequence is reserved with a transaction, then the record,
+        its ``version``, the log entry and the release of the reservation land
+        in a single multi-path update.
+        """
+        seq = self._reserve_seqs(user_id, 1)
+        db.reference().update(self._build_updates(user_id, [(message_id, kind, value)], seq))
+        return seq
+
+    def write_batch(self, batch: Dict[str, List[Tuple[str, str, Any]]]) -> None:
+        """Commit queued writes for several users in a single multi-path update."""
+        updates = {}
+        for user_id, writes in batch.items():
+            first_seq = self._reserve_seqs(user_id, len(writes))
+            updates.update(self._build_updates(user_id, writes, first_seq))
+        if updates:
+            db.reference().update(updates)
+
+    def enable_write_behind(self, **options) -> WriteBehindQueue:
+        """Attach a write-behind queue that deferred writes are routed through."""
+        self.write_behind = WriteBehindQueue(self, **options)
+        return self.write_behind
+
+    async def _save(self, user_id: str, message_id: str, kind: str, value: Any,
+                    defer: bool) -> Optional[int]:
+        if defer and self.write_behind is not None:
+            self.write_behind.enqueue(user_id, message_id, kind, value)
+            self.recent_writes.put(user_id, message_id, kind, value)
+            return None
+        seq = await asyncio.to_thread(self._write, user_id, message_id, kind, value)
+        self.recent_writes.put(user_id, message_id, kind, value)
+        return seq
+
+    async def save_message(self, user_id: str, message_id: str, content: str,
+                           defer: bool = False) -> Optional[int]:
+        return await self._save(user_id, message_id, 'message', {
+            'content': content,
+            'timestamp': SERVER_TIMESTAMP
+        }, defer)
+
+    async def save_responses(self, user_id: str, message_id: str, responses: Dict[str, Any],
+                             defer: bool = False) -> Optional[int]:
+        return await self._save(user_id, message_id, 'responses', responses, defer)
+
+    async def save_analysis(self, user_id: str, message_id: str, analysis: Dict[str, Any],
+                            defer: bool = False) -> Optional[int]:
+        return await self._save(user_id, message_id, 'analysis', {
+            'content': analysis,
+            'timestamp': SERVER_TIMESTAMP
+        }, defer)
+
+    def _pending(self, user_id: str, message_id: str, kind: str) -> Any:
+        if self.write_behind is None:
+            return None
+        return self.write_behind.pending(user_id, message_id, kind)
+
+    def _local(self, user_id: str, message_id: str, kind: str) -> Any:
+        """A value written by this process that has not expired, queued writes first."""
+        pending = self._pending(user_id, message_id, kind)
+        if pending is not None:
+            return pending
+        return self.recent_writes.get(user_id, message_id, kind)
+
+    def _rehydrate(self, user_id: str, message_id: str,
+                   record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Replace an archive stub with the archived record; fields written since win."""
+        if not record or 'archived' not in record or self.archive is None:
+            return record
+        archived = self.archive.read(user_id, record['archived'], message_id)
+        if archived is None:
+            logger.error(f"Message {message_id} missing from archive segment {record['archived']}")
+            return record
+        hot = {key: value for key, value in record.items() if key != 'archived'}
+        return dict(archived, **hot)
+
+    def _resolve(self, records: List[Optional[Dict[str, Any]]]) -> None:
+        if self.blobs is not None:
+            self.blobs.resolve_records(records)
+
+    def _load_message(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        record = self._rehydrate(user_id, message_id, self._ref(user_id, message_id).get())
+        self._resolve([record])
+        return record
+
+    def _load_responses(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        responses = self._ref(user_id, message_id, 'responses').get()
+        if responses is not None and self.blobs is not None:
+            self.blobs.resolve_responses([responses])
+        return responses
+
+    async def get_message(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        record = await asyncio.to_thread(self._load_message, user_id, message_id)
+        if self.write_behind is None:
+            return record
+        # Overlay writes that are still waiting in the write-behind queue
+        pending_message = self._pending(user_id, message_id, 'message')
+        if pending_message is not None:
+            record = dict(pending_message)
+        for kind in ('responses', 'analysis'):
+            value = self._pending(user_id, message_id, kind)
+            if value is not None:
+                record = dict(record or {}, **{kind: value})
+        return record
+
+    async def get_responses(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        local = self._local(user_id, message_id, 'responses')
+        if local is not None:
+            return local
+        responses = await asyncio.to_thread(self._load_responses, user_id, message_id)
+        if responses is None and self.archive is not None:
+            responses = ((await self.get_message(user_id, message_id)) or {}).get('responses')
+        return responses
+
+    async def get_question(self, user_id: str, message_id: str) -> Optional[str]:
+        local = self._local(user_id, message_id, 'message')
+        if local is not None:
+            return local['content']
+        content = await asyncio.to_thread(self._ref(user_id, message_id, 'content').get)
+        if content is None and self.archive is not None:
+            content = ((await self.get_message(user_id, message_id)) or {}).get('content')
+        return content
+
+    def _query_page(self, user_id: str, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+        query = self._ref(user_id).order_by_key()
+        if cursor:
+            # end_at is inclusive, so fetch one extra row to replace the cursor itself
+            query = query.end_at(cursor)
+        rows = query.limit_to_last(limit + (2 if cursor else 1)).get() or {}
+        rows = {message_id: self._rehydrate(user_id, message_id, record)
+                for message_id, record in rows.items()}
+        # One batched blob lookup for the whole page
+        self._resolve(list(rows.values()))
+        return rows
+
+    async def list_messages(self, user_id: str, cursor: Optional[str] = None,
+                            limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of messages, newest first, and the cursor for the next page.
+
+        The cursor is the ID of the last (oldest) message returned; the next
+        page holds the messages strictly older than it.
+        """
+        rows = await asyncio.to_thread(self._query_page, user_id, cursor, limit)
+        items = [
+            dict(record or {}, id=message_id)
+            for message_id, record in sorted(rows.items(), reverse=True)
+            if message_id != cursor
+        ]
+        page = items[:limit]
+        next_cursor = page[-1]['id'] if len(items) > limit else None
+        return page, next_cursor
+
+    def _query_after(self, user_id: str, after: Optional[str], limit: int) -> List[Tuple[str, Any]]:
+        query = self._ref(user_id).order_by_key()
+        if after:
+            # start_at is inclusive, so fetch one extra row to skip the cursor itself
+            query = query.start_at(after)
+        rows = query.limit_to_first(limit + (1 if after else 0)).get() or {}
+        rows = [(message_id, self._rehydrate(user_id, message_id, record))
+                for message_id, record in sorted(rows.items()) if message_id != after]
+        self._resolve([record for _, record in rows])
+        return rows[:limit]
+
+    async def iter_messages(self, user_id: str, after: Optional[str] = None,
+                            page_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every message after ``after``, oldest first, one page at a time.
+
+        Only one page is held in memory; the ``id`` of the last message yielded
+        is the cursor to resume from.
+        """
+        while True:
+            rows = await asyncio.to_thread(self._query_after, user_id, after, page_size)
+            for message_id, record in rows:
+                yield dict(record or {}, id=message_id)
+            if len(rows) < page_size:
+                return
+            after = rows[-1][0]
+
+    async def export_lines(self, user_id: str, after: Optional[str] = None,
+                           page_size: int = 200) -> AsyncIterator[bytes]:
+        """
+        NDJSON lines of every message after ``after``, oldest first.
+
+        If reading fails part way, a last ``{"error", "resumeAfter"}`` line
+        says so and names the cursor to resume from, so a truncated export
+        is never mistaken for a complete one.
+        """
+        last_id = after
+        try:
+            async for record in self.iter_messages(user_id, after=after, page_size=page_size):
+                yield (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+                last_id = record['id']
+        except Exception as e:
+            logger.error(f"Export for user {user_id} failed after {last_id}: {str(e)}")
+            yield (json.dumps({'error': str(e), 'resumeAfter': last_id}) + "\n").encode("utf-8")
+
+    def _visible_seq(self, user_id: str) -> int:
+        """
+        The highest sequence readers may see.
+
+        Sequences are reserved before their log entries are written, so a
+        later writer can commit first. Head and pending reservations are read
+        together: everything up to the head is committed except from the
+        lowest live reservation on, and anything reserved after this read
+        is above the head.
+        """
+        head = self._changes_ref(user_id, 'head').get() or {}
+        now = time.time()
+        live = [int(key) for key, at in (head.get('pending') or {}).items()
+                if now - at < self.reservation_timeout]
+        return min(live) - 1 if live else head.get('seq', 0)
+
+    async def current_seq(self, user_id: str) -> int:
+        """The sync cursor a client holding everything read from now on can start from."""
+        return await asyncio.to_thread(self._visible_seq, user_id)
+
+    def _query_changes(self, user_id: str, since: int, limit: int) -> Dict[str, Any]:
+        visible = self._visible_seq(user_id)
+        if visible <= since:
+            return {}
+        query = self._changes_ref(user_id, 'log').order_by_key().start_at(seq_key(since + 1))
+        return query.end_at(seq_key(visible)).limit_to_first(limit + 1).get() or {}
+
+    async def changes_since(self, user_id: str, since: int = 0,
+                            limit: int = 500) -> Dict[str, Any]:
+        """
+        Return the records changed after sequence ``since`` in compact form.
+
+        Each changed message appears once with only the fields that changed;
+        ``seq`` is the value to pass as ``since`` next time. Only the
+        contiguous prefix of the log is returned, so the cursor never skips a
+        change that another writer has reserved but not yet committed.
+        """
+        rows = await asyncio.to_thread(self._query_changes, user_id, since, limit)
+        entries = sorted(rows.items())
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        changed: Dict[str, set] = {}
+        for _, entry in entries:
+            changed.setdefault(entry['messageId'], set()).add(entry['kind'])
+
+        message_ids = list(changed)
+        records = await asyncio.gather(*[
+            self.get_message(user_id, message_id) for message_id in message_ids
+        ])
+
+        changes = []
+        for message_id, record in zip(message_ids, records):
+            if record is None:
+                changes.append({'id': message_id, 'deleted': True})
+                continue
+            change = {'id': message_id, 'version': record.get('version')}
+            for kind in changed[message_id]:
+                for field in CHANGE_FIELDS[kind]:
+                    if field in record:
+                        change[field] = record[field]
+            changes.append(change)
+
+        return {
+            'seq': int(entries[-1][0]) if entries else since,
+            'changes': changes,
+            'has_more': has_more
+        }
+
+    @staticmethod
+    def _written_at(message_id: str, record: Dict[str, Any]) -> Optional[float]:
+        """When a record was written (ms): its timestamp, else the time in its ULID."""
+        timestamp = record.get('timestamp')
+        if isinstance(timestamp, (int, float)):
+            return timestamp
+        if is_message_id(message_id):
+            return message_id_timestamp(message_id)
+        return None
+
+    def _compact(self, user_id: str, cutoff_ms: int, batch_size: int) -> int:
+        archived = 0
+        start = None
+        while True:
+            query = self._ref(user_id).order_by_key()
+            if start:
+                query = query.start_at(start)
+            rows = query.limit_to_first(batch_size + 1).get() or {}
+            keys = sorted(key for key in rows if key != start)
+            if not keys:
+                return archived
+            old = []
+            for key in keys:
+                record = rows[key]
+                if not isinstance(record, dict) or 'archived' in record:
+                    continue
+                # Legacy IDs are not time-ordered, so age comes from the record itself
+                written_at = self._written_at(key, record)
+                if written_at is None:
+                    logger.warning(f"Not archiving {user_id}/{key}: no timestamp")
+                elif written_at < cutoff_ms:
+                    old.append((key, record))
+            if old:
+                # Segments hold full bodies so archived records stop referencing blobs
+                self._resolve([record for _, record in old])
+                segment = self.archive.write_segment(user_id, old)
+                stubs = {}
+                for message_id, record in old:
+                    stub = {'archived': segment}
+                    for field in ('timestamp', 'version'):
+                        if field in record:
+                            stub[field] = record[field]
+                    stubs[f"{self.root}/{user_id}/{message_id}"] = stub
+                # Only the database copy is replaced; the segment is already durable
+                db.reference().update(stubs)
+                archived += len(old)
+            start = keys[-1]
+
+    async def compact(self, user_id: str, older_than_days: float,
+                      batch_size: int = 500) -> int:
+        """
+        Move a user's messages older than ``older_than_days`` into the cold archive.
+
+        Age is taken from each record's ``timestamp`` (or its ULID when it has
+        none), so legacy non-ULID IDs are judged correctly; the scan pages
+        through every key. Each batch of old records becomes one segment and
+        the records are replaced by stubs that keep ``timestamp`` and
+        ``version``; returns how many were archived. Archiving does not
+        touch the change log, since content is unchanged.
+        """
+        if self.archive is None:
+            raise RuntimeError("No cold archive configured")
+        cutoff_ms = int((time.time() - older_than_days * 86400) * 1000)
+        return await asyncio.to_thread(self._compact, user_id, cutoff_ms, batch_size)
+
+    async def compact_all(self, older_than_days: float, batch_size: int = 500) -> Dict[str, int]:
+        """Run ``compact`` for every user; returns the archived count per user."""
+        users = await asyncio.to_thread(db.reference(self.root).get, shallow=True) or {}
+        archived = {}
+        for user_id in users:
+            count = await self.compact(user_id, older_than_days, batch_size)
+            if count:
+                archived[user_id] = count
+        return archived
+
+    @staticmethod
+    def _scan(ref, page_size: int) -> Iterator[Tuple[str, Any]]:
+        """Every child of a node as ``(key, value)``, one ordered-key page at a time."""
+        after = None
+        while True:
+            query = ref.order_by_key()
+            if after:
+                query = query.start_at(after)
+            rows = query.limit_to_first(page_size + (1 if after else 0)).get() or {}
+            keys = sorted(key for key in rows if key != after)
+            for key in keys:
+                yield key, rows[key]
+            if len(keys) < page_size:
+                return
+            after = keys[-1]
+
+    def _scan_records(self, user_id: str, page_size: int) -> Iterator[Dict[str, Any]]:
+        """Every raw (unresolved) record of a user, one ordered-key page at a time."""
+        for _, record in self._scan(self._ref(user_id), page_size):
+            yield record or {}
+
+    def _sweep_blob(self, digest: str, cutoff_ms: int) -> bool:
+        """Delete a blob's meta unless it was touched since the cutoff; returns whether it was."""
+        outcome = {}
+
+        def attempt(current):
+            outcome['swept'] = not current or current.get('touched', 0) < cutoff_ms
+            return None if outcome['swept'] else current
+
+        db.reference(f"{self.blobs.meta_root}/{digest}").transaction(attempt)
+        return outcome['swept']
+
+    def _collect_garbage(self, grace: float, page_size: int) -> int:
+        cutoff_ms = int((time.time() - grace) * 1000)
+        # Blobs touched after the cutoff may be referenced by writes this scan misses
+        unmarked = {digest for digest, info in self._scan(db.reference(self.blobs.meta_root), page_size)
+                    if (info or {}).get('touched', 0) < cutoff_ms}
+        if not unmarked:
+            return 0
+        users = db.reference(self.root).get(shallow=True) or {}
+        for user_id in users:
+            for record in self._scan_records(user_id, page_size):
+                for value in (record.get('responses') or {}).values():
+                    if is_ref(value):
+                        unmarked.discard(value['blob'])
+        # A write may have re-referenced a candidate during the scan, bumping its touched time
+        swept = [digest for digest in sorted(unmarked) if self._sweep_blob(digest, cutoff_ms)]
+        if swept:
+            db.reference().update({f"{self.blobs.root}/{digest}": None for digest in swept})
+        logger.info(f"Collected {len(swept)} unreferenced response blobs")
+        return len(swept)
+
+    async def collect_garbage(self, grace: float = 3600.0, page_size: int = 500) -> int:
+        """
+        Mark-and-sweep unreferenced response blobs; returns how many were deleted.
+
+        Only blobs last touched more than ``grace`` seconds before the scan
+        started are candidates, and each candidate's touched time is checked
+        again in a transaction as it is deleted, so blobs re-referenced while
+        the scan runs survive. Blob meta and messages are read ``page_size``
+        records at a time.
+        """
+        if self.blobs is None:
+            raise RuntimeError("No blob store configured")
+        return await asyncio.to_thread(self._collect_garbage, grace, page_size)
+
+    def _claim(self, user_id: str, message_id: str, lease: float,
+               ttl: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        outcome = {}
+
+        def attempt(current):
+            outcome.clear()
+            if current and now - current.get('claimed_at', 0) < (ttl if current.get('status') == 'done' else lease):
+                outcome['existing'] = current
+                return current
+            return {'status': 'running', 'claimed_at': now}
+
+        self._claim_ref(user_id, message_id).transaction(attempt)
+        return outcome.get('existing')
+
+    async def claim(self, user_id: str, message_id: str, lease: float = 300.0,
+                    ttl: float = 86400.0) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim a message ID for processing.
+
+        Returns None when the caller now owns the claim, otherwise the existing
+        claim record (``status`` running or done, with ``result`` once done).
+        Running claims older than ``lease`` seconds are considered abandoned,
+        completed ones older than ``ttl`` seconds expired.
+        """
+        return await asyncio.to_thread(self._claim, user_id, message_id, lease, ttl)
+
+    async def get_claim(self, user_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        """The claim record of a message ID, without claiming it."""
+        return await asyncio.to_thread(self._claim_ref(user_id, message_id).get)
+
+    def _purge_claims(self, cutoff: float, page_size: int) -> int:
+        purged = 0
+        users = db.reference(self.claims_root).get(shallow=True) or {}
+        for user_id in users:
+            after = None
+            while True:
+                query = db.reference(f"{self.claims_root}/{user_id}").order_by_key()
+                if after:
+                    query = query.start_at(after)
+                rows = query.limit_to_first(page_size + (1 if after else 0)).get() or {}
+                keys = sorted(key for key in rows if key != after)
+                expired = {f"{self.claims_root}/{user_id}/{key}": None for key in keys
+                           if (rows[key] or {}).get('claimed_at', 0) < cutoff}
+                if expired:
+                    db.reference().update(expired)
+                    purged += len(expired)
+                if len(keys) < page_size:
+                    break
+                after = keys[-1]
+        return purged
+
+    async def purge_claims(self, older_than: float = 86400.0, page_size: int = 500) -> int:
+        """Delete claim records (done or abandoned) older than ``older_than`` seconds."""
+        return await asyncio.to_thread(self._purge_claims, time.time() - older_than, page_size)
+
+    async def complete_claim(self, user_id: str, message_id: str, result: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._claim_ref(user_id, message_id).set, {
+            'status': 'done',
+            'claimed_at': time.time(),
+            'result': result
+        })
+
+    async def release_claim(self, user_id: str, message_id: str) -> None:
+        await asyncio.to_thread(self._claim_ref(user_id, message_id).delete)
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+_MISSING = object()
+
+
+class RecentWritesCache:
+    """
+    Bounded cache of values this process wrote recently, for read-your-writes.
+
+    Entries are grouped per user: each user keeps at most ``max_per_user``
+    messages in LRU order and at most ``max_users`` users are tracked, the
+    least recently used being evicted first. Entries expire ``ttl`` seconds
+    after they were written, after which reads fall through to the database.
+    Cached values are shared, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_users: int = 1000, max_per_user: int = 64, ttl: float = 300.0):
+        self.max_users = max_users
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self._users: "OrderedDict[str, OrderedDict[str, Tuple[float, Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, user_id: str, message_id: str, kind: str, value: Any) -> None:
+        messages = self._users.get(user_id)
+        if messages is None:
+            messages = self._users[user_id] = OrderedDict()
+        self._users.move_to_end(user_id)
+
+        entry = messages.get(message_id)
+        expires = time.monotonic() + self.ttl
+        if entry is None or entry[0] <= time.monotonic():
+            messages[message_id] = (expires, {kind: value})
+        else:
+            entry[1][kind] = value
+            messages[message_id] = (expires, entry[1])
+        messages.move_to_end(message_id)
+
+        while len(messages) > self.max_per_user:
+            messages.popitem(last=False)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def get(self, user_id: str, message_id: str, kind: str) -> Any:
+        """The cached value, or None when it was never written here or has expired."""
+        messages = self._users.get(user_id)
+        entry = messages.get(message_id) if messages is not None else None
+        if entry is not None and entry[0] <= time.monotonic():
+            del messages[message_id]
+            entry = None
+        value = entry[1].get(kind, _MISSING) if entry is not None else _MISSING
+        if value is _MISSING:
+            self.misses += 1
+            return None
+        messages.move_to_end(message_id)
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return value
+
+    def invalidate(self, user_id: str, message_id: Optional[str] = None) -> None:
+        """Forget one message, or every message of a user."""
+        if message_id is None:
+            self._users.pop(user_id, None)
+            return
+        messages = self._users.get(user_id)
+        if messages is not None:
+            messages.pop(message_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit/miss counters."""
+        return {
+            "users": len(self._users),
+            "entries": sum(len(messages) for messages in self._users.values()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
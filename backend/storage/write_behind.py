@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .message_store import MessageStore
+
+logger = logging.getLogger(__name__)
+
+WriteKey = Tuple[str, str, str]
+
+
+class WriteBehindQueue:
+    """
+    In-process queue that takes storage writes off the request path.
+
+    Deferred writes are coalesced per ``(user_id, message_id, kind)``: the
+    last write wins but keeps the first one's place in the queue. A
+    background flusher commits them as one multi-path update once
+    ``max_batch`` writes are pending or the oldest has waited ``max_delay``
+    seconds. Failed flushes are re-queued behind newer writes
+    and retried; ``stop()`` drains the queue so shutdown does not lose data.
+    """
+
+    def __init__(self, store: "MessageStore", max_batch: int = 200, max_delay: float = 0.05,
+                 retry_delay: float = 1.0):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self._pending: "OrderedDict[WriteKey, Any]" = OrderedDict()
+        self._flushing: Dict[WriteKey, Any] = {}
+        self._oldest: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.flushed_writes = 0
+        self.flushes = 0
+        self.failures = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, user_id: str, message_id: str, kind: str, value: Any) -> None:
+        key = (user_id, message_id, kind)
+        # Assigning an existing key keeps its position, so flush order stays enqueue order
+        self._pending[key] = value
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._wakeup.set()
+
+    def pending(self, user_id: str, message_id: str, kind: str) -> Any:
+        """The queued value for a write that has not been committed yet, if any."""
+        key = (user_id, message_id, kind)
+        if key in self._pending:
+            return self._pending[key]
+        return self._flushing.get(key)
+
+    def _take_batch(self) -> "OrderedDict[WriteKey, Any]":
+        batch = OrderedDict()
+        while self._pending and len(batch) < self.max_batch:
+            key, value = self._pending.popitem(last=False)
+            batch[key] = value
+        self._oldest = time.monotonic() if self._pending else None
+        return batch
+
+    def _requeue(self, batch: "OrderedDict[WriteKey, Any]") -> None:
+        # Writes enqueued during the failed flush are newer and take precedence
+        for key, value in reversed(batch.items()):
+            if key not in self._pending:
+                self._pending[key] = value
+                self._pending.move_to_end(key, last=False)
+        if self._oldest is None and self._pending:
+            self._oldest = time.monotonic()
+
+    async def flush(self) -> int:
+        """Commit one batch of pending writes; returns how many were written."""
+        async with self._flush_lock:
+            batch = self._take_batch()
+            if not batch:
+                return 0
+            grouped: Dict[str, List[Tuple[str, str, Any]]] = {}
+            for (user_id, message_id, kind), value in batch.items():
+                grouped.setdefault(user_id, []).append((message_id, kind, value))
+            self._flushing = dict(batch)
+            try:
+                await asyncio.to_thread(self.store.write_batch, grouped)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Write-behind flush of {len(batch)} writes failed: {str(e)}")
+                self._requeue(batch)
+                raise
+            finally:
+                self._flushing = {}
+            self.flushes += 1
+            self.flushed_writes += len(batch)
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                if len(self._pending) < self.max_batch:
+                    waited = time.monotonic() - (self._oldest or time.monotonic())
+                    if waited < self.max_delay:
+                        await asyncio.sleep(self.max_delay - waited)
+                try:
+                    await self.flush()
+                except Exception:
+                    await asyncio.sleep(self.retry_delay)
+
+    def start(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self, attempts: int = 3) -> None:
+        """Stop the background flusher and durably drain whatever is still queued."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        for attempt in range(attempts):
+            try:
+                while self._pending:
+                    await self.flush()
+                return
+            except Exception:
+                await asyncio.sleep(self.retry_delay * (attempt + 1))
+        if self._pending:
+            logger.error(f"Write-behind queue stopped with {len(self._pending)} unflushed writes")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, age of the oldest pending write and flush counters."""
+        return {
+            "depth": self.depth,
+            "oldestAgeMs": round((time.monotonic() - self._oldest) * 1000, 2) if self._oldest else 0,
+            "flushes": self.flushes,
+            "flushedWrites": self.flushed_writes,
+            "failures": self.failures
+        }
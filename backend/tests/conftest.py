@@ -1,7 +1,10 @@
 import pytest
 import os
+import copy
+import time
+from collections import OrderedDict
 import firebase_admin
-from firebase_admin import credentials
+from firebase_admin import credentials, db
 from dotenv import load_dotenv
 from unittest.mock import MagicMock, AsyncMock, patch
 
@@ -128,4 +131,125 @@ def test_analysis_request():
             "gemini": "Response from Gemini",
             "openai": "Response from OpenAI"
         }
-    } 
\ No newline at end of file
+    }
+
+def _resolve_server_values(value):
+    if isinstance(value, dict):
+        if value == {".sv": "timestamp"}:
+            return int(time.time() * 1000)
+        return {k: _resolve_server_values(v) for k, v in value.items()}
+    return value
+
+class FakeQuery:
+    """Ordered-key query over a FakeReference."""
+
+    def __init__(self, ref):
+        self._ref = ref
+        self._start = None
+        self._end = None
+        self._first = None
+        self._last = None
+
+    def start_at(self, key):
+        self._start = key
+        return self
+
+    def end_at(self, key):
+        self._end = key
+        return self
+
+    def limit_to_first(self, limit):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._last = limit
+        return self
+
+    def get(self):
+        items = sorted((self._ref.get() or {}).items())
+        items = [(k, v) for k, v in items
+                 if (self._start is None or k >= self._start) and (self._end is None or k <= self._end)]
+        if self._first is not None:
+            items = items[:self._first]
+        if self._last is not None:
+            items = items[-self._last:]
+        return OrderedDict(items)
+
+class FakeReference:
+    """Minimal in-memory firebase_admin.db.Reference."""
+
+    def __init__(self, database, path):
+        self._database = database
+        self.path = "/".join(part for part in path.split("/") if part)
+        self.key = self.path.rsplit("/", 1)[-1] if self.path else None
+
+    def _parts(self):
+        return [part for part in self.path.split("/") if part]
+
+    def child(self, path):
+        return FakeReference(self._database, f"{self.path}/{path}")
+
+    @property
+    def parent(self):
+        return FakeReference(self._database, self.path.rsplit("/", 1)[0] if "/" in self.path else "")
+
+    def get(self, shallow=False):
+        self._database.reads += 1
+        node = self._database.tree
+        for part in self._parts():
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        if shallow and isinstance(node, dict):
+            return {key: True for key in node}
+        return copy.deepcopy(node)
+
+    def set(self, value):
+        self._database.writes += 1
+        parts = self._parts()
+        if not parts:
+            self._database.tree = _resolve_server_values(value) or {}
+            return
+        node = self._database.tree
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = _resolve_server_values(copy.deepcopy(value))
+
+    def update(self, values):
+        self._database.updates += 1
+        for path, value in values.items():
+            self.child(path).set(value)
+
+    def delete(self):
+        self.set(None)
+
+    def transaction(self, transaction_update):
+        value = transaction_update(self.get())
+        self.set(value)
+        return value
+
+    def order_by_key(self):
+        return FakeQuery(self)
+
+class FakeDatabase:
+    """In-memory stand-in for the Realtime Database."""
+
+    def __init__(self):
+        self.tree = {}
+        self.reads = 0
+        self.writes = 0
+        self.updates = 0
+
+    def reference(self, path="/"):
+        return FakeReference(self, path)
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route firebase_admin.db.reference to an in-memory database."""
+    database = FakeDatabase()
+    monkeypatch.setattr(db, "reference", database.reference)
+    return database
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from llm_handlers import AnalysisCache
+
+QUESTION = "What is entropy?"
+RESPONSES = {"openai": "A measure of disorder.", "gemini": {"answer": "Disorder of a system."}}
+MESSAGE = ("user1", "q1")
+
+
+def counting_compute(result=None, delay=0.0):
+    calls = {"count": 0}
+
+    async def compute():
+        calls["count"] += 1
+        await asyncio.sleep(delay)
+        return dict(result or {"summary": "ok", "bestModel": "openai"})
+
+    return compute, calls
+
+
+def test_key_ignores_response_order_and_shape():
+    reordered = {"gemini": "Disorder of a system.", "OpenAI": "A measure of disorder. "}
+    assert AnalysisCache.make_key(QUESTION, RESPONSES) == AnalysisCache.make_key(QUESTION, reordered)
+    assert AnalysisCache.make_key(QUESTION, RESPONSES) != AnalysisCache.make_key(QUESTION, RESPONSES, "fast")
+
+
+@pytest.mark.asyncio
+async def test_repeated_requests_hit_the_cache():
+    cache = AnalysisCache()
+    compute, calls = counting_compute()
+    first = await cache.get_or_compute(QUESTION, RESPONSES, compute, message=MESSAGE)
+    second = await cache.get_or_compute(QUESTION, RESPONSES, compute, message=MESSAGE)
+    assert first == second
+    assert calls["count"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced():
+    cache = AnalysisCache()
+    compute, calls = counting_compute(delay=0.01)
+    results = await asyncio.gather(*[
+        cache.get_or_compute(QUESTION, RESPONSES, compute, message=MESSAGE) for _ in range(10)
+    ])
+    assert calls["count"] == 1
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_changed_responses_invalidate_previous_entry():
+    cache = AnalysisCache()
+    compute, calls = counting_compute()
+    await cache.get_or_compute(QUESTION, RESPONSES, compute, mode="fast", message=MESSAGE)
+    changed = dict(RESPONSES, openai="Something else entirely.")
+    await cache.get_or_compute(QUESTION, changed, compute, message=MESSAGE)
+    assert calls["count"] == 2
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_explicit_invalidation_and_errors_are_not_cached():
+    cache = AnalysisCache()
+    compute, calls = counting_compute()
+    await cache.get_or_compute(QUESTION, RESPONSES, compute, message=MESSAGE)
+    cache.invalidate(*MESSAGE)
+    await cache.get_or_compute(QUESTION, RESPONSES, compute, message=MESSAGE)
+    assert calls["count"] == 2
+
+    failing, failing_calls = counting_compute({"error": "boom", "bestModel": "unknown"})
+    await cache.get_or_compute("other", RESPONSES, failing)
+    await cache.get_or_compute("other", RESPONSES, failing)
+    assert failing_calls["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_bound():
+    cache = AnalysisCache(max_entries=2)
+    compute, _ = counting_compute()
+    for question in ("a", "b", "c"):
+        await cache.get_or_compute(question, RESPONSES, compute)
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_evicted_and_failed_entries_release_their_messages():
+    cache = AnalysisCache(max_entries=2)
+    compute, _ = counting_compute()
+    for index in range(5):
+        await cache.get_or_compute(f"q{index}", RESPONSES, compute, message=("alice", f"m{index}"))
+    assert len(cache._message_keys) == 2
+    assert len(cache._key_messages) == 2
+
+    async def failing():
+        return {"error": "judge unavailable"}
+
+    await cache.get_or_compute("q9", RESPONSES, failing, message=("alice", "m9"))
+    assert ("alice", "m9") not in cache._message_keys
@@ -0,0 +1,41 @@
+import pytest
+from firebase_admin import auth as firebase_auth
+from auth import AuthError, Forbidden, authorize, authorize_admin, bearer_token, verify_id_token
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    """Tokens of the form "token-<uid>" verify as that uid."""
+    def verify(token):
+        if not token.startswith("token-"):
+            raise ValueError("malformed token")
+        uid = token[len("token-"):]
+        return {"uid": uid, "admin": True} if uid == "root" else {"uid": uid}
+
+    monkeypatch.setattr(firebase_auth, "verify_id_token", verify)
+
+
+@pytest.mark.asyncio
+async def test_token_must_verify_and_match_the_user(tokens):
+    assert (await authorize("token-alice", "alice"))["uid"] == "alice"
+    with pytest.raises(Forbidden):
+        await authorize("token-bob", "alice")
+    with pytest.raises(AuthError):
+        await verify_id_token("garbage")
+    with pytest.raises(AuthError):
+        await verify_id_token(None)
+
+
+@pytest.mark.asyncio
+async def test_admin_claim_is_required(tokens):
+    assert (await authorize_admin("token-root"))["uid"] == "root"
+    with pytest.raises(Forbidden):
+        await authorize_admin("token-alice")
+
+
+def test_bearer_token():
+    assert bearer_token("Bearer abc") == "abc"
+    assert bearer_token("bearer  abc ") == "abc"
+    assert bearer_token("Basic abc") is None
+    assert bearer_token("Bearer ") is None
+    assert bearer_token(None) is None
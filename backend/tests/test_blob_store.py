@@ -0,0 +1,106 @@
+import time
+import pytest
+from storage import MessageStore, BlobStore, ColdArchive, message_id_floor
+
+LONG_ANSWER = "Paris is the capital of France. " * 20
+
+
+@pytest.fixture
+def store(fake_db):
+    return MessageStore(blobs=BlobStore(min_size=64))
+
+
+@pytest.mark.asyncio
+async def test_identical_bodies_are_stored_once(store, fake_db):
+    await store.save_responses("alice", "m1", {"grok": LONG_ANSWER, "gemini": "Error: timeout"})
+    await store.save_responses("bob", "m7", {"openai": LONG_ANSWER})
+
+    digest = BlobStore.digest(LONG_ANSWER)
+    assert list(fake_db.tree["blobs"]) == [digest]
+    assert fake_db.tree["messages"]["alice"]["m1"]["responses"] == {
+        "grok": {"blob": digest},
+        "gemini": "Error: timeout"
+    }
+    assert fake_db.tree["blob_meta"][digest]["size"] == len(LONG_ANSWER)
+
+
+@pytest.mark.asyncio
+async def test_reads_resolve_references(store, fake_db):
+    await store.save_message("alice", "m1", "Capital of France?")
+    await store.save_responses("alice", "m1", {"grok": LONG_ANSWER})
+
+    # A fresh process has neither the recent-writes nor the blob cache
+    cold = MessageStore(blobs=BlobStore(min_size=64))
+    assert await cold.get_responses("alice", "m1") == {"grok": LONG_ANSWER}
+    assert (await cold.get_message("alice", "m1"))["responses"]["grok"] == LONG_ANSWER
+    assert cold.blobs.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_history_page_resolves_in_one_batch(store, fake_db):
+    for index in range(5):
+        await store.save_responses("alice", f"m{index}", {"grok": LONG_ANSWER, "gemini": LONG_ANSWER + "!"})
+
+    cold = MessageStore(blobs=BlobStore(min_size=64))
+    page, _ = await cold.list_messages("alice", limit=10)
+    assert all(message["responses"]["grok"] == LONG_ANSWER for message in page)
+    assert cold.blobs.stats()["fetches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_only_unreferenced_blobs(store, fake_db, monkeypatch):
+    await store.save_responses("alice", "m1", {"grok": LONG_ANSWER})
+    await store.save_responses("alice", "m2", {"grok": LONG_ANSWER + " Orphaned."})
+    await store.save_responses("alice", "m2", {"grok": "short"})
+
+    # Nothing is old enough yet
+    assert await store.collect_garbage(grace=3600) == 0
+
+    assert await store.collect_garbage(grace=-1) == 1
+    assert list(fake_db.tree["blobs"]) == [BlobStore.digest(LONG_ANSWER)]
+
+
+@pytest.mark.asyncio
+async def test_sweep_pages_through_messages(store, fake_db):
+    for index in range(5):
+        await store.save_responses("alice", f"m{index}", {"grok": "short"})
+    await store.save_responses("alice", "m4", {"grok": LONG_ANSWER})
+    await store.save_responses("alice", "m5", {"grok": LONG_ANSWER + " Orphaned."})
+    await store.save_responses("alice", "m5", {"grok": "short"})
+
+    assert await store.collect_garbage(grace=-1, page_size=2) == 1
+    assert list(fake_db.tree["blobs"]) == [BlobStore.digest(LONG_ANSWER)]
+
+
+@pytest.mark.asyncio
+async def test_blob_rereferenced_during_the_scan_survives(store, fake_db):
+    await store.save_responses("alice", "m1", {"grok": LONG_ANSWER})
+    await store.save_responses("alice", "m1", {"grok": "short"})
+    digest = BlobStore.digest(LONG_ANSWER)
+    fake_db.tree["blob_meta"][digest]["touched"] = 0
+    scan = store._scan_records
+
+    def scan_with_concurrent_write(user_id, page_size):
+        # Another worker stores the same body after the candidates were chosen
+        fake_db.reference("blob_meta").child(digest).set({"size": len(LONG_ANSWER), "touched": int(time.time() * 1000)})
+        fake_db.reference("messages/bob/m9/responses").set({"openai": {"blob": digest}})
+        return scan(user_id, page_size)
+
+    store._scan_records = scan_with_concurrent_write
+    assert await store.collect_garbage(grace=60, page_size=2) == 0
+    assert digest in fake_db.tree["blobs"] and digest in fake_db.tree["blob_meta"]
+
+
+@pytest.mark.asyncio
+async def test_archived_segments_hold_full_bodies(fake_db, tmp_path, monkeypatch):
+    store = MessageStore(archive=ColdArchive(str(tmp_path)), blobs=BlobStore(min_size=64))
+    message_id = message_id_floor(1_000)
+    await store.save_message("alice", message_id, "Capital of France?")
+    await store.save_responses("alice", message_id, {"grok": LONG_ANSWER})
+
+    # Age comes from the record's timestamp, so archive as of two days from now
+    later = time.time() + 2 * 86400
+    monkeypatch.setattr("storage.message_store.time.time", lambda: later)
+    await store.compact("alice", older_than_days=1)
+    assert await store.collect_garbage(grace=-1) == 1
+    assert (await store.get_message("alice", message_id))["responses"]["grok"] == LONG_ANSWER
@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from llm_handlers import CascadeHandler
+
+GOOD_ANSWER = ("Vaccines expose the immune system to a harmless piece or weakened form of a "
+               "pathogen so that B cells produce antibodies and memory cells form, which lets "
+               "the body respond quickly and strongly if the real pathogen ever appears later.")
+
+# Two independent ~80 word answers: a paraphrase of each other, and one that contradicts them
+ANSWER = ("Vaccines work by training the immune system. They expose the body to a harmless piece of a pathogen, "
+          "such as a protein or an inactivated virus. B cells respond by producing antibodies, and T cells learn "
+          "to recognise infected cells. Afterwards memory B and T cells remain in the body for years. If the real "
+          "pathogen appears later, these memory cells respond quickly and strongly, so the infection is stopped "
+          "before it causes serious illness. Some vaccines need boosters because immune memory fades over time.")
+PARAPHRASE = ("A vaccine teaches the immune system to recognise a pathogen without causing disease. It contains an "
+              "antigen, for example a weakened virus, an inactivated virus or a single viral protein. The immune "
+              "system reacts by making antibodies through B cells and by activating T cells. Long-lived memory "
+              "cells are formed. When the real pathogen infects the body later, memory cells mount a fast and "
+              "strong response, preventing serious disease. Boosters are needed for some vaccines because "
+              "protection wanes.")
+CONTRADICTION = ("Vaccines mainly act as a signal to the liver, which then releases stored minerals that harden "
+                 "the skin against germs. Historically, smallpox disappeared because of improved sanitation and "
+                 "nutrition rather than any injection, and most diseases were already declining before vaccination "
+                 "programmes were introduced. The main benefit today is economic, since fewer working days are "
+                 "lost, and the protection usually lasts only a couple of weeks.")
+
+
+def fake_handler(*answers):
+    handler = MagicMock()
+    handler.generate_response = AsyncMock(side_effect=list(answers))
+    return handler
+
+
+def recording_call():
+    calls = []
+
+    async def call(model, handler, sample=False):
+        calls.append(model + (":sample" if sample else ""))
+        return await handler.generate_response("question")
+
+    return call, calls
+
+
+@pytest.mark.asyncio
+async def test_agreeing_samples_skip_fan_out():
+    handlers = {
+        "openai": fake_handler("unused"),
+        "gemini": fake_handler(ANSWER, PARAPHRASE),
+        "grok": fake_handler("unused")
+    }
+    call, calls = recording_call()
+    responses, info = await CascadeHandler(fast_model="gemini").run(handlers, call)
+
+    assert responses == {"gemini": ANSWER}
+    # The sample goes through the same call, flagged so it is not published
+    assert calls == ["gemini", "gemini:sample"]
+    assert info["escalated"] is False
+    assert info["samples"] == 2
+    handlers["openai"].generate_response.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_full_length_answer_escalates_when_samples_disagree():
+    handlers = {
+        "gemini": fake_handler(ANSWER, CONTRADICTION),
+        "openai": fake_handler(PARAPHRASE),
+        "grok": fake_handler(ANSWER)
+    }
+    call, calls = recording_call()
+    responses, info = await CascadeHandler(fast_model="gemini").run(handlers, call)
+
+    assert info["score"]["length"] == 1.0
+    assert info["score"]["confidence"] < 0.6
+    assert info["escalated"] is True
+    assert sorted(calls) == ["gemini", "gemini:sample", "grok", "openai"]
+    assert responses == {"gemini": ANSWER, "openai": PARAPHRASE, "grok": ANSWER}
+
+
+@pytest.mark.asyncio
+async def test_short_answer_is_unsure_even_when_consistent():
+    short = "Vaccines train immune memory so the body fights the real pathogen fast."
+    score = CascadeHandler().score([short, short])
+    assert score["consistency"] > 0.99
+    assert score["confidence"] < 0.6
+
+
+@pytest.mark.asyncio
+async def test_refusal_escalates_to_remaining_handlers():
+    handlers = {
+        "gemini": fake_handler("I'm sorry, I can't help with that.", GOOD_ANSWER),
+        "openai": fake_handler(GOOD_ANSWER),
+        "grok": fake_handler(GOOD_ANSWER)
+    }
+    call, calls = recording_call()
+    responses, info = await CascadeHandler(fast_model="gemini").run(handlers, call)
+
+    assert sorted(responses) == ["gemini", "grok", "openai"]
+    assert sorted(calls) == ["gemini", "grok", "openai"]
+    assert info["escalated"] is True
+    assert info["score"]["reason"] == "refusal"
+
+
+@pytest.mark.asyncio
+async def test_inconsistent_samples_lower_confidence():
+    cascade = CascadeHandler()
+    unrelated = "Paris is the capital of France and sits on the Seine river in Europe " * 3
+    assert cascade.score([GOOD_ANSWER, unrelated])["confidence"] < cascade.threshold
+    assert cascade.score(["Short."])["confidence"] < cascade.threshold
+    assert cascade.score(["Error: timeout"])["reason"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_first_handler_without_fast_model():
+    handlers = {"openai": fake_handler("Error: rate limited", "Error: rate limited")}
+    call, _ = recording_call()
+    responses, info = await CascadeHandler(fast_model="gemini").run(handlers, call)
+    assert info["fastModel"] == "openai"
+    # Nothing left to escalate to
+    assert info["escalated"] is False
+    assert responses == {"openai": "Error: rate limited"}
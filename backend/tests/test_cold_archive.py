@@ -0,0 +1,116 @@
+import gzip
+import pytest
+from storage import MessageStore, ColdArchive, message_id_floor
+
+DAY_MS = 86400 * 1000
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ColdArchive(str(tmp_path), block_records=4)
+
+
+def seed_messages(fake_db, ages_in_days, now_ms=1_700_000_000_000):
+    ids = []
+    for index, age in enumerate(ages_in_days):
+        message_id = message_id_floor(now_ms - int(age * DAY_MS))
+        fake_db.reference(f"messages/alice/{message_id}").set({
+            "content": f"question {index}",
+            "responses": {"grok": f"answer {index} " * 20},
+            "timestamp": now_ms - int(age * DAY_MS),
+            "version": index + 1
+        })
+        ids.append(message_id)
+    return ids
+
+
+def test_segment_roundtrip_reads_single_block(archive):
+    records = [(message_id_floor(1_000 + i), {"content": f"q{i}"}) for i in range(10)]
+    name = archive.write_segment("alice", records)
+
+    assert archive.read("alice", name, records[6][0]) == {"content": "q6"}
+    assert archive.read("alice", name, "0" * 26) is None
+    assert archive.stats()["blockReads"] == 1
+    archive.read("alice", name, records[5][0])
+    assert archive.stats()["blockReads"] == 1
+
+    # The segment is an ordinary multi-member gzip stream of NDJSON
+    with gzip.open(f"{archive.directory}/alice/{name}.ndjson.gz", "rt") as segment:
+        assert len(segment.read().splitlines()) == 10
+
+
+def test_index_is_loaded_from_disk(archive):
+    records = [(message_id_floor(1_000 + i), {"content": f"q{i}"}) for i in range(6)]
+    name = archive.write_segment("alice", records)
+    reopened = ColdArchive(archive.directory)
+    assert reopened.read("alice", name, records[4][0]) == {"content": "q4"}
+
+
+def test_rejects_path_like_user_ids(archive):
+    with pytest.raises(ValueError):
+        archive.write_segment("../etc", [("m1", {})])
+
+
+@pytest.mark.asyncio
+async def test_compact_leaves_stubs_and_rehydrates(fake_db, archive, monkeypatch):
+    monkeypatch.setattr("storage.message_store.time.time", lambda: 1_700_000_000)
+    ids = seed_messages(fake_db, [90, 60, 45, 10, 1])
+    store = MessageStore(archive=archive)
+
+    assert await store.compact("alice", older_than_days=30, batch_size=2) == 3
+    hot = fake_db.tree["messages"]["alice"]
+    assert set(hot[ids[0]]) == {"archived", "timestamp", "version"}
+    assert "content" in hot[ids[3]]
+
+    page, _ = await store.list_messages("alice", limit=10)
+    assert [message["content"] for message in page] == [f"question {i}" for i in (4, 3, 2, 1, 0)]
+    assert await store.get_question("alice", ids[1]) == "question 1"
+    assert (await store.get_responses("alice", ids[0]))["grok"].startswith("answer 0")
+
+    # A second run finds nothing new to archive
+    assert await store.compact("alice", older_than_days=30) == 0
+
+
+@pytest.mark.asyncio
+async def test_compact_judges_legacy_ids_by_timestamp(fake_db, archive, monkeypatch):
+    monkeypatch.setattr("storage.message_store.time.time", lambda: 1_700_000_000)
+    now_ms = 1_700_000_000_000
+    records = {
+        "qold123": {"content": "old frontend id", "timestamp": now_ms - 90 * DAY_MS},
+        "-Nnew456": {"content": "recent push id", "timestamp": now_ms - DAY_MS},
+        "qnotime": {"content": "no timestamp"}
+    }
+    for message_id, record in records.items():
+        fake_db.reference(f"messages/alice/{message_id}").set(record)
+
+    assert await MessageStore(archive=archive).compact("alice", older_than_days=30) == 1
+    hot = fake_db.tree["messages"]["alice"]
+    assert "archived" in hot["qold123"]
+    assert hot["-Nnew456"]["content"] == "recent push id"
+    assert hot["qnotime"]["content"] == "no timestamp"
+
+
+@pytest.mark.asyncio
+async def test_writes_after_archiving_override_archived_fields(fake_db, archive, monkeypatch):
+    monkeypatch.setattr("storage.message_store.time.time", lambda: 1_700_000_000)
+    ids = seed_messages(fake_db, [90])
+    store = MessageStore(archive=archive)
+    await store.compact("alice", older_than_days=30)
+
+    await store.save_analysis("alice", ids[0], {"bestModel": "grok"})
+    message = await store.get_message("alice", ids[0])
+    assert message["content"] == "question 0"
+    assert message["analysis"]["content"] == {"bestModel": "grok"}
+
+    sync = await store.changes_since("alice", 0)
+    assert sync["changes"][0]["analysis"]["content"] == {"bestModel": "grok"}
+
+
+@pytest.mark.asyncio
+async def test_compact_all_users(fake_db, archive, monkeypatch):
+    monkeypatch.setattr("storage.message_store.time.time", lambda: 1_700_000_000)
+    seed_messages(fake_db, [90, 1])
+    fake_db.reference(f"messages/bob/{message_id_floor(1_000)}").set({"content": "old", "timestamp": 1_000})
+
+    archived = await MessageStore(archive=archive).compact_all(older_than_days=30)
+    assert archived == {"alice": 1, "bob": 1}
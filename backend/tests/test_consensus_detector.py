@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from llm_handlers import AnalysisHandler, ConsensusDetector, LatencyModel, LLMHandlerFactory, ProviderGuard
+
+AGREEING_ANSWER = (
+    "The capital of France is Paris. Paris has been the capital since the tenth century. "
+    "It is also the largest city in the country."
+)
+
+DIFFERENT_ANSWERS = {
+    "openai": "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "gemini": "The French revolution began in 1789 with the storming of the Bastille.",
+    "grok": "Quantum entanglement links the states of particles across any distance.",
+    "deepseek": "Rust uses ownership and borrowing to guarantee memory safety."
+}
+
+
+def agreeing_responses():
+    return {
+        "openai": AGREEING_ANSWER,
+        "gemini": AGREEING_ANSWER + " Paris is known for the Eiffel Tower.",
+        "grok": {"answer": AGREEING_ANSWER},
+        "deepseek": AGREEING_ANSWER
+    }
+
+
+def test_similarity_matrix_is_symmetric_with_unit_diagonal():
+    detector = ConsensusDetector()
+    matrix = detector.similarity_matrix(list(DIFFERENT_ANSWERS.values()))
+    assert matrix.shape == (4, 4)
+    assert matrix == pytest.approx(matrix.T)
+    assert matrix.diagonal() == pytest.approx([1.0] * 4)
+
+
+def test_detects_consensus_locally():
+    result = ConsensusDetector().detect(agreeing_responses())
+    assert result is not None
+    assert result["source"] == "local"
+    assert result["bestModel"] in {"openai", "grok", "deepseek"}
+    assert result["consensus"] >= 0.85
+    assert set(result["agreement"]) == {"openai", "gemini", "grok", "deepseek"}
+    assert "Paris" in result["summary"]
+
+
+def test_no_consensus_for_different_answers():
+    assert ConsensusDetector().detect(DIFFERENT_ANSWERS) is None
+
+
+def test_error_responses_are_ignored():
+    responses = {"openai": AGREEING_ANSWER, "gemini": "Error: API request failed"}
+    assert ConsensusDetector().detect(responses) is None
+
+
+def test_summary_is_trimmed_to_central_sentences():
+    long_answer = " ".join(f"Sentence number {i} about Paris." for i in range(12))
+    detector = ConsensusDetector(summary_sentences=3)
+    result = detector.detect({"openai": long_answer, "gemini": long_answer})
+    assert result["summary"].count(".") == 3
+
+
+@pytest.mark.asyncio
+async def test_analysis_handler_skips_upstream_call_on_consensus():
+    handler = AnalysisHandler()
+    with patch.object(handler, "_complete") as complete:
+        result = await handler.analyze_responses("What is the capital of France?", agreeing_responses())
+    complete.assert_not_called()
+    assert result["source"] == "local"
+
+
+@pytest.mark.asyncio
+async def test_llm_analysis_goes_through_the_guard():
+    async def hang(prompt, **kwargs):
+        await asyncio.sleep(5)
+
+    deepseek = MagicMock()
+    deepseek.generate_response = AsyncMock(side_effect=hang)
+    handler = AnalysisHandler(ConsensusDetector(threshold=2.0),
+                              guard=ProviderGuard(latency_model=LatencyModel(default_timeout=0.05)))
+    with patch.object(LLMHandlerFactory, "get_handler", return_value=deepseek):
+        result = await asyncio.wait_for(handler.analyze_responses("Capital?", DIFFERENT_ANSWERS), timeout=2)
+    assert "timed out" in result["error"]
+    assert deepseek.generate_response.await_args.kwargs["temperature"] == 0.3
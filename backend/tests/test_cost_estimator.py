@@ -0,0 +1,57 @@
+import pytest
+from llm_handlers import CostEstimator
+from llm_handlers import cost_estimator
+from llm_handlers.prompt_templates import estimate_tokens
+
+
+@pytest.fixture
+def estimator(monkeypatch):
+    # Pin the heuristic path so the numbers do not depend on tiktoken being installed
+    monkeypatch.setattr(cost_estimator, "tiktoken", None)
+    return CostEstimator(prices={"openai": (10.0, 30.0), "deepseek": (1.0, 2.0)},
+                         tokens_per_second={"openai": 50.0, "deepseek": 20.0})
+
+
+def test_heuristic_count_is_calibrated_and_cached(estimator):
+    text = "How do transformers handle long context windows? " * 10
+    count = estimator.count_tokens("gemini", text)
+    assert count < estimate_tokens(text)
+    assert estimator.count_tokens("gemini", text) == count
+    assert estimator.count_tokens("unknown", text) == estimate_tokens(text)
+
+
+def test_estimate_uses_budget_until_calls_are_observed(estimator):
+    estimate = estimator.estimate("openai", "word " * 300, max_tokens=500)
+    assert estimate["completionTokens"] == 500
+    assert estimate["latency"] == 10.0
+    assert estimate["cost"] == pytest.approx((estimate["promptTokens"] * 10 + 500 * 30) / 1e6)
+
+    estimator.record("openai", "word " * 150, latency=2.0)
+    learned = estimator.estimate("openai", "word " * 300, max_tokens=500)
+    assert learned["completionTokens"] == 190
+    assert learned["latency"] == 2.0
+    assert estimator.stats()["openai"]["observed"] == 1
+
+
+def test_fan_out_takes_the_slowest_and_sums_cost(estimator):
+    estimate = estimator.estimate_fan_out(["openai", "deepseek"], "Why is the sky blue?", max_tokens=400)
+    assert estimate["estimatedTime"] == 20.0
+    assert estimate["cost"] == pytest.approx(sum(entry["cost"] for entry in estimate["models"].values()))
+
+
+def test_fan_out_counts_each_providers_rendered_prompt(estimator):
+    bare = estimator.estimate_fan_out(["openai", "deepseek"], "question", max_tokens=400)
+    rendered = estimator.estimate_fan_out(["openai", "deepseek"], "question", max_tokens=400,
+                                          systems={"openai": "Be concise."},
+                                          prompts={"openai": "Answer in 300 words: question"})
+    assert rendered["models"]["openai"]["promptTokens"] > bare["models"]["openai"]["promptTokens"]
+    assert rendered["models"]["deepseek"] == bare["models"]["deepseek"]
+
+
+def test_admit_drops_slow_then_expensive_providers(estimator):
+    estimate = estimator.estimate_fan_out(["openai", "deepseek", "grok"], "question", max_tokens=400)
+    assert estimator.admit(estimate) == ["openai", "deepseek", "grok"]
+    assert estimator.admit(estimate, max_time=15) == ["openai", "grok"]
+    assert estimator.admit(estimate, max_cost=0.005) == ["deepseek", "grok"]
+    # Nothing fits: the fastest provider is still called
+    assert estimator.admit(estimate, max_cost=0.0, max_time=1) == ["openai"]
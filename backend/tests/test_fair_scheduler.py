@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from admission import BATCH, FairScheduler
+
+
+async def run_all(scheduler, requests, hold=0.01):
+    """Submit (user, priority) requests in order and record the admission order."""
+    order = []
+
+    async def request(user_id, priority):
+        async with scheduler.slot(user_id, priority=priority):
+            order.append(user_id)
+            await asyncio.sleep(hold)
+
+    tasks = [asyncio.ensure_future(request(user_id, priority)) for user_id, priority in requests]
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_heavy_user_does_not_starve_others():
+    scheduler = FairScheduler(max_concurrent=1, tiers={"free": (1.0, 10)})
+    order = await run_all(scheduler, [("heavy", "interactive")] * 6 + [("light", "interactive")] * 2)
+    # The light user's requests are interleaved with the heavy backlog, not queued behind it
+    assert order.index("light") <= 2
+    assert order[:5].count("light") == 2
+
+
+@pytest.mark.asyncio
+async def test_weights_and_in_flight_caps():
+    scheduler = FairScheduler(max_concurrent=1, tiers={"free": (1.0, 10), "pro": (3.0, 10)},
+                              user_tiers={"paying": "pro"})
+    order = await run_all(scheduler, [("paying", "interactive")] * 8 + [("free", "interactive")] * 8)
+    assert order[:8].count("paying") >= 5
+
+    capped = FairScheduler(max_concurrent=4, tiers={"free": (1.0, 1)})
+    running = []
+
+    async def request():
+        async with capped.slot("solo"):
+            running.append(capped.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[request() for _ in range(3)])
+    assert running == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_interactive_goes_before_batch():
+    scheduler = FairScheduler(max_concurrent=1, tiers={"free": (1.0, 10)})
+    order = await run_all(scheduler, [("first", "interactive")] + [("batcher", BATCH)] * 3
+                          + [("late", "interactive")])
+    assert order[:2] == ["first", "late"]
+    stats = scheduler.stats()
+    assert stats["admitted"] == 5 and stats["inFlight"] == 0 and stats["queued"] == 0
+    assert stats["queueTime"]["batch"]["p50"] > 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = FairScheduler(max_concurrent=1)
+
+    async def hold():
+        async with scheduler.slot("a"):
+            await asyncio.sleep(0.05)
+
+    holder = asyncio.ensure_future(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(run_all(scheduler, [("b", "interactive")]))
+    await asyncio.sleep(0.01)
+    assert scheduler.queued("b") == 1
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queued() == 0
+    await holder
+    assert scheduler.in_flight == 0
+
+    with pytest.raises(ValueError):
+        async with scheduler.slot("a", priority="urgent"):
+            pass
@@ -0,0 +1,50 @@
+import pytest
+from llm_handlers import FastAnalysisHandler
+
+QUESTION = "Why is the sky blue during the day?"
+
+STRUCTURED_ANSWER = """1. What is Rayleigh scattering?
+2. How does wavelength affect scattering?
+3. Why don't we see violet instead of blue?
+
+The sky is blue because sunlight is scattered by molecules in the atmosphere.
+Shorter wavelengths such as blue scatter much more strongly than red light, so
+blue light reaches our eyes from every direction of the sky during the day.
+""" + " ".join(["Rayleigh scattering explains the blue color of the sky."] * 30)
+
+
+def sample_responses():
+    return {
+        "openai": STRUCTURED_ANSWER,
+        "gemini": "The sky looks blue.",
+        "grok": "Bananas are a good source of potassium and fiber.",
+        "deepseek": "Error: API request failed with status 500"
+    }
+
+
+def test_feature_matrix_shape_and_bounds():
+    handler = FastAnalysisHandler()
+    texts = [STRUCTURED_ANSWER, "The sky looks blue."]
+    features = handler.feature_matrix(QUESTION, texts)
+    assert features.shape == (2, 4)
+    assert ((features >= 0) & (features <= 1 + 1e-9)).all()
+    assert features[0, 1] == pytest.approx(1.0)
+    assert features[1, 1] == 0
+
+
+@pytest.mark.asyncio
+async def test_ranks_structured_relevant_answer_first():
+    result = await FastAnalysisHandler().analyze_responses(QUESTION, sample_responses())
+    assert result["bestModel"] == "openai"
+    assert result["source"] == "fast"
+    assert [entry["model"] for entry in result["ranking"]][-1] == "grok"
+    assert "deepseek" not in {entry["model"] for entry in result["ranking"]}
+    assert "Rayleigh scattering?" not in result["summary"]
+    assert result["summary"].startswith("The sky is blue")
+
+
+@pytest.mark.asyncio
+async def test_no_valid_responses():
+    result = await FastAnalysisHandler().analyze_responses(QUESTION, {"openai": "Error: timeout"})
+    assert result["bestModel"] == "unknown"
+    assert "error" in result
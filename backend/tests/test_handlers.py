@@ -220,6 +220,13 @@ class TestOpenAIChatHandler:
         response = await handler.generate_response(TEST_MESSAGE)
         assert "Error" in response
 
+    @pytest.mark.asyncio
+    async def test_temperature_is_passed_through(self):
+        handler = OpenAIChatHandler(TEST_API_KEY)
+        with patch.object(handler, "_make_request", AsyncMock(return_value=TEST_RESPONSE)) as request:
+            await handler.generate_response(TEST_MESSAGE, temperature=0.3)
+        assert request.await_args.args[2] == 0.3
+
 class TestLLMHandlerFactory:
     def test_create_handler(self):
         factory = LLMHandlerFactory()
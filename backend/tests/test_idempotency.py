@@ -0,0 +1,107 @@
+import asyncio
+import time
+import pytest
+from storage import MessageStore, IdempotencyRegistry, ClaimInProgress
+
+
+def counting_work(delay=0.0, fail=False):
+    calls = {"count": 0}
+
+    async def work():
+        calls["count"] += 1
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("provider fan-out failed")
+        return {"message": "Message sent successfully", "message_id": "m1"}
+
+    return work, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_attach_to_in_flight_run(fake_db):
+    registry = IdempotencyRegistry(MessageStore())
+    work, calls = counting_work(delay=0.01)
+    results = await asyncio.gather(*[registry.run("alice", "m1", work) for _ in range(5)])
+    assert calls["count"] == 1
+    assert all(result == results[0] for result in results)
+    assert fake_db.tree["claims"]["alice"]["m1"]["status"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_duplicate_after_completion_returns_stored_outcome(fake_db):
+    store = MessageStore()
+    work, calls = counting_work()
+    first = await IdempotencyRegistry(store).run("alice", "m1", work)
+
+    # A fresh registry (restart or another worker) falls back to the stored claim
+    second = await IdempotencyRegistry(store).run("alice", "m1", work)
+    assert second == first
+    assert calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_run_releases_claim(fake_db):
+    registry = IdempotencyRegistry(MessageStore())
+    failing, _ = counting_work(fail=True)
+    with pytest.raises(RuntimeError):
+        await registry.run("alice", "m1", failing)
+    assert "claims" not in fake_db.tree or "m1" not in fake_db.tree["claims"].get("alice", {})
+
+    work, calls = counting_work()
+    await registry.run("alice", "m1", work)
+    assert calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_live_claim_held_elsewhere_conflicts(fake_db):
+    fake_db.reference("claims/alice/m1").set({"status": "running", "claimed_at": time.time()})
+    work, calls = counting_work()
+    with pytest.raises(ClaimInProgress):
+        await IdempotencyRegistry(MessageStore()).run("alice", "m1", work)
+    assert calls["count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_abandoned_claim_is_taken_over(fake_db):
+    fake_db.reference("claims/alice/m1").set({"status": "running", "claimed_at": time.time() - 600})
+    work, calls = counting_work()
+    await IdempotencyRegistry(MessageStore(), lease=300).run("alice", "m1", work)
+    assert calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_completed_outcomes_are_bounded(fake_db):
+    registry = IdempotencyRegistry(MessageStore(), max_entries=2)
+    work, _ = counting_work()
+    for message_id in ("m1", "m2", "m3"):
+        await registry.run("alice", message_id, work)
+    assert registry.stats() == {"running": 0, "completed": 2}
+
+
+@pytest.mark.asyncio
+async def test_outcome_is_looked_up_without_running_work(fake_db):
+    store = MessageStore()
+    assert await IdempotencyRegistry(store).outcome("alice", "m1") is None
+    assert "claims" not in fake_db.tree
+
+    work, _ = counting_work()
+    first = await IdempotencyRegistry(store).run("alice", "m1", work)
+    assert await IdempotencyRegistry(store).outcome("alice", "m1") == first
+
+
+@pytest.mark.asyncio
+async def test_completed_claims_expire_and_are_purged(fake_db):
+    store = MessageStore()
+    fake_db.reference("claims/alice/m1").set({"status": "done", "claimed_at": time.time() - 7200, "result": {}})
+    fake_db.reference("claims/alice/m2").set({"status": "done", "claimed_at": time.time(), "result": {}})
+    registry = IdempotencyRegistry(store, ttl=3600)
+    assert await registry.outcome("alice", "m1") is None
+
+    work, calls = counting_work()
+    await registry.run("alice", "m1", work)
+    assert calls["count"] == 1
+
+    fake_db.reference("claims/bob/m3").set({"status": "running", "claimed_at": time.time() - 7200})
+    assert await store.purge_claims(older_than=3600, page_size=1) == 1
+    assert sorted(fake_db.tree["claims"]["alice"]) == ["m1", "m2"]
+    assert fake_db.tree["claims"].get("bob", {}) == {}
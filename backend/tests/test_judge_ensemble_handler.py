@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from llm_handlers import JudgeEnsembleHandler, ConsensusDetector, LatencyModel, ProviderGuard
+from llm_handlers.analysis_handler import ANALYSIS_SYSTEM_PROMPT
+
+QUESTION = "What causes the seasons?"
+
+RESPONSES = {
+    "openai": "Axial tilt changes the angle of sunlight through the year.",
+    "gemini": "Distance from the sun is the main cause.",
+    "grok": "Seasons are caused by the tilt of Earth's axis.",
+    "deepseek": "Ocean currents determine the seasons."
+}
+
+
+def verdict(model):
+    return f"SUMMARY: Tilt explains it.\nBEST_MODEL: {model}\nEXPLANATION: {model} was correct."
+
+
+def judge(reply, delay=0.0):
+    handler = MagicMock()
+
+    async def generate_response(prompt, **kwargs):
+        await asyncio.sleep(delay)
+        return reply
+
+    handler.generate_response = AsyncMock(side_effect=generate_response)
+    return handler
+
+
+def ensemble(judges, guard=None):
+    # A threshold above 1 disables the local consensus shortcut
+    return JudgeEnsembleHandler(judges=judges, consensus_detector=ConsensusDetector(threshold=2.0), guard=guard)
+
+
+@pytest.mark.asyncio
+async def test_majority_stops_early_and_cancels_slow_judges():
+    handler = ensemble({
+        "a": judge(verdict("openai")),
+        "b": judge(verdict("openai"), delay=0.01),
+        "c": judge(verdict("grok"), delay=5),
+        "d": judge(verdict("grok"), delay=5),
+        "e": judge(verdict("openai"), delay=0.02)
+    })
+    result = await asyncio.wait_for(handler.analyze_responses(QUESTION, RESPONSES), timeout=2)
+
+    assert result["source"] == "ensemble"
+    assert result["bestModel"] == "openai"
+    assert result["votes"] == {"openai": 3}
+    assert result["voteMargin"] == 3
+    assert result["earlyStop"] is True
+    assert result["judges"]["c"]["status"] == "cancelled"
+    assert result["judges"]["a"]["status"] == "voted"
+    assert result["judges"]["a"]["latencyMs"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_plurality_wins_without_majority_and_failures_are_recorded():
+    handler = ensemble({
+        "a": judge(verdict("grok")),
+        "b": judge("Error: rate limited"),
+        "c": judge("not a verdict"),
+        "d": judge(verdict("openai"), delay=0.01)
+    })
+    result = await handler.analyze_responses(QUESTION, RESPONSES)
+
+    assert result["bestModel"] == "grok"
+    assert result["votes"] == {"grok": 1, "openai": 1}
+    assert result["voteMargin"] == 0
+    assert result["earlyStop"] is False
+    assert result["judges"]["b"]["status"] == "failed"
+    assert result["judges"]["c"]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_all_judges_failing_returns_error():
+    handler = ensemble({"a": judge("Error: boom"), "b": judge("Error: boom")})
+    result = await handler.analyze_responses(QUESTION, RESPONSES)
+    assert result["bestModel"] == "unknown"
+    assert "error" in result
+
+
+@pytest.mark.asyncio
+async def test_hung_judge_times_out_through_the_guard():
+    guard = ProviderGuard(latency_model=LatencyModel(default_timeout=0.05))
+    handler = ensemble({"a": judge(verdict("grok")), "b": judge(verdict("openai"), delay=5)}, guard=guard)
+    result = await asyncio.wait_for(handler.analyze_responses(QUESTION, RESPONSES), timeout=2)
+
+    assert result["bestModel"] == "grok"
+    assert result["judges"]["b"]["status"] == "failed"
+    assert "timed out" in result["judges"]["b"]["error"]
+
+
+@pytest.mark.asyncio
+async def test_judges_get_the_analysis_system_prompt_and_stay_out_of_routing():
+    router = MagicMock()
+    a = judge(verdict("grok"))
+    handler = ensemble({"a": a}, guard=ProviderGuard(router=router))
+    await handler.analyze_responses(QUESTION, RESPONSES)
+
+    assert a.generate_response.call_args.kwargs["system"] == ANALYSIS_SYSTEM_PROMPT
+    assert QUESTION in a.generate_response.call_args.args[0]
+    router.record_response.assert_not_called()
+
+
+def test_requires_a_judge():
+    with pytest.raises(ValueError):
+        JudgeEnsembleHandler(judges={})
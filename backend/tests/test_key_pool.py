@@ -0,0 +1,95 @@
+import pytest
+from llm_handlers import DeepseekHandler, GeminiHandler, KeyPool, KeyPoolManager, LLMHandlerFactory
+from llm_handlers.key_pool import parse_duration
+
+
+def headers(remaining, limit=100, reset="30s", **extra):
+    return dict({
+        "X-RateLimit-Limit-Requests": str(limit),
+        "X-RateLimit-Remaining-Requests": str(remaining),
+        "X-RateLimit-Reset-Requests": reset
+    }, **extra)
+
+
+def test_parse_duration():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1h2m3.5s") == pytest.approx(3723.5)
+    assert parse_duration("7") == 7
+    assert parse_duration(None) is None and parse_duration("soon") is None
+
+
+def test_unreported_keys_are_used_round_robin():
+    pool = KeyPool("openai", ["key-a", "key-b", "key-c"])
+    assert sorted(pool.acquire() for _ in range(6)) == ["key-a", "key-a", "key-b", "key-b", "key-c", "key-c"]
+
+
+def test_least_loaded_key_by_reported_headers():
+    pool = KeyPool("openai", ["key-a", "key-b"])
+    pool.observe("key-a", 200, headers(remaining=10))
+    pool.observe("key-b", 200, headers(remaining=80))
+    assert pool.acquire() == "key-b"
+    # Tokens count too: key-b's token window is nearly spent
+    pool.observe("key-b", 200, headers(remaining=80, **{
+        "x-ratelimit-limit-tokens": "10000", "x-ratelimit-remaining-tokens": "100"}))
+    assert pool.acquire() == "key-a"
+
+
+def test_throttled_key_cools_down():
+    pool = KeyPool("grok", ["key-a", "key-b"], cooldown=60)
+    pool.observe("key-a", 429, {"Retry-After": "20"})
+    assert {pool.acquire() for _ in range(5)} == {"key-b"}
+    pool.observe("key-b", 200, headers(remaining=0, reset="5s"))
+
+    # Everything cooling: the key that recovers first is still handed out
+    assert pool.acquire() == "key-b"
+    stats = {entry["key"]: entry for entry in pool.stats()}
+    assert stats["...ey-a"]["throttled"] == 1
+    assert 19 <= stats["...ey-a"]["coolingDown"] <= 20
+    assert stats["...ey-b"]["remainingRequests"] == 0
+
+
+def test_manager_reads_keys_from_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEYS", "sk-1, sk-2,,sk-1")
+    monkeypatch.setenv("GROK_API_KEY", "xai-1")
+    monkeypatch.delenv("GEMINI_API_KEYS", raising=False)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    manager = KeyPoolManager.from_env(["openai", "grok", "gemini"])
+    assert len(manager.get("openai")) == 2
+    assert len(manager.get("GROK")) == 1
+    assert manager.get("gemini") is None
+    assert set(manager.stats()) == {"openai", "grok"}
+    with pytest.raises(ValueError):
+        KeyPool("openai", [])
+
+
+def test_factory_draws_keys_from_the_pool(monkeypatch):
+    manager = KeyPoolManager({"deepseek": ["ds-1", "ds-2"]})
+    monkeypatch.setattr(LLMHandlerFactory, "key_pools", manager)
+    handlers = [LLMHandlerFactory.get_handler("deepseek") for _ in range(2)]
+    assert {handler.api_key for handler in handlers} == {"ds-1", "ds-2"}
+
+    handlers[0]._report_rate_limits(429, {"retry-after": "30"})
+    assert LLMHandlerFactory.get_handler("deepseek").api_key == handlers[1].api_key
+    assert LLMHandlerFactory.get_handler("deepseek", "explicit").key_pool is None
+
+
+def test_rate_limited_handler_retries_on_another_key():
+    pool = KeyPool("deepseek", ["ds-1", "ds-2"])
+    handler = DeepseekHandler(pool.acquire())
+    handler.key_pool = pool
+    first = handler.api_key
+
+    handler._report_rate_limits(429, {"retry-after": "30"})
+    assert handler.api_key != first
+    assert handler.headers["Authorization"] == f"Bearer {handler.api_key}"
+
+
+def test_gemini_handlers_keep_their_own_keys():
+    handlers = [GeminiHandler(key) for key in ("gm-1", "gm-2")]
+    models = [handler._model() for handler in handlers]
+    assert models[0]._async_client is handlers[0].client
+    assert handlers[0].client is not handlers[1].client
+
+    handlers[0]._use_key("gm-3")
+    assert handlers[0]._model()._async_client is not models[0]._async_client
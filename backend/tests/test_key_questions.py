@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from llm_handlers import KeyQuestionsPipeline, LatencyModel, ProviderGuard
+from llm_handlers.key_questions import normalize_prompt, parse_key_questions
+
+STAGE_ONE_REPLY = """1. What is an antigen?
+2. **How do memory B cells form?**
+3. Why do some vaccines need boosters?"""
+
+
+def fake_handler(reply=STAGE_ONE_REPLY, delay=0.0):
+    handler = MagicMock()
+
+    async def generate(prompt, **kwargs):
+        await asyncio.sleep(delay)
+        return reply
+
+    handler.generate_response = AsyncMock(side_effect=generate)
+    return handler
+
+
+def test_parse_and_normalize():
+    assert parse_key_questions(STAGE_ONE_REPLY) == [
+        "What is an antigen?",
+        "How do memory B cells form?",
+        "Why do some vaccines need boosters?"
+    ]
+    assert normalize_prompt("  How do  Vaccines work?? ") == normalize_prompt("how do vaccines work")
+
+
+def test_fastest_prefers_observed_latency():
+    handlers = {"openai": None, "grok": None, "gemini": None}
+    assert KeyQuestionsPipeline.fastest(handlers) == "gemini"
+    assert KeyQuestionsPipeline.fastest(handlers, {"openai": 1.2, "grok": 0.4, "gemini": None}) == "grok"
+
+
+@pytest.mark.asyncio
+async def test_stage_one_runs_once_per_normalized_prompt():
+    pipeline = KeyQuestionsPipeline(stage_two_max_tokens=500)
+    handlers = {"gemini": fake_handler(delay=0.01), "openai": fake_handler()}
+
+    results = await asyncio.gather(
+        pipeline.prepare("How do vaccines work?", handlers),
+        pipeline.prepare("how do vaccines   work", handlers)
+    )
+    await pipeline.prepare("HOW DO VACCINES WORK?", handlers)
+
+    assert handlers["gemini"].generate_response.await_count == 1
+    handlers["openai"].generate_response.assert_not_called()
+    assert handlers["gemini"].generate_response.await_args.kwargs["max_tokens"] == 150
+    prompt, kwargs, questions = results[0]
+    assert kwargs == {"max_tokens": 500}
+    assert "2. How do memory B cells form?" in prompt
+    assert len(questions) == 3
+    assert pipeline.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_stage_one_failure_falls_back_without_caching():
+    pipeline = KeyQuestionsPipeline()
+    handlers = {"gemini": fake_handler(reply="Error: quota exceeded")}
+    assert await pipeline.prepare("How do vaccines work?", handlers) == ("How do vaccines work?", {}, [])
+    assert pipeline.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hung_stage_one_times_out_and_falls_back():
+    pipeline = KeyQuestionsPipeline(guard=ProviderGuard(latency_model=LatencyModel(default_timeout=0.05)))
+    handlers = {"gemini": fake_handler(delay=5)}
+    result = await asyncio.wait_for(pipeline.prepare("How do vaccines work?", handlers), timeout=2)
+    assert result == ("How do vaccines work?", {}, [])
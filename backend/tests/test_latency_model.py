@@ -0,0 +1,61 @@
+from llm_handlers import LatencyModel
+
+
+def test_cold_model_uses_default_timeout():
+    model = LatencyModel(default_timeout=30.0)
+    assert model.timeout("openai") == 30.0
+    assert model.percentile("openai", 0.99) is None
+
+
+def test_timeout_tracks_p99_with_bounds():
+    model = LatencyModel(factor=1.5, floor=5.0, ceiling=90.0, min_samples=20)
+    for index in range(100):
+        model.record("gemini", 2.0 + index * 0.04)  # 2s .. ~6s
+    p99 = model.percentile("gemini", 0.99)
+    assert 5.9 <= p99 <= 6.6
+    assert model.timeout("gemini") == round(p99 * 1.5, 2)
+
+    for _ in range(50):
+        model.record("deepseek", 0.2)
+        model.record("grok", 300.0)
+    assert model.timeout("deepseek") == 5.0
+    assert model.timeout("grok") == 90.0
+
+
+def test_timeout_is_conditioned_on_max_tokens():
+    model = LatencyModel(min_samples=20)
+    for _ in range(30):
+        model.record("openai", 3.0, max_tokens=150)
+        model.record("openai", 20.0, max_tokens=2000)
+    assert model.timeout("openai", 150) < 6
+    assert model.timeout("openai", 2000) > 30
+    # An unseen band falls back to the provider-wide histogram
+    assert model.percentile("openai", 0.5, 8000) == model.percentile("openai", 0.5)
+
+
+def test_old_samples_decay():
+    model = LatencyModel(min_samples=10, decay_at=100)
+    for _ in range(99):
+        model.record("grok", 40.0)
+    for _ in range(600):
+        model.record("grok", 4.0)
+    assert model.percentile("grok", 0.99) < 5
+
+
+def test_histograms_persist_across_restarts(tmp_path):
+    path = str(tmp_path / "latency.json")
+    model = LatencyModel(path)
+    for _ in range(40):
+        model.record("openai", 8.0)
+    model.save()
+    assert model.dirty == 0
+
+    warm = LatencyModel(path)
+    assert warm.timeout("openai") == model.timeout("openai") != warm.default_timeout
+    assert warm.stats()["openai"]["samples"] == 40
+
+
+def test_unreadable_file_starts_cold(tmp_path):
+    path = tmp_path / "latency.json"
+    path.write_text("{not json")
+    assert LatencyModel(str(path)).timeout("openai") == 30.0
@@ -0,0 +1,171 @@
+import json
+import pytest
+from storage import MessageStore, new_message_id, message_id_timestamp
+
+
+def test_message_ids_are_time_ordered():
+    ids = [new_message_id() for _ in range(1000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 1000
+    assert all(len(message_id) == 26 for message_id in ids)
+    assert new_message_id(1_000) < new_message_id(2_000)
+
+
+def test_message_id_timestamp_roundtrip():
+    assert message_id_timestamp(new_message_id(1_700_000_000_123)) >= 1_700_000_000_123
+
+
+@pytest.mark.asyncio
+async def test_save_and_read_message(fake_db):
+    store = MessageStore()
+    await store.save_message("alice", "m1", "Hello?")
+    await store.save_responses("alice", "m1", {"grok": "Hi"})
+    await store.save_analysis("alice", "m1", {"bestModel": "grok"})
+
+    message = await store.get_message("alice", "m1")
+    assert message["content"] == "Hello?"
+    assert isinstance(message["timestamp"], int)
+    assert await store.get_responses("alice", "m1") == {"grok": "Hi"}
+    assert await store.get_question("alice", "m1") == "Hello?"
+    assert message["analysis"]["content"] == {"bestModel": "grok"}
+
+
+@pytest.mark.asyncio
+async def test_list_messages_pages_newest_first(fake_db):
+    store = MessageStore()
+    ids = [new_message_id() for _ in range(7)]
+    for index, message_id in enumerate(ids):
+        await store.save_message("alice", message_id, f"question {index}")
+    await store.save_message("bob", new_message_id(), "not alice's")
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await store.list_messages("alice", cursor, limit=3)
+        seen.extend(message["id"] for message in page)
+        if cursor is None:
+            break
+    assert seen == list(reversed(ids))
+
+
+@pytest.mark.asyncio
+async def test_list_messages_last_page_has_no_cursor(fake_db):
+    store = MessageStore()
+    for _ in range(3):
+        await store.save_message("alice", new_message_id(), "q")
+    page, cursor = await store.list_messages("alice", limit=3)
+    assert len(page) == 3
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_every_write_bumps_the_user_sequence(fake_db):
+    store = MessageStore()
+    assert await store.save_message("alice", "m1", "Hello?") == 1
+    assert await store.save_responses("alice", "m1", {"grok": "Hi"}) == 2
+    assert await store.save_message("bob", "m9", "Other user") == 1
+    assert await store.save_analysis("alice", "m1", {"bestModel": "grok"}) == 3
+    assert (await store.get_message("alice", "m1"))["version"] == 3
+
+
+@pytest.mark.asyncio
+async def test_changes_since_returns_compact_deltas(fake_db):
+    store = MessageStore()
+    await store.save_message("alice", "m1", "First?")
+    await store.save_responses("alice", "m1", {"grok": "One"})
+    await store.save_message("alice", "m2", "Second?")
+    synced = await store.changes_since("alice", 0)
+    assert synced["seq"] == 3
+
+    await store.save_responses("alice", "m2", {"grok": "Two"})
+    await store.save_analysis("alice", "m1", {"bestModel": "grok"})
+    delta = await store.changes_since("alice", synced["seq"])
+
+    assert delta["seq"] == 5
+    assert delta["has_more"] is False
+    by_id = {change["id"]: change for change in delta["changes"]}
+    assert set(by_id) == {"m1", "m2"}
+    assert by_id["m2"]["responses"] == {"grok": "Two"}
+    assert "content" not in by_id["m2"]
+    assert by_id["m1"]["analysis"]["content"] == {"bestModel": "grok"}
+    assert "responses" not in by_id["m1"]
+
+    assert await store.changes_since("alice", delta["seq"]) == {"seq": 5, "changes": [], "has_more": False}
+
+
+@pytest.mark.asyncio
+async def test_changes_since_pages_with_has_more(fake_db):
+    store = MessageStore()
+    for index in range(5):
+        await store.save_message("alice", f"m{index}", "q")
+    first = await store.changes_since("alice", 0, limit=3)
+    assert first["has_more"] is True
+    assert first["seq"] == 3
+    rest = await store.changes_since("alice", first["seq"], limit=3)
+    assert rest["has_more"] is False
+    assert [change["id"] for change in rest["changes"]] == ["m3", "m4"]
+
+
+@pytest.mark.asyncio
+async def test_changes_since_waits_for_an_earlier_writer(fake_db):
+    store = MessageStore()
+    await store.save_message("alice", "m1", "First?")
+    # Writer A reserves seq 2 but has not committed when writer B commits seq 3
+    slow_seq = store._reserve_seqs("alice", 1)
+    assert await store.save_message("alice", "m3", "Third?") == 3
+
+    assert await store.current_seq("alice") == 1
+    synced = await store.changes_since("alice", 0)
+    assert synced["seq"] == 1
+    assert [change["id"] for change in synced["changes"]] == ["m1"]
+
+    fake_db.reference().update(store._build_updates("alice", [("m2", "message", {"content": "Second?"})], slow_seq))
+    delta = await store.changes_since("alice", synced["seq"])
+    assert delta["seq"] == 3
+    assert [change["id"] for change in delta["changes"]] == ["m2", "m3"]
+
+
+@pytest.mark.asyncio
+async def test_abandoned_reservation_stops_blocking(fake_db):
+    store = MessageStore(reservation_timeout=0.0)
+    store._reserve_seqs("alice", 1)
+    await store.save_message("alice", "m2", "Second?")
+    synced = await store.changes_since("alice", 0)
+    assert synced["seq"] == 2
+    assert [change["id"] for change in synced["changes"]] == ["m2"]
+
+
+@pytest.mark.asyncio
+async def test_iter_messages_pages_oldest_first_and_resumes(fake_db):
+    store = MessageStore()
+    ids = [new_message_id() for _ in range(7)]
+    for index, message_id in enumerate(ids):
+        await store.save_message("alice", message_id, f"question {index}")
+
+    exported = [record async for record in store.iter_messages("alice", page_size=3)]
+    assert [record["id"] for record in exported] == ids
+    assert exported[0]["content"] == "question 0"
+
+    resumed = [record["id"] async for record in store.iter_messages("alice", after=ids[4], page_size=3)]
+    assert resumed == ids[5:]
+    assert [record async for record in store.iter_messages("nobody")] == []
+
+
+@pytest.mark.asyncio
+async def test_export_ends_with_a_resume_trailer_on_failure(fake_db, monkeypatch):
+    store = MessageStore()
+    ids = [new_message_id() for _ in range(5)]
+    for message_id in ids:
+        await store.save_message("alice", message_id, "question")
+
+    query_after = store._query_after
+
+    def flaky(user_id, after, limit):
+        if after is not None:
+            raise ConnectionError("database unavailable")
+        return query_after(user_id, after, limit)
+
+    monkeypatch.setattr(store, "_query_after", flaky)
+    lines = [json.loads(line) async for line in store.export_lines("alice", page_size=3)]
+    assert [line["id"] for line in lines[:3]] == ids[:3]
+    assert lines[3] == {"error": "database unavailable", "resumeAfter": ids[2]}
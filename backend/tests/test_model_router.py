@@ -0,0 +1,62 @@
+import numpy as np
+from llm_handlers import ModelRouter
+
+MODELS = ["openai", "gemini", "grok", "deepseek"]
+CODE_PROMPTS = ["How do I reverse a linked list in python?", "Fix this python recursion bug"]
+COOKING_PROMPTS = ["How long should I bake sourdough bread?", "Best flour for pizza dough?"]
+
+
+def train(router, rounds=40):
+    for index in range(rounds):
+        for prompts, winner in ((CODE_PROMPTS, "grok"), (COOKING_PROMPTS, "gemini")):
+            prompt = prompts[index % len(prompts)]
+            router.observe("alice", f"{winner}-{index}", prompt, MODELS)
+            router.record_win("alice", f"{winner}-{index}", winner)
+
+
+def test_features_are_bounded_and_deterministic():
+    router = ModelRouter(MODELS)
+    x = router.features("How do I bake sourdough bread?")
+    assert x.shape == (router.dim,)
+    assert x[0] == 1.0 and 0 < x[1] <= 1.0
+    assert np.isclose(np.linalg.norm(x[2:]), 1.0)
+    assert np.array_equal(x, router.features("How do I bake sourdough bread?"))
+
+
+def test_untrained_router_explores_two_models():
+    router = ModelRouter(MODELS, seed=0)
+    assert len(router.choose("anything at all")) == 2
+
+
+def test_learns_per_topic_winner_and_calls_one_model():
+    router = ModelRouter(MODELS, explore_rate=0.0, seed=0)
+    train(router)
+    assert router.choose("python linked list recursion") == ["grok"]
+    assert router.choose("sourdough pizza dough flour") == ["gemini"]
+    assert router.stats()["grok"]["wins"] == 40
+
+
+def test_exploration_is_bounded():
+    router = ModelRouter(MODELS, explore_rate=0.3, seed=1)
+    train(router)
+    picks = [router.choose("python linked list recursion") for _ in range(200)]
+    assert all(len(pick) <= 2 and pick[0] == "grok" for pick in picks)
+    explored = sum(len(pick) == 2 for pick in picks) / len(picks)
+    assert 0.15 < explored < 0.45
+
+
+def test_errors_and_latency_penalise_a_model():
+    router = ModelRouter(MODELS, explore_rate=0.0, seed=0)
+    train(router)
+    for _ in range(30):
+        router.record_response("grok", 30.0, error=True)
+    assert router.choose("python linked list recursion")[0] != "grok"
+
+
+def test_single_answer_fan_outs_do_not_teach():
+    router = ModelRouter(MODELS)
+    router.observe("alice", "m1", "question", ["grok"])
+    assert router.record_win("alice", "m1", "grok") is False
+    router.observe("alice", "m2", "question", ["grok", "gemini"])
+    assert router.record_win("alice", "m2", "GROK") is True
+    assert router.record_win("alice", "m2", "grok") is False
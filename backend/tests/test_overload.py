@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from admission import FairScheduler, OverloadController
+
+
+def test_stages_follow_the_worst_signal():
+    scheduler = FairScheduler(max_concurrent=4)
+    controller = OverloadController(scheduler, recovery=60)
+    decision = controller.decide()
+    assert decision == {"stage": "normal", "maxProviders": None, "llmAnalysis": True, "shed": False}
+
+    scheduler.in_flight = 3
+    assert controller.decide()["maxProviders"] == 2
+
+    controller.record_lag(1.0)  # smoothed to 0.3s
+    decision = controller.decide()
+    assert decision["stage"] == "local_analysis"
+    assert decision["maxProviders"] == 1 and not decision["llmAnalysis"]
+    assert controller.stats()["degraded"] == 2
+
+
+def test_sheds_with_retry_after_and_recovers_stepwise():
+    scheduler = FairScheduler(max_concurrent=4)
+    controller = OverloadController(scheduler, recovery=0.0)
+    for _ in range(10):
+        controller.record_lag(2.0)
+    decision = controller.decide()
+    assert decision["shed"] and decision["retryAfter"] >= 1
+    assert controller.stats()["shed"] == 1
+
+    controller.loop_lag = 0.0
+    assert [controller.decide()["stage"] for _ in range(3)] == ["local_analysis", "reduced_fan_out", "normal"]
+
+
+def test_admitted_work_is_degraded_not_shed():
+    controller = OverloadController(FairScheduler(max_concurrent=4), recovery=60)
+    for _ in range(10):
+        controller.record_lag(2.0)
+    decision = controller.decide(admitted=True)
+    assert decision["stage"] == "local_analysis" and not decision["shed"]
+    assert decision["maxProviders"] == 1
+    assert controller.stats()["shed"] == 0
+
+
+def test_no_flapping_within_recovery():
+    controller = OverloadController(FairScheduler(max_concurrent=4), recovery=60)
+    controller.record_lag(0.5)  # smoothed to 0.15s
+    assert controller.decide()["stage"] == "reduced_fan_out"
+    controller.loop_lag = 0.0
+    assert controller.decide()["stage"] == "reduced_fan_out"
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_and_loop_lag_are_measured():
+    scheduler = FairScheduler(max_concurrent=1)
+    controller = OverloadController(scheduler, interval=0.01,
+                                    thresholds={"queueWait": (0.02, 10.0, 20.0),
+                                                "utilization": (2.0, 2.0, 2.0)})
+
+    async def hold():
+        async with scheduler.slot("a"):
+            await asyncio.sleep(0.05)
+
+    holder = asyncio.ensure_future(hold())
+    waiter = asyncio.ensure_future(hold())
+    controller.start()
+    await asyncio.sleep(0.03)
+    assert scheduler.oldest_wait() > 0.02
+    assert controller.decide()["stage"] == "reduced_fan_out"
+    await asyncio.gather(holder, waiter)
+    await controller.stop()
+    assert controller.signals()["queueWait"] == 0.0
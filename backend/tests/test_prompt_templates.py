@@ -0,0 +1,70 @@
+import pytest
+from llm_handlers import AnalysisHandler, PromptRegistry, PromptTemplate, templates
+from llm_handlers.prompt_templates import (
+    TRUNCATION_MARKER,
+    estimate_tokens,
+    max_tokens_for_words,
+    truncate_to_tokens
+)
+
+
+def test_estimator_and_word_budget():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("one two three") == 4
+    assert estimate_tokens("x" * 400) == 100
+    assert max_tokens_for_words(300) == 500
+
+
+def test_truncation_is_deterministic_and_keeps_both_ends():
+    text = "start " + "filler " * 5000 + "final ask?"
+    truncated = truncate_to_tokens(text, 200)
+    assert truncated == truncate_to_tokens(text, 200)
+    assert truncated.startswith("start ") and truncated.endswith("final ask?")
+    assert TRUNCATION_MARKER in truncated
+    assert estimate_tokens(truncated) <= 205
+    assert truncate_to_tokens("short", 200) == "short"
+
+
+def test_answer_template_matches_provider_prompt():
+    rendered = templates.render("answer", model="openai", user_input="Why is the sky blue?")
+    assert rendered.prompt.startswith('Before answering this question: "Why is the sky blue?"')
+    assert rendered.system == "You are a helpful AI assistant that provides thoughtful, concise responses."
+    assert rendered.max_tokens == max_tokens_for_words(360)
+    assert templates.render("answer", model="gemini", user_input="x").system is None
+
+
+def test_oversized_fields_are_cut_to_the_context_window():
+    registry = PromptRegistry(context_windows={"tiny": 2000}, safety_margin=0)
+    registry.register(PromptTemplate("pair", "Q: {question}\nA: {answer}\nB: {other}", max_tokens=500,
+                                     truncatable=("question", "answer")))
+    rendered = registry.render("pair", model="tiny", question="q " * 4000, answer="a " * 12000, other="keep me")
+
+    assert estimate_tokens(rendered.prompt) <= 1500 + 10
+    assert rendered.prompt.endswith("B: keep me")
+    # The larger field gives up proportionally more
+    question, answer = rendered.prompt.split("\nA: ")[0], rendered.prompt.split("\nA: ")[1]
+    assert len(answer) > len(question)
+
+
+def test_fit_free_form_prompt():
+    registry = PromptRegistry(context_windows={"tiny": 1000}, safety_margin=0)
+    assert estimate_tokens(registry.fit("tiny", "word " * 5000, max_tokens=500)) <= 505
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_fit_reserves_the_system_prompt():
+    registry = PromptRegistry(system_prompts={"tiny": "be brief " * 100}, context_windows={"tiny": 1000},
+                              safety_margin=0)
+    system = registry.system_prompt("TINY")
+    fitted = registry.fit("tiny", "word " * 5000, max_tokens=500, system=system)
+    assert estimate_tokens(fitted) <= 500 - estimate_tokens(system) + 5
+    assert registry.system_prompt("gemini") is None
+
+
+def test_analysis_prompt_built_from_registry():
+    prompt = AnalysisHandler._build_prompt("Why?", {"openai": "Because.", "grok": "Error: timeout"})
+    assert 'to the question: "Why?"' in prompt
+    assert "1. OpenAI:\nBecause." in prompt
+    assert "2. Gemini:\nNo response" in prompt
+    assert "must be one of: openai, gemini, grok, deepseek" in prompt
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from llm_handlers import LatencyModel, ProviderGuard, RateLimiter
+from llm_handlers.prompt_templates import RenderedPrompt
+
+PROMPT = RenderedPrompt("Be brief.", "What causes the seasons?", 200)
+
+
+def fake_handler(reply="Axial tilt.", delay=0.0):
+    handler = MagicMock()
+
+    async def generate(prompt, **kwargs):
+        await asyncio.sleep(delay)
+        return reply
+
+    handler.generate_response = AsyncMock(side_effect=generate)
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_call_passes_system_and_budget_and_records_latency():
+    latency_model = LatencyModel()
+    guard = ProviderGuard(latency_model=latency_model)
+    handler = fake_handler()
+
+    assert await guard.call("openai", handler, PROMPT, temperature=0.3) == "Axial tilt."
+    assert handler.generate_response.await_args.kwargs == {"system": "Be brief.", "max_tokens": 200,
+                                                           "temperature": 0.3}
+    assert latency_model.dirty == 1
+    assert guard.estimator.observed["openai"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_rate_limit_become_error_strings():
+    guard = ProviderGuard(latency_model=LatencyModel(default_timeout=0.05))
+    assert (await guard.call("openai", fake_handler(delay=5), PROMPT)).startswith("Error: timed out")
+    assert guard.latency_model.dirty == 1
+
+    limiter = RateLimiter({"grok": (1, None)})
+    await limiter.acquire("grok", 10)
+    guard = ProviderGuard(rate_limiter=limiter)
+    handler = fake_handler()
+    assert "rate limit" in await guard.call("grok", handler, PROMPT)
+    handler.generate_response.assert_not_called()
+    assert guard.latency_model.dirty == 0
@@ -0,0 +1,38 @@
+import pytest
+from realtime import PubSubHub
+
+
+@pytest.mark.asyncio
+async def test_events_reach_only_the_users_connections():
+    hub = PubSubHub()
+    first = hub.subscribe("alice")
+    second = hub.subscribe("alice")
+    other = hub.subscribe("bob")
+
+    delivered = hub.publish("alice", {"type": "response", "messageId": "q1", "model": "grok"})
+
+    assert delivered == 2
+    assert (await first.get())["model"] == "grok"
+    assert (await second.get())["model"] == "grok"
+    assert other.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_dropped():
+    hub = PubSubHub(max_queue=2)
+    slow = hub.subscribe("alice")
+    for i in range(3):
+        hub.publish("alice", {"type": "status", "seq": i})
+
+    assert slow.dropped
+    assert await slow.get() is None
+    assert hub.stats() == {"users": 0, "connections": 0, "published": 3, "dropped": 1}
+    assert hub.publish("alice", {"type": "status"}) == 0
+
+
+def test_unsubscribe_cleans_up():
+    hub = PubSubHub()
+    subscription = hub.subscribe("alice")
+    hub.unsubscribe(subscription)
+    hub.unsubscribe(subscription)
+    assert hub.stats()["connections"] == 0
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from llm_handlers import FirebaseRateLimitBackend, RateLimiter, RateLimitExceeded
+from llm_handlers.rate_limiter import take
+
+
+def test_take_charges_both_buckets_or_neither():
+    state, wait = take(None, 0.0, tokens=400, rpm=60, tpm=1000)
+    assert wait == 0.0 and state["requests"] == 59 and state["tokens"] == 600
+
+    state, wait = take(state, 0.0, tokens=800, rpm=60, tpm=1000)
+    assert wait == pytest.approx(12.0)  # 200 tokens short at 1000/min
+    assert state["tokens"] == 600
+
+    state, wait = take(state, 12.0, tokens=800, rpm=60, tpm=1000)
+    assert wait == 0.0 and state["tokens"] == pytest.approx(0.0)
+
+
+def test_oversized_call_waits_for_a_full_bucket_only():
+    state, _ = take(None, 0.0, tokens=1000, rpm=None, tpm=1000)
+    _, wait = take(state, 0.0, tokens=5000, rpm=None, tpm=1000)
+    assert wait == pytest.approx(60.0)
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_then_rejects_past_deadline():
+    limiter = RateLimiter({"openai": (6000, None)})
+    for _ in range(6000):
+        await limiter.acquire("openai", 10)
+    # One request refills every 10ms
+    waited = await limiter.acquire("openai", 10, deadline=time.monotonic() + 1)
+    assert 0 < waited < 0.5
+
+    limiter = RateLimiter({"grok": (1, None)})
+    await limiter.acquire("grok", 10)
+    with pytest.raises(RateLimitExceeded) as error:
+        await limiter.acquire("grok", 10, deadline=time.monotonic() + 1)
+    assert error.value.retry_after > 59
+    assert limiter.stats()["grok"]["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reconcile_refunds_unused_tokens():
+    limiter = RateLimiter({"deepseek": (None, 1000)})
+    await limiter.acquire("deepseek", 900)
+    await limiter.reconcile("deepseek", estimated=900, actual=300)
+    assert await limiter.acquire("deepseek", 600, deadline=time.monotonic() + 0.1) < 0.1
+    # Unlimited providers are never queued
+    assert await limiter.acquire("gemini", 10 ** 9, deadline=time.monotonic()) == 0.0
+
+
+def test_limits_from_env_scale_with_keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_RPM", "500")
+    monkeypatch.setenv("OPENAI_TPM", "30000")
+    monkeypatch.delenv("GROK_RPM", raising=False)
+    monkeypatch.delenv("GROK_TPM", raising=False)
+    limiter = RateLimiter.from_env(["openai", "grok"], key_counts={"openai": 3})
+    assert limiter.limits == {"openai": (1500.0, 90000.0)}
+
+
+@pytest.mark.asyncio
+async def test_firebase_backend_shares_one_quota(fake_db):
+    workers = [RateLimiter({"openai": (2, None)}, FirebaseRateLimitBackend()) for _ in range(2)]
+    await workers[0].acquire("openai", 10)
+    await workers[1].acquire("openai", 10)
+    with pytest.raises(RateLimitExceeded):
+        await workers[0].acquire("openai", 10, deadline=time.monotonic())
+    assert fake_db.tree["rate_limits"]["openai"]["requests"] < 1
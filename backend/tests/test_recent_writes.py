@@ -0,0 +1,63 @@
+import pytest
+from storage import MessageStore, RecentWritesCache
+
+
+@pytest.mark.asyncio
+async def test_reads_after_writes_are_served_locally(fake_db):
+    store = MessageStore()
+    await store.save_message("alice", "m1", "Hello?")
+    await store.save_responses("alice", "m1", {"grok": "Hi"})
+    reads = fake_db.reads
+
+    assert await store.get_responses("alice", "m1") == {"grok": "Hi"}
+    assert await store.get_question("alice", "m1") == "Hello?"
+    assert fake_db.reads == reads
+    assert store.recent_writes.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_miss_falls_through_to_database(fake_db):
+    fake_db.reference("messages/alice/m1").set({"content": "Hello?", "responses": {"grok": "Hi"}})
+    store = MessageStore()
+    reads = fake_db.reads
+
+    assert await store.get_responses("alice", "m1") == {"grok": "Hi"}
+    assert fake_db.reads == reads + 1
+
+
+def test_entries_expire(monkeypatch):
+    cache = RecentWritesCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("storage.recent_writes.time.monotonic", lambda: now[0])
+    cache.put("alice", "m1", "responses", {"grok": "Hi"})
+    now[0] += 5
+    assert cache.get("alice", "m1", "responses") == {"grok": "Hi"}
+    now[0] += 10
+    assert cache.get("alice", "m1", "responses") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_per_user_and_user_count_bounds():
+    cache = RecentWritesCache(max_users=2, max_per_user=2)
+    for message_id in ("m1", "m2", "m3"):
+        cache.put("alice", message_id, "responses", message_id)
+    assert cache.get("alice", "m1", "responses") is None
+    assert cache.get("alice", "m3", "responses") == "m3"
+
+    cache.put("bob", "m1", "responses", "bob")
+    cache.get("alice", "m2", "responses")
+    cache.put("carol", "m1", "responses", "carol")
+    # bob was the least recently used user
+    assert cache.get("bob", "m1", "responses") is None
+    assert cache.get("alice", "m2", "responses") == "m2"
+
+
+def test_kinds_accumulate_per_message_and_invalidate():
+    cache = RecentWritesCache()
+    cache.put("alice", "m1", "message", {"content": "Hello?"})
+    cache.put("alice", "m1", "responses", {"grok": "Hi"})
+    assert cache.get("alice", "m1", "message") == {"content": "Hello?"}
+    assert cache.get("alice", "m1", "analysis") is None
+
+    cache.invalidate("alice", "m1")
+    assert cache.get("alice", "m1", "responses") is None
@@ -0,0 +1,84 @@
+import threading
+import random
+from search import SearchIndex, UserIndex, encode_postings, decode_postings
+
+
+def test_postings_roundtrip_and_compression():
+    postings = [(doc, random.randint(1, 300)) for doc in sorted(random.sample(range(100000), 500))]
+    data = encode_postings(postings)
+    assert decode_postings(data) == postings
+    assert len(data) < len(postings) * 8
+
+
+def test_bm25_ranks_relevant_messages_first(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index.index("alice", "m1", "question", "How do I bake sourdough bread?")
+    index.index("alice", "m1", "answers", "Feed the starter, then bake the bread at 250C.")
+    index.index("alice", "m2", "question", "What is the capital of France?")
+    index.index("alice", "m3", "question", "Which bread flour is best?")
+    index.index("bob", "m9", "question", "sourdough sourdough sourdough")
+
+    results = index.search("alice", "sourdough bread")
+    assert [hit["id"] for hit in results] == ["m1", "m3"]
+    assert results[0]["fields"] == ["answers", "question"]
+    assert index.search("alice", "kubernetes") == []
+
+
+def test_reindexing_a_field_replaces_it(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index.index("alice", "m1", "analysis", "Grok gave the best answer")
+    index.index("alice", "m1", "analysis", "Gemini gave the best answer")
+    assert index.search("alice", "grok") == []
+    assert index.search("alice", "gemini")[0]["id"] == "m1"
+
+    index.remove("alice", "m1")
+    assert index.search("alice", "gemini") == []
+
+
+def test_persisted_index_is_reloaded_with_delta(tmp_path):
+    index = SearchIndex(str(tmp_path), flush_threshold=2)
+    index.index("alice", "m1", "question", "sourdough starter")
+    index.index("alice", "m2", "question", "pizza dough")
+    assert index.stats()["unsavedUpdates"] == 0
+    index.index("alice", "m1", "question", "rye starter")
+    index.flush()
+
+    reopened = UserIndex(str(tmp_path / "alice"))
+    assert [hit["id"] for hit in reopened.search("starter")] == ["m1"]
+    assert reopened.search("sourdough") == []
+    # Tombstoned documents are dropped when a generation is written
+    assert len(reopened.docs) == 2
+    assert sorted(path.name for path in (tmp_path / "alice").iterdir()) == ["lexicon.json", "postings-2.bin"]
+
+    reopened.add("m3", "question", "starter culture")
+    assert {hit["id"] for hit in reopened.search("starter")} == {"m1", "m3"}
+    reopened.close()
+
+
+def test_evicted_users_are_persisted(tmp_path):
+    index = SearchIndex(str(tmp_path), max_loaded_users=1)
+    index.index("alice", "m1", "question", "sourdough")
+    index.index("bob", "m2", "question", "pizza")
+    assert index.stats()["loadedUsers"] == 1
+    assert index.search("alice", "sourdough")[0]["id"] == "m1"
+
+
+def test_concurrent_writers_with_eviction_lose_nothing(tmp_path):
+    index = SearchIndex(str(tmp_path), max_loaded_users=1, flush_threshold=3)
+
+    def write(user_id):
+        for number in range(30):
+            index.index(user_id, f"m{number}", "question", f"sourdough loaf {number}")
+
+    threads = [threading.Thread(target=write, args=(user_id,)) for user_id in ("alice", "bob", "carol")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    index.flush()
+
+    for user_id in ("alice", "bob", "carol"):
+        reopened = UserIndex(str(tmp_path / user_id))
+        assert len(reopened.search("sourdough", limit=100)) == 30
+        reopened.close()
+    assert index.stats()["loadedUsers"] == 1
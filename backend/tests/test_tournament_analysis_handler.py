@@ -0,0 +1,83 @@
+import asyncio
+import re
+import pytest
+from unittest.mock import patch
+from llm_handlers import ConsensusDetector, TournamentAnalysisHandler
+
+QUESTION = "How do vaccines train the immune system?"
+
+
+def model_responses(count):
+    return {
+        f"model{i}": f"Answer {i}: " + " ".join(f"topic{i}_{j}" for j in range(40))
+        for i in range(count)
+    }
+
+
+def judge_highest_number(system_prompt, prompt, max_tokens=1000):
+    """Fake judge that prefers the model with the highest index."""
+    if "WINNER:" in prompt:
+        candidates = re.findall(r"^\[(model\d+)\]$", prompt, re.MULTILINE)
+        winner = max(candidates, key=lambda m: int(m[5:]))
+        return f"WINNER: {winner}\nNOTES: {winner} was the most complete."
+    return "SUMMARY: Combined summary.\nEXPLANATION: It won every comparison."
+
+
+@pytest.mark.asyncio
+async def test_tournament_scales_to_many_models():
+    handler = TournamentAnalysisHandler(group_size=2, max_concurrency=3)
+    with patch.object(handler, "_complete", side_effect=judge_highest_number):
+        result = await handler.analyze_responses(QUESTION, model_responses(13))
+
+    assert result["source"] == "tournament"
+    assert result["bestModel"] == "model12"
+    assert result["summary"] == "Combined summary."
+    assert result["ranking"][0]["model"] == "model12"
+    assert len(result["ranking"]) == 13
+    # Single elimination over 13 contenders needs 12 comparisons
+    assert len(result["comparisons"]) == 12
+    assert all(c["latencyMs"] >= 0 and not c["fallback"] for c in result["comparisons"])
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_respected():
+    handler = TournamentAnalysisHandler(group_size=2, max_concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def slow_judge(system_prompt, prompt, max_tokens=1000):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return judge_highest_number(system_prompt, prompt, max_tokens)
+
+    with patch.object(handler, "_complete", side_effect=slow_judge):
+        await handler.analyze_responses(QUESTION, model_responses(8))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_comparisons_fall_back_to_local_ranker():
+    handler = TournamentAnalysisHandler(group_size=3)
+    with patch.object(handler, "_complete", side_effect=Exception("API Error")):
+        result = await handler.analyze_responses(QUESTION, model_responses(5))
+    assert result["bestModel"] in model_responses(5)
+    assert all(c["fallback"] for c in result["comparisons"])
+    assert "won the tournament" in result["explanation"]
+
+
+@pytest.mark.asyncio
+async def test_consensus_skips_tournament():
+    handler = TournamentAnalysisHandler(consensus_detector=ConsensusDetector(threshold=0.5))
+    same = {"a": "Vaccines expose the body to antigens.", "b": "Vaccines expose the body to antigens."}
+    with patch.object(handler, "_complete") as complete:
+        result = await handler.analyze_responses(QUESTION, same)
+    complete.assert_not_called()
+    assert result["source"] == "local"
+
+
+def test_group_size_must_allow_comparison():
+    with pytest.raises(ValueError):
+        TournamentAnalysisHandler(group_size=1)
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from storage import MessageStore
+
+
+@pytest.fixture
+def store(fake_db):
+    store = MessageStore()
+    store.enable_write_behind(max_batch=50, max_delay=0.01, retry_delay=0.01)
+    return store
+
+
+@pytest.mark.asyncio
+async def test_deferred_writes_are_coalesced(store, fake_db):
+    for attempt in range(3):
+        await store.save_responses("alice", "m1", {"openai": f"draft {attempt}"}, defer=True)
+    assert store.write_behind.depth == 1
+    assert fake_db.writes == 0
+
+    await store.write_behind.flush()
+    assert fake_db.tree["messages"]["alice"]["m1"]["responses"] == {"openai": "draft 2"}
+
+
+@pytest.mark.asyncio
+async def test_batch_is_committed_in_one_update(store, fake_db):
+    for user_id in ("alice", "bob"):
+        for message_id in ("m1", "m2"):
+            await store.save_message(user_id, message_id, "question", defer=True)
+
+    assert await store.write_behind.flush() == 4
+    assert fake_db.updates == 1
+    assert fake_db.tree["changes"]["alice"]["head"]["seq"] == 2
+    assert sorted(fake_db.tree["messages"]["bob"]) == ["m1", "m2"]
+
+
+@pytest.mark.asyncio
+async def test_record_and_fields_fold_into_one_path(store, fake_db):
+    await store.save_message("alice", "m1", "question", defer=True)
+    await store.save_responses("alice", "m1", {"openai": "answer"}, defer=True)
+    await store.write_behind.flush()
+
+    record = fake_db.tree["messages"]["alice"]["m1"]
+    assert record["content"] == "question"
+    assert record["responses"] == {"openai": "answer"}
+    assert record["version"] == 2
+    assert sorted(fake_db.tree["changes"]["alice"]["log"]) == ["000000000001", "000000000002"]
+
+
+@pytest.mark.asyncio
+async def test_deferred_message_keeps_fields_written_meanwhile(store, fake_db):
+    await store.save_message("alice", "m1", "draft", defer=True)
+    await store.save_responses("alice", "m1", {"openai": "answer"}, defer=True)
+    # Re-enqueueing the message keeps its place ahead of the responses
+    await store.save_message("alice", "m1", "question", defer=True)
+    await store.save_analysis("alice", "m1", {"bestModel": "openai"})
+    assert [key[2] for key in store.write_behind._pending] == ["message", "responses"]
+
+    await store.write_behind.flush()
+    record = fake_db.tree["messages"]["alice"]["m1"]
+    assert record["content"] == "question"
+    assert record["responses"] == {"openai": "answer"}
+    assert record["analysis"]["content"] == {"bestModel": "openai"}
+
+
+@pytest.mark.asyncio
+async def test_pending_writes_are_readable_before_flush(store, fake_db):
+    await store.save_message("alice", "m1", "question", defer=True)
+    await store.save_responses("alice", "m1", {"openai": "answer"}, defer=True)
+
+    assert await store.get_question("alice", "m1") == "question"
+    assert await store.get_responses("alice", "m1") == {"openai": "answer"}
+    assert (await store.get_message("alice", "m1"))["responses"] == {"openai": "answer"}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_requeued_behind_newer_writes(store, fake_db, monkeypatch):
+    await store.save_responses("alice", "m1", {"openai": "old"}, defer=True)
+
+    def fail(batch):
+        # A newer write for the same key lands while the flush is in flight
+        store.write_behind.enqueue("alice", "m1", "responses", {"openai": "new"})
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(store, "write_batch", fail)
+    with pytest.raises(ConnectionError):
+        await store.write_behind.flush()
+    assert store.write_behind.stats()["failures"] == 1
+    assert store.write_behind.pending("alice", "m1", "responses") == {"openai": "new"}
+
+    monkeypatch.delattr(store, "write_batch")
+    await store.write_behind.flush()
+    assert fake_db.tree["messages"]["alice"]["m1"]["responses"] == {"openai": "new"}
+
+
+@pytest.mark.asyncio
+async def test_background_flusher_and_stop_drain_queue(store, fake_db):
+    queue = store.write_behind
+    queue.start()
+    await store.save_message("alice", "m1", "question", defer=True)
+    await asyncio.sleep(0.05)
+    assert "m1" in fake_db.tree["messages"]["alice"]
+
+    await store.save_message("alice", "m2", "question", defer=True)
+    await queue.stop()
+    assert queue.depth == 0
+    assert "m2" in fake_db.tree["messages"]["alice"]
+
+
+@pytest.mark.asyncio
+async def test_writes_are_synchronous_without_defer(store, fake_db):
+    seq = await store.save_message("alice", "m1", "question")
+    assert seq == 1
+    assert store.write_behind.depth == 0
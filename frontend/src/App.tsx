@@ -1,10 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import './App.css';
-import { ref, onValue, DatabaseReference } from 'firebase/database';
-import { database } from './firebase';
+import { User } from 'firebase/auth';
 import { useAuth } from './contexts/AuthContext';
 import Login from './components/Login';
 import Profile from './components/Profile';
+import { newMessageId } from './ids';
 
 interface LLMResponse {
   answer: string;
@@ -51,6 +51,29 @@ interface AllResponses {
   [key: string]: MessageResponses;
 }
 
+// A message record as served by /api/messages and /api/sync
+interface StoredMessage {
+  id: string;
+  content?: string;
+  timestamp?: number;
+  deleted?: boolean;
+  responses?: {
+    [modelKey: string]: string;
+  };
+  analysis?: {
+    content: {
+      summary: string;
+      bestModel: string;
+    };
+    timestamp: number;
+  };
+}
+
+const toLLMResponse = (answer: string): LLMResponse =>
+  typeof answer === 'string' && answer.startsWith('Error:')
+    ? { answer: '', error: answer, timestamp: Date.now() }
+    : { answer, timestamp: Date.now() };
+
 interface LLMStatus {
   enabled: boolean;
   name: string;
@@ -82,90 +105,186 @@ function ChatInterface() {
     ));
   };
 
+  // Read inside the socket handler without reopening the socket on every send
+  const currentMessageIdRef = useRef<string | null>(null);
   useEffect(() => {
-    if (!user) return;
-    
-    const messagesRef = ref(database, `/users/${user.uid}/question`);
-    onValue(messagesRef, (snapshot) => {
-      const data = snapshot.val();
-      console.log('Messages data:', data);
-      if (data) {
-        const messageList = Object.entries(data).map(([id, value]: [string, any]) => ({
-          id,
-          content: value.content,
-          timestamp: value.timestamp,
-        }));
-        setMessages(messageList.sort((a, b) => b.timestamp - a.timestamp));
-
-        // Fetch responses for each message
-        messageList.forEach(message => {
-          const modelRefs: { [key: string]: DatabaseReference } = {
-            deepseek: ref(database, `/users/${user.uid}/question/${message.id}/deepseek`),
-            grok: ref(database, `/users/${user.uid}/question/${message.id}/grok`),
-            gemini: ref(database, `/users/${user.uid}/question/${message.id}/gemini`),
-            openai: ref(database, `/users/${user.uid}/question/${message.id}/openai`),
-          };
-
-          Object.entries(modelRefs).forEach(([model, modelRef]) => {
-            onValue(modelRef, (responseSnapshot) => {
-              const responseData = responseSnapshot.val();
-              console.log(`Response data for ${model}:`, responseData);
-              if (responseData) {
-                setAllResponses(prev => ({
-                  ...prev,
-                  [message.id]: {
-                    ...prev[message.id],
-                    responses: {
-                      ...prev[message.id]?.responses,
-                      [model]: responseData
-                    }
-                  }
-                }));
-              }
-            });
+    currentMessageIdRef.current = currentMessageId;
+  }, [currentMessageId]);
+
+  // Last change sequence applied; reconnects sync from it instead of reloading history
+  const syncSeqRef = useRef<number | null>(null);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+
+  // Merge stored records (history pages or sync deltas) into the view state
+  const applyRecords = useCallback((records: StoredMessage[]) => {
+    setMessages(prev => {
+      const byId = new Map(prev.map(message => [message.id, message] as [string, Message]));
+      records.forEach(record => {
+        const existing = byId.get(record.id);
+        if (record.deleted) {
+          byId.delete(record.id);
+        } else if (existing || record.content !== undefined) {
+          byId.set(record.id, {
+            ...existing,
+            id: record.id,
+            content: record.content ?? existing?.content ?? '',
+            timestamp: record.timestamp ?? existing?.timestamp ?? 0
           });
+        }
+      });
+      return Array.from(byId.values()).sort((a, b) => b.timestamp - a.timestamp);
+    });
+    setAllResponses(prev => {
+      const next = { ...prev };
+      records.forEach(record => {
+        if (!record.responses) return;
+        const responses = { ...next[record.id]?.responses };
+        Object.entries(record.responses).forEach(([model, answer]) => {
+          responses[model] = toLLMResponse(answer);
         });
-      }
+        next[record.id] = { ...next[record.id], responses };
+      });
+      return next;
     });
-  }, [user]);
+    setAnalysisResults(prev => {
+      const next = { ...prev };
+      records.forEach(record => {
+        const analysis = record.analysis?.content;
+        if (!analysis) return;
+        next[record.id] = {
+          summary: analysis.summary,
+          bestModel: analysis.bestModel,
+          estimatedTime: 0
+        };
+      });
+      return next;
+    });
+  }, []);
+
+  const loadHistory = useCallback(async (account: User, cursor: string | null): Promise<number | undefined> => {
+    const params = new URLSearchParams({ user_id: account.uid, limit: '20' });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(`http://localhost:8000/api/messages?${params}`, {
+      headers: { 'Authorization': `Bearer ${await account.getIdToken()}` }
+    });
+    if (!response.ok) {
+      throw new Error('Failed to load message history');
+    }
+    const data = await response.json();
+    applyRecords(data.messages);
+    setHistoryCursor(data.next_cursor);
+    return data.seq;
+  }, [applyRecords]);
+
+  const syncChanges = useCallback(async (account: User) => {
+    let hasMore = true;
+    while (hasMore && syncSeqRef.current !== null) {
+      const params = new URLSearchParams({ user_id: account.uid, since: String(syncSeqRef.current) });
+      const response = await fetch(`http://localhost:8000/api/sync?${params}`, {
+        headers: { 'Authorization': `Bearer ${await account.getIdToken()}` }
+      });
+      if (!response.ok) {
+        throw new Error('Failed to sync changes');
+      }
+      const data = await response.json();
+      applyRecords(data.changes);
+      syncSeqRef.current = data.seq;
+      hasMore = data.has_more;
+    }
+  }, [applyRecords]);
+
+  const loadOlder = async () => {
+    if (!user || !historyCursor) return;
+    try {
+      await loadHistory(user, historyCursor);
+    } catch (error) {
+      console.error('Error loading history:', error);
+    }
+  };
 
   useEffect(() => {
-    if (currentMessageId && user) {
-      const modelRefs: { [key: string]: DatabaseReference } = {
-        deepseek: ref(database, `/users/${user.uid}/question/${currentMessageId}/deepseek`),
-        grok: ref(database, `/users/${user.uid}/question/${currentMessageId}/grok`),
-        gemini: ref(database, `/users/${user.uid}/question/${currentMessageId}/gemini`),
-        openai: ref(database, `/users/${user.uid}/question/${currentMessageId}/openai`),
-      };
+    if (!user) return;
 
-      const unsubscribes = Object.entries(modelRefs).map(([model, modelRef]) => {
-        return onValue(modelRef, (snapshot) => {
-          const data = snapshot.val();
-          if (data) {
-            setModelResponses(prev => ({
-              ...prev,
-              [model]: data
-            }));
-            // Also update allResponses for the current message
-            setAllResponses(prev => ({
-              ...prev,
-              [currentMessageId]: {
-                ...prev[currentMessageId],
-                responses: {
-                  ...prev[currentMessageId]?.responses,
-                  [model]: data
-                }
-              }
-            }));
+    let socket: WebSocket | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let attempts = 0;
+    let closed = false;
+    syncSeqRef.current = null;
+
+    const catchUp = async () => {
+      try {
+        if (syncSeqRef.current === null) {
+          // First connect: the newest page, then whatever changed while it loaded
+          syncSeqRef.current = (await loadHistory(user, null)) ?? null;
+        }
+        await syncChanges(user);
+      } catch (error) {
+        console.error('Error loading history:', error);
+      }
+    };
+
+    const handleUpdate = (event: MessageEvent) => {
+      const update = JSON.parse(event.data);
+      if (update.type === 'response') {
+        const data = toLLMResponse(update.answer);
+        if (update.messageId === currentMessageIdRef.current) {
+          setModelResponses(prev => ({
+            ...prev,
+            [update.model]: data
+          }));
+        }
+        setAllResponses(prev => ({
+          ...prev,
+          [update.messageId]: {
+            ...prev[update.messageId],
+            responses: {
+              ...prev[update.messageId]?.responses,
+              [update.model]: data
+            }
           }
-        });
-      });
-
-      return () => {
-        unsubscribes.forEach(unsubscribe => unsubscribe());
+        }));
+      } else if (update.type === 'analysis') {
+        setAnalysisResults(prev => ({
+          ...prev,
+          [update.messageId]: {
+            summary: update.analysis.summary,
+            bestModel: update.analysis.bestModel,
+            estimatedTime: update.analysis.estimatedTime
+          }
+        }));
+      } else if (update.type === 'status' && update.status === 'complete' &&
+                 update.messageId === currentMessageIdRef.current) {
+        setIsSubmitting(false);
+      }
+    };
+
+    // One socket per session delivers response and analysis deltas for every message
+    const connect = () => {
+      const ws = new WebSocket(`ws://localhost:8000/ws/${user.uid}`);
+      socket = ws;
+      ws.onopen = async () => {
+        attempts = 0;
+        // The server pushes nothing until the first frame proves who we are
+        ws.send(JSON.stringify({ type: 'auth', token: await user.getIdToken() }));
+        catchUp();
       };
-    }
-  }, [currentMessageId, user]);
+      ws.onmessage = handleUpdate;
+      ws.onclose = () => {
+        if (closed) return;
+        // Deltas pushed while disconnected are picked up by the sync on reopen
+        retry = setTimeout(connect, Math.min(1000 * 2 ** attempts++, 30000));
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      socket?.close();
+    };
+  }, [user, loadHistory, syncChanges]);
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -174,8 +293,9 @@ function ChatInterface() {
     setIsSubmitting(true);
     setModelResponses({});
 
-    const messageId = generateId();
+    const messageId = newMessageId();
     setCurrentMessageId(messageId);
+    setMessages(prev => [{ id: messageId, content: newMessage, timestamp: Date.now() }, ...prev]);
 
     try {
       const response = await fetch('http://localhost:8000/api/message', {
@@ -185,9 +305,9 @@ function ChatInterface() {
         },
         body: JSON.stringify({
           content: newMessage,
-          id: messageId,
-          userId: user.uid,
-          enabledLLMs: llmStatus.filter(llm => llm.enabled).map(llm => llm.key)
+          message_id: messageId,
+          user_id: user.uid,
+          llm_types: llmStatus.filter(llm => llm.enabled).map(llm => llm.key)
         }),
       });
 
@@ -202,10 +322,6 @@ function ChatInterface() {
     }
   };
 
-  const generateId = () => {
-    return 'q' + Math.random().toString(36).substring(2, 15);
-  };
-
   const handleAnalysis = async (messageId: string) => {
     try {
       setAnalyzing(prev => ({ ...prev, [messageId]: true }));
@@ -383,6 +499,11 @@ function ChatInterface() {
               )}
             </div>
           ))}
+          {historyCursor && (
+            <button onClick={loadOlder} className="load-older-button">
+              Load older messages
+            </button>
+          )}
         </div>
         <form onSubmit={handleSubmit} className="input-form">
           <input
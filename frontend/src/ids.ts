@@ -0,0 +1,46 @@
+// Crockford's base32, whose ASCII order matches numeric order (same as backend/storage/ids.py)
+const ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+
+let lastTimestamp = -1;
+let lastRandomness: number[] = [];
+
+const encodeTime = (timestamp: number): string => {
+  let value = timestamp;
+  let chars = '';
+  for (let i = 0; i < 10; i++) {
+    chars = ENCODING[value % 32] + chars;
+    value = Math.floor(value / 32);
+  }
+  return chars;
+};
+
+const randomDigits = (): number[] =>
+  Array.from(crypto.getRandomValues(new Uint8Array(16)), byte => byte % 32);
+
+/**
+ * Mint a ULID for a new message, so its database key sorts by creation time.
+ * IDs minted within the same millisecond increment the random part.
+ */
+export const newMessageId = (): string => {
+  let timestamp = Date.now();
+  let randomness: number[];
+  if (timestamp <= lastTimestamp) {
+    timestamp = lastTimestamp;
+    randomness = [...lastRandomness];
+    let i = randomness.length - 1;
+    while (i >= 0 && randomness[i] === 31) {
+      randomness[i--] = 0;
+    }
+    if (i < 0) {
+      timestamp += 1;
+      randomness = randomDigits();
+    } else {
+      randomness[i] += 1;
+    }
+  } else {
+    randomness = randomDigits();
+  }
+  lastTimestamp = timestamp;
+  lastRandomness = randomness;
+  return encodeTime(timestamp) + randomness.map(digit => ENCODING[digit]).join('');
+};